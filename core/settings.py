@@ -46,6 +46,7 @@ INSTALLED_APPS = [
     # Local
     'users',
     'tournaments',
+    'jobs',
 
     # External
     'django_countries',
@@ -138,6 +139,16 @@ SIMPLE_JWT = {
 }
 
 
+# Responses stored for retried requests with an Idempotency-Key header are kept this long.
+IDEMPOTENCY_KEY_TTL = timedelta(hours=24)
+
+# Matches paired in arena tournaments are inserted in batches by a background thread this often (seconds).
+ARENA_WRITE_INTERVAL = 0.25
+
+# Each process keeps the pairing state of this many recently paired tournaments in memory (see tournaments/state.py).
+TOURNAMENT_STATE_CACHE_SIZE = 32
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.0/topics/i18n/
 
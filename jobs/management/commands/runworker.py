@@ -0,0 +1,67 @@
+"""
+Runs background job workers.
+
+Each process polls the job table and claims jobs with SELECT ... FOR UPDATE SKIP LOCKED, so several
+processes (on one or many hosts) share the queue safely.
+
+Usage:
+    python manage.py runworker --processes 4
+    python manage.py runworker --burst        # exit once the queue is empty
+"""
+
+import multiprocessing
+import signal
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from jobs.queue import Worker, requeue_stale
+
+
+def _work(poll_interval, burst, stale_after):
+    worker = Worker(poll_interval=poll_interval, stale_after=stale_after)
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    return worker.run(burst=burst)
+
+
+class Command(BaseCommand):
+    help = "Run background job workers"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1, help="Number of worker processes.")
+        parser.add_argument('--poll-interval', type=float, default=1.0, help="Seconds to sleep on an empty queue.")
+        parser.add_argument('--burst', action='store_true', help="Exit when the queue is empty.")
+        parser.add_argument('--stale-after', type=int, default=600,
+                            help="Requeue running jobs without a heartbeat for this many seconds (checked "
+                                 "at startup and periodically by idle workers).")
+
+    def handle(self, *args, **options):
+        stale_after = timedelta(seconds=options['stale_after'])
+        requeued = requeue_stale(stale_after)
+        if requeued:
+            self.stdout.write(f"Requeued {requeued} stale jobs")
+
+        processes = options['processes']
+        if processes <= 1:
+            processed = _work(options['poll_interval'], options['burst'], stale_after)
+            self.stdout.write(self.style.SUCCESS(f"Processed {processed} jobs"))
+            return
+
+        # Forked children must not share the parent's database connection.
+        connections.close_all()
+        children = [
+            multiprocessing.Process(target=_work, args=(options['poll_interval'], options['burst'], stale_after),
+                                    daemon=False)
+            for _ in range(processes)
+        ]
+        for child in children:
+            child.start()
+        try:
+            for child in children:
+                child.join()
+        except KeyboardInterrupt:
+            for child in children:
+                child.terminate()
+                child.join()
@@ -0,0 +1,41 @@
+from django.contrib.auth.models import User
+from django.db import models
+
+
+class Job(models.Model):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=64, blank=False, null=False)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=QUEUED, blank=False, null=False)
+    progress = models.PositiveIntegerField(default=0, blank=False, null=False)
+    total = models.PositiveIntegerField(default=0, blank=False, null=False)
+    message = models.CharField(max_length=255, default='', blank=True)
+    result = models.JSONField(blank=True, null=True)
+    error = models.TextField(default='', blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0, blank=False, null=False)
+    worker = models.CharField(max_length=100, default='', blank=True)
+    created_by = models.ForeignKey(User, related_name='jobs', on_delete=models.SET_NULL, blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    heartbeat_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            # Workers only ever scan the queued jobs, oldest first.
+            models.Index(fields=['id'], condition=models.Q(status='queued'), name='job_queued_idx'),
+            models.Index(fields=['status', 'heartbeat_at'], name='job_status_heartbeat_idx'),
+        ]
+
+    def __str__(self):
+        return f"Job {self.id}: {self.kind} ({self.status})"
@@ -0,0 +1,262 @@
+"""
+A lightweight job queue on top of the project's PostgreSQL database.
+
+Jobs are rows of the `Job` table. Workers claim them with `SELECT ... FOR UPDATE SKIP LOCKED`, so any
+number of worker processes can poll the same table without handing out a job twice and without
+blocking each other. Handlers are plain functions registered per job kind, usually in an app's
+`jobs.py` module (imported automatically on startup).
+
+While a job runs, a heartbeat thread refreshes `Job.heartbeat_at` every `HEARTBEAT_INTERVAL`
+seconds, whether or not the handler reports progress. A job whose heartbeat stopped belongs to a
+dead worker: `requeue_stale` queues it again, up to `MAX_ATTEMPTS` claims, then fails it. A worker
+only writes the outcome of a job it still owns, so a job taken over by another worker is not
+finished twice.
+
+Functions:
+    register(kind): Decorator registering a handler for a job kind.
+    enqueue(kind, user=None, **payload): Creates a queued job.
+    claim_next(worker): Atomically claims the oldest queued job.
+    run_job(job, heartbeat_interval): Runs a claimed job and stores its result or error.
+    requeue_stale(timeout, max_attempts): Puts jobs of dead workers back into the queue.
+
+Classes:
+    JobContext: Passed to handlers to report progress.
+    Worker: Polls the queue and runs jobs until stopped.
+"""
+
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+from datetime import timedelta
+
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_INTERVAL = 30
+MAX_ATTEMPTS = 3
+
+_handlers = {}
+
+
+def register(kind):
+    """
+    Register the decorated function as the handler of `kind` jobs.
+
+    The handler is called as `handler(context, **job.payload)` and its return value (which must be
+    JSON serializable) is stored as the job result.
+    """
+    def decorator(func):
+        _handlers[kind] = func
+        return func
+    return decorator
+
+
+def get_handler(kind):
+    try:
+        return _handlers[kind]
+    except KeyError:
+        raise LookupError(f"No handler registered for job kind '{kind}'")
+
+
+def enqueue(kind, user=None, **payload):
+    """
+    Queue a job of `kind` with the given payload.
+
+    Raises:
+        LookupError: If no handler is registered for `kind`.
+    """
+    get_handler(kind)
+    return Job.objects.create(kind=kind, payload=payload, created_by=user)
+
+
+class JobContext:
+    """
+    Handed to job handlers so they can report progress.
+
+    Progress is written with a single UPDATE outside of any handler transaction, so pollers see it
+    while the job is still running.
+    """
+
+    def __init__(self, job):
+        self.job = job
+
+    def progress(self, done, total=None, message=None):
+        fields = {'progress': done, 'heartbeat_at': timezone.now()}
+        if total is not None:
+            fields['total'] = total
+        if message is not None:
+            fields['message'] = message[:255]
+        Job.objects.filter(pk=self.job.pk).update(**fields)
+        for name, value in fields.items():
+            setattr(self.job, name, value)
+
+
+def claim_next(worker):
+    """
+    Claim the oldest queued job for `worker`, or return None if the queue is empty.
+
+    Rows locked by other workers are skipped instead of waited on.
+    """
+    with transaction.atomic():
+        job = (
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status=Job.QUEUED)
+            .order_by('id')
+            .first()
+        )
+        if job is None:
+            return None
+        now = timezone.now()
+        job.status = Job.RUNNING
+        job.worker = worker
+        job.attempts += 1
+        job.started_at = now
+        job.heartbeat_at = now
+        job.save(update_fields=['status', 'worker', 'attempts', 'started_at', 'heartbeat_at'])
+    return job
+
+
+class _Heartbeat(threading.Thread):
+    """Refreshes the heartbeat of a running job, on its own connection, until stopped."""
+
+    def __init__(self, job, interval):
+        super().__init__(name=f'job-{job.pk}-heartbeat', daemon=True)
+        self.job = job
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        try:
+            while not self.stopped.wait(self.interval):
+                try:
+                    Job.objects.filter(pk=self.job.pk, status=Job.RUNNING, worker=self.job.worker).update(
+                        heartbeat_at=timezone.now()
+                    )
+                except Exception:
+                    logger.exception("Heartbeat of job %s failed", self.job.pk)
+                    connection.close()
+        finally:
+            connection.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def run_job(job, heartbeat_interval=HEARTBEAT_INTERVAL):
+    """
+    Run a claimed job and record its outcome.
+
+    The outcome is only written while the job is still running on this worker. If it was requeued
+    in the meantime (its heartbeat was missed), another worker owns it and nothing is written.
+    """
+    heartbeat = _Heartbeat(job, heartbeat_interval)
+    heartbeat.start()
+    try:
+        result = get_handler(job.kind)(JobContext(job), **job.payload)
+    except Exception:
+        logger.exception("Job %s (%s) failed", job.id, job.kind)
+        job.status = Job.FAILED
+        job.error = traceback.format_exc()
+    else:
+        job.status = Job.SUCCEEDED
+        job.result = result
+        if job.total:
+            job.progress = job.total
+    finally:
+        heartbeat.stop()
+    job.finished_at = timezone.now()
+    owned = Job.objects.filter(pk=job.pk, status=Job.RUNNING, worker=job.worker).update(
+        status=job.status, result=job.result, error=job.error, progress=job.progress, finished_at=job.finished_at
+    )
+    if not owned:
+        logger.warning("Job %s (%s) was taken from worker %s; its outcome is dropped", job.id, job.kind, job.worker)
+        job.refresh_from_db()
+    return job
+
+
+def requeue_stale(timeout=timedelta(minutes=10), max_attempts=MAX_ATTEMPTS):
+    """
+    Put running jobs whose worker has not reported for `timeout` back into the queue.
+
+    Jobs already claimed `max_attempts` times are failed instead, so a job that kills its worker
+    is not retried forever.
+
+    Returns:
+        int: The number of requeued jobs.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        stale = Job.objects.filter(status=Job.RUNNING, heartbeat_at__lt=now - timeout)
+        failed = stale.filter(attempts__gte=max_attempts).update(
+            status=Job.FAILED, worker='', finished_at=now,
+            error=f"The worker stopped responding; gave up after {max_attempts} attempts.",
+        )
+        requeued = stale.update(status=Job.QUEUED, worker='')
+    if failed:
+        logger.warning("Failed %d stale jobs after %d attempts", failed, max_attempts)
+    return requeued
+
+
+class Worker:
+    """
+    Polls the job table and runs jobs one at a time.
+
+    Idle workers also requeue the jobs of dead workers (`requeue_stale`) every `requeue_every`
+    empty polls, so a job whose worker died is picked up again while the other workers keep running.
+
+    Attributes:
+        name (str): Identifies the worker in `Job.worker`.
+        poll_interval (float): Seconds to sleep when the queue is empty.
+        stale_after (timedelta): Running jobs without a heartbeat for this long are requeued.
+        requeue_every (int): Empty polls between two stale job checks.
+    """
+
+    def __init__(self, name=None, poll_interval=1.0, stale_after=timedelta(minutes=10), requeue_every=60):
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self.requeue_every = requeue_every
+        self.running = True
+
+    def run_once(self):
+        """Claim and run a single job. Returns the job, or None if the queue was empty."""
+        close_old_connections()
+        job = claim_next(self.name)
+        if job is not None:
+            run_job(job)
+        return job
+
+    def run(self, burst=False):
+        """
+        Run jobs until stopped. In burst mode, return as soon as the queue is empty.
+
+        Returns:
+            int: The number of jobs processed.
+        """
+        processed = 0
+        idle_polls = 0
+        while self.running:
+            if self.run_once() is not None:
+                processed += 1
+                continue
+            idle_polls += 1
+            if idle_polls % self.requeue_every == 0:
+                requeued = requeue_stale(self.stale_after)
+                if requeued:
+                    logger.warning("Requeued %d stale jobs", requeued)
+                    continue
+            if burst:
+                break
+            time.sleep(self.poll_interval)
+        return processed
+
+    def stop(self, *args):
+        self.running = False
@@ -0,0 +1,39 @@
+from rest_framework import serializers
+
+from .models import Job
+
+
+class JobSerializer(serializers.ModelSerializer):
+    """
+    Serializer for polling the status and progress of a background job.
+
+    Attributes:
+        percent (SerializerMethodField): Progress in percent, or None while the total is unknown.
+        error (SerializerMethodField): Why the job failed. Staff see the whole traceback, other
+            users only its last line (the exception and its message).
+
+    Meta:
+        model (Job): The Job model.
+        fields (list): The fields to be included in the serialized data.
+    """
+    percent = serializers.SerializerMethodField()
+    error = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Job
+        fields = ['id', 'kind', 'status', 'progress', 'total', 'percent', 'message', 'result', 'error',
+                  'attempts', 'created_at', 'started_at', 'finished_at']
+        read_only_fields = fields
+
+    def get_percent(self, job):
+        if job.status == Job.SUCCEEDED:
+            return 100
+        if not job.total:
+            return None
+        return round(100 * job.progress / job.total, 1)
+
+    def get_error(self, job):
+        request = self.context.get('request')
+        if not job.error or (request is not None and request.user.is_staff):
+            return job.error
+        return job.error.strip().splitlines()[-1]
@@ -0,0 +1,164 @@
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from django.test import TransactionTestCase
+from rest_framework.test import APITestCase, APIClient
+
+from tournaments.models import Tournament, Participant
+from users.models import Player
+from .models import Job
+from .queue import Worker, register, enqueue, claim_next, run_job, requeue_stale
+
+
+@register('test_add')
+def add_job(context, a, b):
+    context.progress(1, total=2, message="halfway")
+    return {'sum': a + b}
+
+
+@register('test_fail')
+def fail_job(context):
+    raise ValueError("boom")
+
+
+@register('test_sleep')
+def sleep_job(context, seconds):
+    time.sleep(seconds)
+
+
+class JobQueueTests(APITestCase):
+    def test_enqueue_claim_and_run(self):
+        job = enqueue('test_add', a=2, b=3)
+        self.assertEqual(job.status, Job.QUEUED)
+
+        claimed = claim_next('worker-1')
+        self.assertEqual(claimed.id, job.id)
+        self.assertEqual(claimed.status, Job.RUNNING)
+        self.assertIsNone(claim_next('worker-2'))
+
+        run_job(claimed)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertEqual(job.result, {'sum': 5})
+        self.assertEqual((job.progress, job.total, job.message), (2, 2, "halfway"))
+
+    def test_failed_job_records_error(self):
+        enqueue('test_fail')
+        job = run_job(claim_next('worker-1'))
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertIn("ValueError: boom", job.error)
+
+    def test_unknown_kind(self):
+        with self.assertRaises(LookupError):
+            enqueue('no_such_job')
+
+    def test_requeue_stale(self):
+        enqueue('test_add', a=1, b=1)
+        job = claim_next('dead-worker')
+        Job.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(requeue_stale(timedelta(minutes=10)), 1)
+        self.assertEqual(claim_next('worker-2').id, job.id)
+
+    def test_requeue_gives_up_after_max_attempts(self):
+        enqueue('test_add', a=1, b=1)
+        job = claim_next('dead-worker')
+        Job.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(hours=1), attempts=3)
+        self.assertEqual(requeue_stale(timedelta(minutes=10), max_attempts=3), 0)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertIn("gave up after 3 attempts", job.error)
+
+    def test_outcome_of_a_job_taken_over_is_dropped(self):
+        enqueue('test_add', a=1, b=1)
+        job = claim_next('slow-worker')
+        # Requeued while the slow worker was still running it, and claimed by another one.
+        Job.objects.filter(pk=job.pk).update(worker='worker-2')
+        run_job(job)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.worker, job.result), (Job.RUNNING, 'worker-2', None))
+
+
+class WorkerTests(TransactionTestCase):
+    # Workers close old connections between polls, which breaks test cases wrapped in a transaction.
+    def test_idle_worker_requeues_stale_jobs(self):
+        enqueue('test_add', a=1, b=2)
+        job = claim_next('dead-worker')
+        Job.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(hours=1))
+        worker = Worker(name='worker-2', poll_interval=0, requeue_every=1)
+        self.assertEqual(worker.run(burst=True), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.worker, job.result), (Job.SUCCEEDED, 'worker-2', {'sum': 3}))
+
+    def test_heartbeat_without_progress(self):
+        enqueue('test_sleep', seconds=0.5)
+        job = claim_next('worker-1')
+        run_job(job, heartbeat_interval=0.1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertGreater(job.heartbeat_at, job.started_at)
+
+
+class JobEndpointTests(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'password123')
+        self.user = User.objects.create_user('user', 'user@example.com', 'password123')
+        self.tournament = Tournament.objects.create(name='Job Cup', num_of_rounds=2, start_date="2024-07-10", end_date="2024-08-11")
+        for i in range(4):
+            user = User.objects.create_user(f'p{i}', f'p{i}@example.com', 'password123')
+            Participant.objects.create(player=Player.objects.create(user=user), tournament=self.tournament)
+
+    def test_async_generate_pairings(self):
+        self.client.force_authenticate(self.admin_user)
+        url = reverse('tournament-generate-pairings', kwargs={'pk': self.tournament.pk})
+        response = self.client.post(f"{url}?async=true")
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['status'], Job.QUEUED)
+        self.assertTrue(response['Location'].endswith(reverse('job-detail', kwargs={'pk': response.data['id']})))
+
+        run_job(claim_next('worker-1'))
+        response = self.client.get(reverse('job-detail', kwargs={'pk': response.data['id']}))
+        self.assertEqual(response.data['status'], Job.SUCCEEDED)
+        self.assertEqual(response.data['percent'], 100)
+        self.assertEqual(response.data['result']['matches_created'], 4)
+
+    def test_export_standings(self):
+        self.client.force_authenticate(self.admin_user)
+        response = self.client.post(reverse('tournament-export-standings', kwargs={'pk': self.tournament.pk}))
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        job = run_job(claim_next('worker-1'))
+        self.assertEqual(job.result['content'].count('\n'), 5)
+
+    def test_import_players(self):
+        self.client.force_authenticate(self.admin_user)
+        data = [
+            {'username': 'imported1', 'country': 'UZ', 'rating': 1500},
+            {'username': 'imported2', 'birthdate': '2001-02-02'},
+            {'username': 'p0'},
+        ]
+        response = self.client.post(reverse('import-players'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        job = run_job(claim_next('worker-1'))
+        self.assertEqual(job.result, {'created': 2, 'skipped': 1})
+        self.assertEqual(Player.objects.get(user__username='imported1').rating, 1500)
+
+    def test_only_staff_see_tracebacks(self):
+        enqueue('test_fail', user=self.user)
+        job = run_job(claim_next('worker-1'))
+        url = reverse('job-detail', kwargs={'pk': job.pk})
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get(url).data['error'], "ValueError: boom")
+        self.client.force_authenticate(self.admin_user)
+        self.assertIn("Traceback (most recent call last)", self.client.get(url).data['error'])
+
+    def test_jobs_are_private(self):
+        job = enqueue('test_add', user=self.admin_user, a=1, b=2)
+        self.client.force_authenticate(self.user)
+        response = self.client.get(reverse('job-detail', kwargs={'pk': job.pk}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.get(reverse('job-list'))
+        self.assertEqual(response.data['count'], 0)
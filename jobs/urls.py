@@ -0,0 +1,17 @@
+"""
+URL configuration for the background job views.
+
+Routes:
+    - '': Lists background jobs (admins see all jobs, users only their own).
+    - '<int:pk>/': Returns the status and progress of a job, for polling.
+"""
+
+from django.urls import path
+
+from .views import JobListView, JobDetailView
+
+
+urlpatterns = [
+    path('', JobListView.as_view(), name='job-list'),
+    path('<int:pk>/', JobDetailView.as_view(), name='job-detail'),
+]
@@ -0,0 +1,79 @@
+from django.urls import reverse
+from rest_framework import generics, status
+from rest_framework.response import Response
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.permissions import IsAuthenticated
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from .models import Job
+from .serializers import JobSerializer
+
+
+def job_accepted(request, job):
+    """Return a 202 response pointing the client at the job's polling endpoint."""
+    url = request.build_absolute_uri(reverse('job-detail', kwargs={'pk': job.pk}))
+    return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED, headers={'Location': url})
+
+
+class JobPagination(PageNumberPagination):
+    """
+    JobPagination handles pagination for the Job list view.
+
+    Attributes:
+    - page_size_query_param: The query parameter name for the page size.
+    - page_size: The default number of items per page.
+    - max_page_size: The maximum number of items per page.
+    """
+    page_size_query_param = 'size'
+    page_size = 10
+    max_page_size = 50
+
+
+class JobQuerysetMixin:
+    """Admins see every job, other users only the jobs they started."""
+
+    def get_queryset(self):
+        queryset = Job.objects.all()
+        if not self.request.user.is_staff:
+            queryset = queryset.filter(created_by=self.request.user)
+        return queryset
+
+
+class JobListView(JobQuerysetMixin, generics.ListAPIView):
+    """
+    A view that lists background jobs, newest first. Optional `status` and `kind` query parameters
+    filter the list.
+
+    Attributes:
+        serializer_class (Serializer): The serializer class used for the job instances.
+        pagination_class (class): The pagination class used for this view.
+        authentication_classes (list): The list of authentication classes used for this view.
+        permission_classes (list): The list of permission classes that determine access to this view.
+    """
+    serializer_class = JobSerializer
+    pagination_class = JobPagination
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        queryset = super().get_queryset().order_by('-id')
+        for field in ('status', 'kind'):
+            value = self.request.query_params.get(field)
+            if value:
+                queryset = queryset.filter(**{field: value})
+        return queryset
+
+
+class JobDetailView(JobQuerysetMixin, generics.RetrieveAPIView):
+    """
+    A view that returns the status, progress and result of a background job. Clients poll it until
+    the status is 'succeeded' or 'failed'.
+
+    Attributes:
+        serializer_class (Serializer): The serializer class used for the job instances.
+        authentication_classes (list): The list of authentication classes used for this view.
+        permission_classes (list): The list of permission classes that determine access to this view.
+    """
+    serializer_class = JobSerializer
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
@@ -0,0 +1,265 @@
+"""
+This script load-tests the REST API of a locally running chessphere server.
+
+It logs in a pool of seeded users (see `python manage.py seed_loadtest`), then replays a weighted mix
+of reads and writes with asyncio-based concurrency and reports throughput and p50/p95/p99 latency
+per endpoint. Only the standard library is used: every worker keeps its own HTTP/1.1 keep-alive
+connection opened with `asyncio.open_connection`.
+
+Classes:
+    HTTPConnection: A minimal keep-alive HTTP/1.1 client connection on top of asyncio streams.
+    Stats: Collects latencies and errors per endpoint and renders the report.
+
+Functions:
+    obtain_token(conn, username, password): Logs a user in and returns the JWT access token.
+    worker(...): Sends requests from the weighted mix until the deadline is reached.
+    main(): Parses command-line arguments and runs the load test.
+
+Usage:
+    python manage.py seed_loadtest --users 500
+    python manage.py runserver
+    python loadtest.py --tournament <id> --users 500 --concurrency 50 --duration 30
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+
+class HTTPConnection:
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except ConnectionError:
+                pass
+            self.writer = None
+
+    async def request(self, method, path, body=None, token=None):
+        """Send a request and return (status, parsed JSON body or None)."""
+        if self.writer is None:
+            await self.connect()
+
+        payload = json.dumps(body).encode() if body is not None else b''
+        headers = [
+            f"{method} {path} HTTP/1.1",
+            f"Host: {self.host}:{self.port}",
+            "Accept: application/json",
+            "Connection: keep-alive",
+            f"Content-Length: {len(payload)}",
+        ]
+        if body is not None:
+            headers.append("Content-Type: application/json")
+        if token:
+            headers.append(f"Authorization: Bearer {token}")
+        self.writer.write(("\r\n".join(headers) + "\r\n\r\n").encode() + payload)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("Server closed the connection")
+        status = int(status_line.split()[1])
+
+        response_headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            response_headers[name.strip().lower()] = value.strip()
+
+        if response_headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int((await self.reader.readline()).strip(), 16)
+                if size == 0:
+                    await self.reader.readline()
+                    break
+                chunks.append(await self.reader.readexactly(size))
+                await self.reader.readline()
+            data = b''.join(chunks)
+        elif 'content-length' in response_headers:
+            data = await self.reader.readexactly(int(response_headers['content-length']))
+        else:
+            data = await self.reader.read()
+            await self.close()
+
+        if response_headers.get('connection', '').lower() == 'close':
+            await self.close()
+
+        if data and response_headers.get('content-type', '').startswith('application/json'):
+            return status, json.loads(data)
+        return status, None
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, endpoint, seconds, ok):
+        self.latencies[endpoint].append(seconds)
+        if not ok:
+            self.errors[endpoint] += 1
+
+    @staticmethod
+    def percentile(sorted_values, pct):
+        """Nearest-rank percentile of an already sorted list."""
+        if not sorted_values:
+            return 0.0
+        index = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+        return sorted_values[index]
+
+    def report(self, elapsed):
+        header = f"{'endpoint':<24}{'requests':>10}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+        lines = [header, '-' * len(header)]
+        total = 0
+        for endpoint in sorted(self.latencies):
+            values = sorted(self.latencies[endpoint])
+            total += len(values)
+            lines.append(
+                f"{endpoint:<24}{len(values):>10}{self.errors[endpoint]:>8}{len(values) / elapsed:>10.1f}"
+                f"{self.percentile(values, 50) * 1000:>10.1f}{self.percentile(values, 95) * 1000:>10.1f}"
+                f"{self.percentile(values, 99) * 1000:>10.1f}{values[-1] * 1000:>10.1f}"
+            )
+        lines.append('-' * len(header))
+        lines.append(f"{'total':<24}{total:>10}{sum(self.errors.values()):>8}{total / elapsed:>10.1f}")
+        return "\n".join(lines)
+
+
+async def obtain_token(conn, username, password):
+    status, data = await conn.request('POST', '/api/auth/token/', {'username': username, 'password': password})
+    if status != 200:
+        raise RuntimeError(f"Login failed for {username}: HTTP {status}")
+    return data['access']
+
+
+async def timed(stats, endpoint, coro):
+    started = time.perf_counter()
+    try:
+        status, data = await coro
+        ok = status < 400
+    except (ConnectionError, asyncio.IncompleteReadError, ValueError, IndexError):
+        # A malformed status line, chunk size or JSON body counts as an error; the caller reconnects,
+        # since the stream position is unknown.
+        status, data, ok = None, None, False
+    stats.record(endpoint, time.perf_counter() - started, ok)
+    return status, data
+
+
+async def worker(host, port, args, tokens, admin_token, participant_ids, stats, deadline):
+    conn = HTTPConnection(host, port)
+    scenarios = [
+        ('token', args.token_weight),
+        ('participant-list', args.participants_weight),
+        ('player-list', args.players_weight if admin_token else 0),
+        ('participant-update', args.writes_weight if admin_token and participant_ids else 0),
+    ]
+    names = [name for name, weight in scenarios if weight > 0]
+    weights = [weight for name, weight in scenarios if weight > 0]
+    pages = max(1, len(participant_ids) // 10)
+
+    try:
+        while time.monotonic() < deadline:
+            scenario = random.choices(names, weights)[0]
+            if scenario == 'token':
+                username = f"{args.prefix}_{random.randrange(args.users)}"
+                request = conn.request('POST', '/api/auth/token/', {'username': username, 'password': args.password})
+            elif scenario == 'participant-list':
+                path = f"/api/tournaments/{args.tournament}/participants/?page={random.randint(1, pages)}"
+                request = conn.request('GET', path, token=random.choice(tokens))
+            elif scenario == 'player-list':
+                request = conn.request('GET', f"/api/auth/players/?page={random.randint(1, pages)}", token=admin_token)
+            else:
+                path = f"/api/participants/{random.choice(participant_ids)}/"
+                request = conn.request('PATCH', path, {'wins': random.randint(0, args.users)}, token=admin_token)
+
+            status, data = await timed(stats, scenario, request)
+            if status is None:
+                await conn.close()
+    finally:
+        await conn.close()
+
+
+async def collect_participant_ids(conn, tournament, token):
+    ids, page = [], 1
+    while True:
+        status, data = await conn.request('GET', f"/api/tournaments/{tournament}/participants/?page={page}&size=50", token=token)
+        if status != 200:
+            break
+        ids.extend(item['id'] for item in data['results'])
+        if not data.get('next'):
+            break
+        page += 1
+    return ids
+
+
+async def run(args):
+    url = urlsplit(args.base_url)
+    host, port = url.hostname, url.port or 80
+
+    # Log in the pool of seeded users with bounded concurrency.
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def login(username, password):
+        async with semaphore:
+            conn = HTTPConnection(host, port)
+            try:
+                return await obtain_token(conn, username, password)
+            finally:
+                await conn.close()
+
+    pool = min(args.users, args.pool)
+    tokens = await asyncio.gather(*(login(f"{args.prefix}_{i}", args.password) for i in range(pool)))
+    admin_token = await login(args.admin, args.admin_password or args.password) if args.admin else None
+
+    conn = HTTPConnection(host, port)
+    participant_ids = await collect_participant_ids(conn, args.tournament, admin_token or tokens[0])
+    await conn.close()
+    print(f"Logged in {len(tokens)} users, {len(participant_ids)} participants in tournament {args.tournament}.")
+
+    stats = Stats()
+    started = time.monotonic()
+    deadline = started + args.duration
+    await asyncio.gather(*(
+        worker(host, port, args, tokens, admin_token, participant_ids, stats, deadline)
+        for _ in range(args.concurrency)
+    ))
+    print(stats.report(time.monotonic() - started))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test a locally running chessphere API.")
+    parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+    parser.add_argument('--tournament', type=int, required=True, help="Tournament id from seed_loadtest.")
+    parser.add_argument('--users', type=int, default=200, help="Number of seeded users.")
+    parser.add_argument('--pool', type=int, default=50, help="How many seeded users obtain JWTs up front.")
+    parser.add_argument('--prefix', default='loadtest')
+    parser.add_argument('--password', default='loadtest123')
+    parser.add_argument('--admin', default='loadtest_admin', help="Admin user for player-list and writes; empty to skip.")
+    parser.add_argument('--admin-password', default=None)
+    parser.add_argument('--concurrency', type=int, default=20, help="Number of concurrent connections.")
+    parser.add_argument('--duration', type=float, default=30, help="Test duration in seconds.")
+    parser.add_argument('--token-weight', type=int, default=1)
+    parser.add_argument('--participants-weight', type=int, default=5)
+    parser.add_argument('--players-weight', type=int, default=3)
+    parser.add_argument('--writes-weight', type=int, default=1)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
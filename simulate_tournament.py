@@ -1,108 +1,213 @@
 """
 This script simulates a tournament with multiple players competing in several rounds of matches.
 
+The state of the tournament is held in a few NumPy columns indexed by player, instead of one object
+per player and per match, so fields of 100k players and more stay small in memory:
+    ids (int32): Player ids.
+    scores (int16): Scores in half points, so draws stay exact.
+    balance (int8): Games as white minus games as black.
+    colors (uint32): Color history, bit r set if the player had white in round r.
+    opponents (int32, players x rounds): Packed opponent matrix, the opponent's index in each
+        round, -1 for a round without a game.
+Memory is fixed when the tournament is created: 11 + 4 * rounds bytes per player (47 bytes for 9
+rounds), whatever happens during the simulation.
+
 Classes:
-    Player: Represents a player in the tournament with attributes such as id, name, score, and a list of opponents.
-    Match: Represents a match between two players with a result indicating the winner.
-    Tournament: Manages the players and rounds of matches in the tournament, updates scores, and generates a leaderboard.
+    Tournament: The column-backed state of a tournament: scores, colors and opponents per player.
 
 Functions:
-    pair_players(players): Pairs players for a round based on their scores, ensuring no player competes against the same opponent more than once.
-    print_leaderboard(tournament): Prints the current leaderboard of the tournament.
+    pair_players(tournament): Pairs players for a round based on their scores, ensuring no player competes against the same opponent more than once.
+    play_round(tournament, rng): Pairs a round, draws random results and records them.
+    print_leaderboard(tournament, top): Prints the current leaderboard of the tournament.
 
 Simulation:
-    - Creates a list of 20 players.
-    - Initializes the tournament with these players.
-    - Simulates 7 rounds of matches where players are paired, results are randomly determined, scores are updated, and the leaderboard is printed after each round.
+    - Creates a field of players (20 by default, `--players`).
+    - Simulates rounds of matches (9 by default, `--rounds`) where players are paired, results are randomly determined, scores are updated, and the leaderboard is printed after each round.
+    - Prints the memory used by the tournament state, and the peak of all allocations with `--trace-memory`.
 """
 
-class Player:
-    def __init__(self, id, name):
-        self.id = id
-        self.name = name
-        self.score = 0
-        self.opponents = []
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
 
-    def __str__(self):
-        return self.name
+MAX_ROUNDS = 32
+MIN_PAIRING_WINDOW, PAIRING_WINDOW = 16, 8192
 
-class Match:
-    def __init__(self, player1, player2, result):
-        self.player1 = player1
-        self.player2 = player2
-        self.result = result  # 1 if player1 wins, 0 if draw, -1 if player2 wins
 
 class Tournament:
-    def __init__(self, players):
-        self.players = players
-        self.rounds = []
-
-    def add_round(self, matches):
-        self.rounds.append(matches)
-        self.update_scores(matches)
-
-    def update_scores(self, matches):
-        for match in matches:
-            p1, p2 = match.player1, match.player2
-            if match.result == 1:
-                p1.score += 1
-            elif match.result == -1:
-                p2.score += 1
-            else:
-                p1.score += 0.5
-                p2.score += 0.5
-            p1.opponents.append(p2.id)
-            p2.opponents.append(p1.id)
+    """
+    Players, scores, color history and opponents of a tournament, as parallel NumPy columns.
+
+    Players are addressed by their index in the columns; `ids` maps an index to the player id.
+    """
+
+    def __init__(self, num_players, num_rounds, ids=None):
+        if not 1 <= num_rounds <= MAX_ROUNDS:
+            raise ValueError(f"A tournament has 1 to {MAX_ROUNDS} rounds.")
+        self.ids = np.arange(num_players, dtype=np.int32) if ids is None else np.asarray(ids, dtype=np.int32)
+        self.scores = np.zeros(num_players, dtype=np.int16)
+        self.balance = np.zeros(num_players, dtype=np.int8)
+        self.colors = np.zeros(num_players, dtype=np.uint32)
+        self.opponents = np.full((num_players, num_rounds), -1, dtype=np.int32)
+        self.rounds_played = 0
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def nbytes(self):
+        """Bytes held by the columns."""
+        return sum(column.nbytes for column in (self.ids, self.scores, self.balance, self.colors, self.opponents))
+
+    def name(self, index):
+        return f"Player {self.ids[index]}"
+
+    def score(self, index):
+        return self.scores[index] / 2
+
+    def played(self, a, b):
+        """Whether the players at indexes `a` and `b` have already met."""
+        return bool((self.opponents[a, :self.rounds_played] == b).any())
+
+    def add_round(self, white, black, result):
+        """
+        Record a round of games.
+
+        Args:
+            white, black (ndarray): Player indexes, one game per position.
+            result (ndarray): 1 if white wins, 0 if draw, -1 if black wins.
+        """
+        if self.rounds_played == self.opponents.shape[1]:
+            raise ValueError("All rounds have been played.")
+        current = self.rounds_played
+        points = np.asarray(result, dtype=np.int16) + 1  # White's half points: 2, 1 or 0.
+        self.scores[white] += points
+        self.scores[black] += 2 - points
+        self.opponents[white, current] = black
+        self.opponents[black, current] = white
+        self.colors[white] |= np.uint32(1 << current)
+        self.balance[white] += 1
+        self.balance[black] -= 1
+        self.rounds_played += 1
 
     def get_leaderboard(self):
-        return sorted(self.players, key=lambda p: (-p.score, p.name))
+        """Player indexes ordered by score (best first), then by id."""
+        return np.lexsort((self.ids, -self.scores))
 
 
 # Pairing Logic
 
-def pair_players(players):
-    players.sort(key=lambda p: (-p.score, p.name))
-    pairs = []
-    used = set()
-    for i in range(len(players)):
-        if players[i].id in used:
-            continue
-        for j in range(i+1, len(players)):
-            if players[j].id in used or players[j].id in players[i].opponents:
+def pair_players(tournament):
+    """
+    Pair players top-down by score: each player is paired with the next player on the leaderboard
+    who is neither paired yet nor a previous opponent. The player who had white more often gets
+    black. A player left without an opponent sits the round out.
+
+    Most players simply meet their neighbour on the leaderboard, so free positions are paired two
+    by two with one vectorized rematch check per window of positions. Only at a rematch does the
+    pairing fall back to searching an opponent for that one player. The window doubles after each
+    window without rematches and shrinks back after a rematch, up to `PAIRING_WINDOW` positions.
+
+    Returns:
+        tuple: (white, black) arrays of player indexes.
+    """
+    order = tournament.get_leaderboard().astype(np.int32)
+    opponents = tournament.opponents[:, :tournament.rounds_played]
+    used = np.zeros(len(order), dtype=bool)  # By leaderboard position.
+    white = np.empty(len(order) // 2, dtype=np.int32)
+    black = np.empty(len(order) // 2, dtype=np.int32)
+    paired, start, window = 0, 0, MIN_PAIRING_WINDOW
+    while start < len(order):
+        free = np.flatnonzero(~used[start:start + window]) + start
+        count = len(free) // 2
+        if count:
+            tops, bottoms = order[free[0:2 * count:2]], order[free[1:2 * count:2]]
+            rematch = (opponents[tops] == bottoms[:, None]).any(axis=1)
+            clean = int(np.argmax(rematch)) if rematch.any() else count
+            white[paired:paired + clean] = tops[:clean]
+            black[paired:paired + clean] = bottoms[:clean]
+            paired += clean
+            used[free[:2 * clean]] = True
+            if clean == count:
+                start = free[2 * count - 1] + 1
+                window = min(2 * window, PAIRING_WINDOW)
                 continue
-            pairs.append((players[i], players[j]))
-            used.add(players[i].id)
-            used.add(players[j].id)
-            break
-    return pairs
-
-
-def print_leaderboard(tournament):
-    leaderboard = tournament.get_leaderboard()
-    for rank, player in enumerate(leaderboard, start=1):
-        print(f"{rank}. {player.name} - {player.score} points")
-
-
-import random
-
-# Create players
-players = [Player(id=i, name=f"Player {i}") for i in range(20)]
-
-# Initialize the tournament
-tournament = Tournament(players)
-
-# Simulate multiple rounds
-num_rounds = 9
-for round_num in range(1, num_rounds + 1):
-    print(f"\nRound {round_num}")
-    pairs = pair_players(tournament.players)
-    print("Pairs:")
-    for player1, player2 in pairs:
-        print(f"{player1.name} vs {player2.name}")
-    matches = []
-    for player1, player2 in pairs:
-        # Simulate a match result
-        result = random.choice([1, 0, -1])
-        matches.append(Match(player1, player2, result))
-    tournament.add_round(matches)
-    print_leaderboard(tournament)
+            position = free[2 * clean]
+        elif len(free):
+            position = free[0]
+        else:
+            start += window
+            continue
+
+        window = MIN_PAIRING_WINDOW
+        used[position] = True
+        a = order[position]
+        for candidate in range(position + 1, len(order)):
+            if not used[candidate] and not (opponents[a] == order[candidate]).any():
+                used[candidate] = True
+                white[paired], black[paired] = a, order[candidate]
+                paired += 1
+                break
+        start = position + 1
+
+    white, black = white[:paired], black[:paired]
+    swap = tournament.balance[white] > tournament.balance[black]
+    white[swap], black[swap] = black[swap], white[swap]
+    return white, black
+
+
+def play_round(tournament, rng):
+    """Pair the next round, draw random results and record them. Returns (white, black, result)."""
+    white, black = pair_players(tournament)
+    result = rng.integers(-1, 2, size=len(white), dtype=np.int8)
+    tournament.add_round(white, black, result)
+    return white, black, result
+
+
+def print_leaderboard(tournament, top=None):
+    leaderboard = tournament.get_leaderboard()[:top]
+    for rank, index in enumerate(leaderboard, start=1):
+        print(f"{rank}. {tournament.name(index)} - {tournament.score(index):g} points")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate a Swiss tournament with random results.")
+    parser.add_argument('--players', type=int, default=20)
+    parser.add_argument('--rounds', type=int, default=9)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--top', type=int, default=None, help="Only print the first ranks of the leaderboard.")
+    parser.add_argument('--quiet', action='store_true', help="Only print the final leaderboard and memory use.")
+    parser.add_argument('--trace-memory', action='store_true',
+                        help="Also measure peak allocations with tracemalloc (several times slower).")
+    options = parser.parse_args()
+
+    rng = np.random.default_rng(options.seed)
+    if options.trace_memory:
+        tracemalloc.start()
+    tournament = Tournament(options.players, options.rounds)
+    started = time.perf_counter()
+    for round_num in range(1, options.rounds + 1):
+        white, black, _ = play_round(tournament, rng)
+        if options.quiet:
+            continue
+        print(f"\nRound {round_num}")
+        print("Pairs:")
+        for a, b in zip(white, black):
+            print(f"{tournament.name(a)} vs {tournament.name(b)}")
+        print_leaderboard(tournament, options.top)
+    elapsed = time.perf_counter() - started
+
+    if options.quiet:
+        print_leaderboard(tournament, options.top)
+    print(f"\n{len(tournament)} players, {options.rounds} rounds in {elapsed:.2f}s")
+    print(f"State: {tournament.nbytes} bytes ({tournament.nbytes / len(tournament):.0f} per player)")
+    if options.trace_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"Peak allocations: {peak} bytes ({peak / len(tournament):.0f} per player)")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,257 @@
+"""
+Admin classes of the tournaments app, built to stay responsive with millions of rows.
+
+- Change lists count rows with `EstimatedCountPaginator` and never run the extra unfiltered
+  COUNT(*) (`show_full_result_count = False`).
+- Related rows shown in list columns are joined with `list_select_related`, and columns print
+  names rather than calling chains of `__str__`.
+- Foreign keys to large tables are edited as raw ids. Tournaments are picked with autocomplete.
+- Filters and searches only use indexed columns. The tournament filter offers the latest
+  tournaments instead of one link per tournament. Participants are searched by exact username.
+- Results, pairings, standings and seeds are read-only: they only change through the services,
+  which keep the result log, the standings and `Tournament.version` in step. For the same reason
+  rounds and matches cannot be deleted here, nor participants who have played (that would
+  delete their matches): deleting games would leave their opponents' scores, tiebreaks and the
+  result log behind. Every other save or delete bumps the version of the tournament in the same
+  transaction, so ETags and the warm pairing state (`state.py`) see it. Tournaments are deleted
+  with `services.delete_tournament`.
+
+Classes:
+    EstimatedCountPaginator: Paginator that counts large tables from PostgreSQL's statistics.
+    TournamentFilter: Filters rows by tournament, through the tournament_id index.
+    TournamentRowAdmin: Base class for rows of a tournament, bumping its version on every write.
+    TournamentAdmin, ParticipantAdmin, RoundAdmin, MatchAdmin: The model admins.
+    ResultEventAdmin: Read-only view of the result log.
+"""
+
+import json
+
 from django.contrib import admin
-from .models import Tournament
+from django.core.paginator import Paginator
+from django.db import connection, transaction
+from django.utils.functional import cached_property
+
+from .models import Match, Participant, ResultEvent, Round, Tournament
+from .services import STANDING_FIELDS, delete_tournament
+
+# Below this many rows a change list is counted exactly.
+EXACT_COUNT_LIMIT = 10000
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator whose count is exact up to `EXACT_COUNT_LIMIT` rows and estimated above.
+
+    An unfiltered list is estimated from `pg_class.reltuples`, which costs nothing. A filtered list
+    is counted up to the limit with a LIMITed subquery, and estimated from the query plan above
+    it. Large counts are approximate, so the last page numbers may be off, but no page ever
+    scans a whole table to be counted.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list.order_by()
+        if not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                               [queryset.model._meta.db_table])
+                row = cursor.fetchone()
+            # reltuples is -1 (or 0) until the table has been analyzed.
+            if row and row[0] > EXACT_COUNT_LIMIT:
+                return row[0]
+        exact = queryset[:EXACT_COUNT_LIMIT + 1].count()
+        if exact <= EXACT_COUNT_LIMIT:
+            return exact
+        plan = json.loads(queryset.explain(format='json'))
+        return max(int(plan[0]['Plan']['Plan Rows']), exact)
+
+
+class TournamentFilter(admin.SimpleListFilter):
+    """Filter by tournament, listing the latest tournaments (and the selected one)."""
+    title = 'tournament'
+    parameter_name = 'tournament'
+    choices_limit = 20
+
+    def lookups(self, request, model_admin):
+        tournaments = list(Tournament.objects.order_by('-id').values_list('id', 'name')[:self.choices_limit])
+        if self.value() and self.value().isdigit() and int(self.value()) not in dict(tournaments):
+            tournaments += list(Tournament.objects.filter(id=self.value()).values_list('id', 'name'))
+        return [(str(tournament_id), name) for tournament_id, name in tournaments]
+
+    def queryset(self, request, queryset):
+        if self.value() and self.value().isdigit():
+            return queryset.filter(tournament_id=self.value())
+        return queryset
+
+
+class ScalableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+
+
+class TournamentRowAdmin(ScalableAdmin):
+    """Admin of rows that belong to a tournament: every save and delete bumps the tournament's version."""
+
+    def save_model(self, request, obj, form, change):
+        with transaction.atomic():
+            super().save_model(request, obj, form, change)
+            Tournament.bump_version(obj.tournament_id)
+
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            super().delete_model(request, obj)
+            Tournament.bump_version(obj.tournament_id)
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            tournament_ids = set(queryset.values_list('tournament_id', flat=True))
+            super().delete_queryset(request, queryset)
+            Tournament.bump_version(*tournament_ids)
+
+
+@admin.register(Tournament)
+class TournamentAdmin(ScalableAdmin):
+    list_display = ('id', 'name', 'pairing_system', 'num_of_rounds', 'start_date', 'end_date', 'version')
+    list_filter = ('pairing_system',)
+    search_fields = ('name',)
+    readonly_fields = ('registration_closed_at', 'version', 'updated_at')
+    ordering = ('-id',)
+
+    def save_model(self, request, obj, form, change):
+        with transaction.atomic():
+            super().save_model(request, obj, form, change)
+            if change:
+                Tournament.bump_version(obj.id)
+
+    def get_deleted_objects(self, objs, request):
+        """List the tournaments only: collecting their rows would load every one of them."""
+        objs = list(objs)
+        return [str(obj) for obj in objs], {Tournament._meta.verbose_name_plural: len(objs)}, set(), []
+
+    def delete_model(self, request, obj):
+        delete_tournament(obj.id)
+
+    def delete_queryset(self, request, queryset):
+        for tournament_id in queryset.values_list('id', flat=True):
+            delete_tournament(tournament_id)
+
+
+@admin.register(Participant)
+class ParticipantAdmin(TournamentRowAdmin):
+    list_display = ('id', 'username', 'tournament_name', 'seed', 'score', 'wins', 'draws', 'losses', 'buchholz')
+    list_select_related = ('player__user', 'tournament')
+    list_filter = (TournamentFilter,)
+    search_fields = ('player__user__username',)
+    raw_id_fields = ('player',)
+    autocomplete_fields = ('tournament',)
+    readonly_fields = ('seed', *STANDING_FIELDS)
+    ordering = ('-id',)
+
+    def get_readonly_fields(self, request, obj=None):
+        """A participant cannot move to another tournament: its games stay in the first one."""
+        if obj is None:
+            return self.readonly_fields
+        return ('tournament', *self.readonly_fields)
+
+    def get_search_results(self, request, queryset, search_term):
+        """Search by exact username, through the unique index of auth_user.username."""
+        if not search_term:
+            return queryset, False
+        return queryset.filter(player__user__username=search_term.strip()), False
+
+    @admin.display(description='player', ordering='player__user__username')
+    def username(self, participant):
+        return participant.player.user.username
+
+    @admin.display(description='tournament')
+    def tournament_name(self, participant):
+        return participant.tournament.name
+
+
+@admin.register(Round)
+class RoundAdmin(TournamentRowAdmin):
+    """Rounds are created and closed by pairing them; the admin only shows them."""
+    list_display = ('id', 'tournament_name', 'round_number', 'closed_at', 'rated_at')
+    list_select_related = ('tournament',)
+    list_filter = (TournamentFilter,)
+    readonly_fields = ('tournament', 'round_number', 'closed_at', 'rated_at')
+    ordering = ('-id',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description='tournament')
+    def tournament_name(self, round_obj):
+        return round_obj.tournament.name
+
+
+@admin.register(Match)
+class MatchAdmin(TournamentRowAdmin):
+    """
+    Pairings and results are read-only: results are recorded with `POST /api/matches/<id>/result/`
+    (`services.record_result`), which logs them and updates the standings. Matches cannot be
+    added or deleted.
+    """
+    list_display = ('id', 'tournament_name', 'round_number', 'white_name', 'black_name', 'result', 'played_at')
+    list_select_related = ('tournament', 'round', 'white__player__user', 'black__player__user')
+    list_filter = (TournamentFilter,)
+    readonly_fields = ('tournament', 'round', 'white', 'black', 'winner', 'draw')
+    ordering = ('-id',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description='tournament')
+    def tournament_name(self, match):
+        return match.tournament.name
+
+    @admin.display(description='round')
+    def round_number(self, match):
+        return match.round.round_number
+
+    @admin.display(description='white')
+    def white_name(self, match):
+        return match.white.player.user.username
+
+    @admin.display(description='black')
+    def black_name(self, match):
+        return match.black.player.user.username if match.black_id else 'bye'
+
+    @admin.display(description='result')
+    def result(self, match):
+        if match.black_id is None:
+            return '1-0'
+        if match.draw:
+            return '1/2-1/2'
+        if match.winner_id is None:
+            return '*'
+        return '1-0' if match.winner_id == match.white_id else '0-1'
+
+
+@admin.register(ResultEvent)
+class ResultEventAdmin(ScalableAdmin):
+    """The result log is append-only: events can be listed and inspected, never added, changed or deleted."""
+    list_display = ('id', 'tournament_name', 'match_id', 'round_number', 'kind', 'white_points', 'created_at')
+    list_select_related = ('tournament',)
+    list_filter = (TournamentFilter,)
+    ordering = ('-id',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
 
-admin.site.register(Tournament)
\ No newline at end of file
+    @admin.display(description='tournament')
+    def tournament_name(self, event):
+        return event.tournament.name
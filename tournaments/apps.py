@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class TournamentsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'tournaments'
+
+    def ready(self):
+        # Connect the receivers bumping tournament versions when players change.
+        from . import signals  # noqa: F401
@@ -0,0 +1,318 @@
+"""
+Archive tier: finished tournaments moved out of the hot tables into one compressed blob each.
+
+Archiving a tournament renders what its read endpoints serve, as they serve it: the participant
+list (`TournamentParticipantSerializer`), the standings snapshot of every round
+(`StandingSnapshotSerializer`), the result log (`ResultEventSerializer`) and the NDJSON dump. The
+game scores are added to the same JSON document, which is stored zlib compressed in
+`TournamentArchive`. The participants, rounds, matches, snapshots, result events and game scores
+of the tournament are deleted in the same transaction, so the hot tables only hold live and
+recent events.
+
+The `Tournament` row and its forecast stay. The tournament keeps its id, and the read endpoints
+(participants, standings, events, dump, forecast) serve it from the blob. Player data (ratings,
+countries) is kept as it was at archive time. Anything that writes to the tournament, or reads its
+rows directly, needs them back first: `restore_tournament` reinserts them with their original ids,
+next to the players' current data. The rating history is one of those readers: `rerate_players`
+replays Match rows, so it refuses to run while any tournament is archived, rather than rewrite
+every rating without the archived games. Archiving and restoring both bump the tournament's version, so
+ETags and warm pairing state taken before never match the tournament afterwards.
+
+Functions:
+    is_finished(tournament): Whether every game of a tournament has been played.
+    archive_tournament(tournament_id): Moves one finished tournament into the archive.
+    archive_tournaments(before, progress): Archives every finished tournament that ended before a date.
+    restore_tournament(tournament_id): Moves an archived tournament back into the hot tables.
+    archived_tournament(tournament_id): The archived document of a tournament, or None.
+    ranked_participants(data, chain): The archived participants in leaderboard order.
+    archived_dump(tournament_id, data, chunk_size): Yields the NDJSON dump of an archived tournament.
+"""
+
+import base64
+import json
+import zlib
+from functools import lru_cache
+
+from django.db import connection, transaction
+
+from users.models import Player
+from .dump import DUMP_CHUNK_SIZE, dump_tournament
+from .forecast import compute_forecast
+from .models import (
+    Forecast, GameScore, Match, Participant, ResultEvent, Round, StandingSnapshot, Tournament, TournamentArchive
+)
+from .serializers import ResultEventSerializer, StandingSnapshotSerializer, TournamentParticipantSerializer
+from .services import _write_game_scores, delete_statements
+
+# Models whose rows of an archived tournament live in the blob.
+ARCHIVED_MODELS = (ResultEvent, GameScore, Match, StandingSnapshot, Round, Participant)
+# Decoded archives kept by each process. Archived tournaments never change, so entries are keyed
+# on the archive time and never go stale.
+ARCHIVE_CACHE_SIZE = 16
+
+
+def is_finished(tournament):
+    """
+    Whether every game of a tournament has been played: no match is waiting for a result and,
+    except in arenas, every round is closed.
+    """
+    if Match.objects.filter(tournament_id=tournament.id, black__isnull=False, draw=False, winner__isnull=True).exists():
+        return False
+    if tournament.is_arena:
+        return True
+    rounds = Round.objects.filter(tournament_id=tournament.id)
+    return (rounds.filter(closed_at__isnull=False).count() >= tournament.num_of_rounds
+            and not rounds.filter(closed_at__isnull=True).exists())
+
+
+def _render(tournament_id):
+    """The archive document of a tournament, from its rows."""
+    participants = Participant.objects.filter(tournament_id=tournament_id).select_related('player__user').order_by('id')
+    snapshots = (
+        StandingSnapshot.objects.filter(tournament_id=tournament_id)
+        .select_related('participant__player__user')
+        .order_by('round_number', 'rank')
+    )
+    standings = {}
+    for row in StandingSnapshotSerializer(snapshots, many=True).data:
+        standings.setdefault(str(row['round_number']), []).append(row)
+    game_scores = (
+        GameScore.objects.filter(match__tournament_id=tournament_id).order_by('match_id')
+        .values_list('match_id', 'ply_count', 'moves', 'tags')
+    )
+    events = ResultEvent.objects.filter(tournament_id=tournament_id).order_by('id')
+    dump = b''.join(dump_tournament(tournament_id)).decode()
+    return {
+        'participants': TournamentParticipantSerializer(participants, many=True).data,
+        'standings': standings,
+        'events': ResultEventSerializer(events, many=True).data,
+        # The header line is rendered from the tournament row when the dump is served.
+        'dump': dump.partition('\n')[2],
+        'game_scores': [
+            [match_id, ply_count, base64.b64encode(bytes(moves)).decode(), tags]
+            for match_id, ply_count, moves, tags in game_scores
+        ],
+    }
+
+
+def _bump_version(tournament_id):
+    """
+    Bump the version of a tournament that was archived or restored. No result changed, so a
+    forecast of the previous version is carried over to the new one.
+    """
+    version = Tournament.objects.values_list('version', flat=True).get(id=tournament_id)
+    Tournament.bump_version(tournament_id)
+    Forecast.objects.filter(tournament_id=tournament_id, version=version).update(version=version + 1)
+
+
+def archive_tournament(tournament_id):
+    """
+    Move a finished tournament into the archive, in one transaction.
+
+    A forecast older than the tournament is recomputed first, since it could not be afterwards.
+
+    Returns:
+        dict: The tournament, the number of participants and matches archived and the blob size.
+
+    Raises:
+        Tournament.DoesNotExist: If the tournament does not exist.
+        ValueError: If the tournament is already archived or not finished.
+    """
+    with transaction.atomic():
+        tournament = Tournament.objects.select_for_update().get(id=tournament_id)
+        if TournamentArchive.objects.filter(tournament_id=tournament_id).exists():
+            raise ValueError("The tournament is already archived.")
+        if not is_finished(tournament):
+            raise ValueError("The tournament is not finished.")
+        if not Forecast.objects.filter(tournament_id=tournament_id, version=tournament.version).exists():
+            compute_forecast(tournament_id)
+
+        data = _render(tournament_id)
+        blob = zlib.compress(json.dumps(data, separators=(',', ':')).encode())
+        archive = TournamentArchive.objects.create(
+            tournament_id=tournament_id,
+            participants=len(data['participants']),
+            matches=Match.objects.filter(tournament_id=tournament_id).count(),
+            data=blob,
+        )
+        with connection.cursor() as cursor:
+            for _, sql in delete_statements(ARCHIVED_MODELS):
+                cursor.execute(sql, {'tournament': tournament_id, 'limit': None})
+        _bump_version(tournament_id)
+    return {
+        'tournament': tournament_id,
+        'participants': archive.participants,
+        'matches': archive.matches,
+        'bytes': len(blob),
+    }
+
+
+def archive_tournaments(before, progress=None):
+    """
+    Archive every finished tournament that ended before the date `before`.
+
+    Each tournament is archived in its own transaction. Unfinished ones are skipped.
+
+    Args:
+        progress (callable, optional): Called as `progress(done, total)` after each tournament.
+
+    Returns:
+        dict: The number of tournaments archived and skipped, and the participants and matches moved.
+    """
+    tournament_ids = list(
+        Tournament.objects.filter(end_date__lt=before, archive__isnull=True).order_by('id').values_list('id', flat=True)
+    )
+    summary = {'archived': 0, 'skipped': 0, 'participants': 0, 'matches': 0}
+    for done, tournament_id in enumerate(tournament_ids, start=1):
+        try:
+            result = archive_tournament(tournament_id)
+        except (ValueError, Tournament.DoesNotExist):
+            summary['skipped'] += 1
+        else:
+            summary['archived'] += 1
+            summary['participants'] += result['participants']
+            summary['matches'] += result['matches']
+        if progress is not None:
+            progress(done, len(tournament_ids))
+    return summary
+
+
+def restore_tournament(tournament_id):
+    """
+    Move an archived tournament back into the hot tables, with the ids its rows had, in one
+    transaction.
+
+    Returns:
+        dict: The tournament and the number of participants and matches restored.
+
+    Raises:
+        TournamentArchive.DoesNotExist: If the tournament is not archived.
+        ValueError: If players of the tournament have been deleted since it was archived.
+    """
+    with transaction.atomic():
+        archive = TournamentArchive.objects.select_for_update().get(tournament_id=tournament_id)
+        data = json.loads(zlib.decompress(bytes(archive.data)))
+        rows = {'participant': [], 'round': [], 'match': []}
+        for line in data['dump'].splitlines():
+            row = json.loads(line)
+            rows[row['type']].append(row)
+
+        player_ids = {row['player_id'] for row in rows['participant']}
+        missing = player_ids - set(Player.objects.filter(id__in=player_ids).values_list('id', flat=True))
+        if missing:
+            raise ValueError(
+                f"Players {', '.join(map(str, sorted(missing)))} were deleted after the tournament was archived."
+            )
+
+        def columns(kind, *names):
+            return [[row[name] for row in rows[kind]] for name in names]
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {Participant._meta.db_table} (id, tournament_id, player_id, seed, score, wins, draws, losses,
+                                                           buchholz, sonneborn_berger, progressive)
+                SELECT id, %s, player_id, seed, score, wins, draws, losses, buchholz, sonneborn_berger, progressive
+                FROM unnest(%s::bigint[], %s::bigint[], %s::integer[], %s::float8[], %s::integer[], %s::integer[],
+                            %s::integer[], %s::float8[], %s::float8[], %s::float8[])
+                    AS p(id, player_id, seed, score, wins, draws, losses, buchholz, sonneborn_berger, progressive)
+                """,
+                [tournament_id, *columns('participant', 'id', 'player_id', 'seed', 'score', 'wins', 'draws', 'losses',
+                                         'buchholz', 'sonneborn_berger', 'progressive')],
+            )
+            cursor.execute(
+                f"""
+                INSERT INTO {Round._meta.db_table} (id, tournament_id, round_number, closed_at, rated_at)
+                SELECT id, %s, round_number, closed_at, rated_at
+                FROM unnest(%s::bigint[], %s::integer[], %s::timestamptz[], %s::timestamptz[])
+                    AS r(id, round_number, closed_at, rated_at)
+                """,
+                [tournament_id, *columns('round', 'id', 'round_number', 'closed_at', 'rated_at')],
+            )
+            cursor.execute(
+                f"""
+                INSERT INTO {Match._meta.db_table} (id, tournament_id, round_id, white_id, black_id, winner_id, draw,
+                                                     duration, played_at)
+                SELECT id, %s, round_id, white_id, black_id, winner_id, draw, duration, played_at
+                FROM unnest(%s::bigint[], %s::bigint[], %s::bigint[], %s::bigint[], %s::bigint[], %s::boolean[],
+                            %s::interval[], %s::timestamptz[])
+                    AS m(id, round_id, white_id, black_id, winner_id, draw, duration, played_at)
+                """,
+                [tournament_id, *columns('match', 'id', 'round_id', 'white_id', 'black_id', 'winner_id', 'draw',
+                                         'duration', 'played_at')],
+            )
+            snapshots = [row for rows_of_round in data['standings'].values() for row in rows_of_round]
+            fields = ('participant_id', 'round_number', 'rank', 'score', 'wins', 'draws', 'losses', 'buchholz',
+                      'sonneborn_berger', 'progressive')
+            cursor.execute(
+                f"""
+                INSERT INTO {StandingSnapshot._meta.db_table} (tournament_id, {', '.join(fields)})
+                SELECT %s, {', '.join(fields)}
+                FROM unnest(%s::bigint[], %s::integer[], %s::integer[], %s::float8[], %s::integer[], %s::integer[],
+                            %s::integer[], %s::float8[], %s::float8[], %s::float8[])
+                    AS s({', '.join(fields)})
+                """,
+                [tournament_id, *([row[name] for row in snapshots] for name in fields)],
+            )
+            # Archives written before the result log have no events.
+            events = data.get('events', [])
+            fields = ('id', 'match_id', 'round_number', 'white_id', 'black_id', 'white_points', 'kind', 'created_at',
+                      'created_by_id')
+            cursor.execute(
+                f"""
+                INSERT INTO {ResultEvent._meta.db_table} (tournament_id, {', '.join(fields)})
+                SELECT %s, {', '.join(fields)}
+                FROM unnest(%s::bigint[], %s::bigint[], %s::integer[], %s::bigint[], %s::bigint[], %s::float8[],
+                            %s::text[], %s::timestamptz[], %s::integer[])
+                    AS e({', '.join(fields)})
+                """,
+                [tournament_id, *([row[name] for row in events] for name in fields)],
+            )
+        _write_game_scores([
+            (match_id, ply_count, base64.b64decode(moves), json.dumps(tags))
+            for match_id, ply_count, moves, tags in data['game_scores']
+        ])
+        archive.delete()
+        _bump_version(tournament_id)
+    return {'tournament': tournament_id, 'participants': len(rows['participant']), 'matches': len(rows['match'])}
+
+
+@lru_cache(maxsize=ARCHIVE_CACHE_SIZE)
+def _load(tournament_id, archived_at):
+    blob = TournamentArchive.objects.filter(tournament_id=tournament_id).values_list('data', flat=True).first()
+    return None if blob is None else json.loads(zlib.decompress(bytes(blob)))
+
+
+def archived_tournament(tournament_id):
+    """
+    The archived document of a tournament, or None if it is not archived.
+
+    The document is decoded once per process and shared: callers must not modify it.
+    """
+    archived_at = (
+        TournamentArchive.objects.filter(tournament_id=tournament_id).values_list('archived_at', flat=True).first()
+    )
+    if archived_at is None:
+        return None
+    return _load(int(tournament_id), archived_at)
+
+
+def ranked_participants(data, chain):
+    """
+    The archived participants in leaderboard order: score, then the tiebreak `chain`, then seed
+    (unseeded last) and id, like `tiebreaks.leaderboard_ordering`.
+    """
+    def key(row):
+        return (-row['score'], *(-row[name] for name in chain), row['seed'] is None, row['seed'] or 0, row['id'])
+    return sorted(data['participants'], key=key)
+
+
+def archived_dump(tournament_id, data, chunk_size=DUMP_CHUNK_SIZE):
+    """Yield the NDJSON dump of an archived tournament: the live header line, then the archived lines."""
+    header = b''.join(dump_tournament(tournament_id))
+    if not header:
+        return
+    yield header
+    lines = data['dump'].splitlines(keepends=True)
+    for start in range(0, len(lines), chunk_size):
+        yield ''.join(lines[start:start + chunk_size]).encode()
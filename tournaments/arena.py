@@ -0,0 +1,463 @@
+"""
+Arena tournaments: continuous pairing from an in-memory lobby instead of whole rounds.
+
+Participants of an arena join the lobby and are paired as soon as an opponent is available. When
+a game finishes, both players go straight back to the lobby. The lobby is a heap ordered by score
+(best first), then by waiting time (longest first). A pairing pops two entries and never pairs a
+player with their previous opponent, so each pairing costs O(log n) whatever the number of players
+waiting. Only the last opponent is avoided: two players can meet again once either of them has
+played someone else. A longer window would leave small arenas (three players who all just met)
+without a pairing.
+
+A result reported by a player only counts once the opponent reports the same one, unless the
+reporter loses the game by it (a resignation). Staff results count at once. Until then the game
+stays in progress, with the claim shown to both players.
+
+Pairings do not wait for the database. Match ids are reserved in blocks from the match id
+sequence, so a pairing is answered with its match id at once. The rows are queued on a
+`MatchWriter`, which inserts them in batches from a background thread every
+`settings.ARENA_WRITE_INTERVAL` seconds. All games of an arena belong to its first round.
+
+The lobby lives in the memory of one process. Serve an arena's requests from a single process
+(or route them by tournament) so that every participant waits in the same lobby.
+
+An arena is only used while it matches the database. It records the `Tournament.version` it was
+loaded at, and the versions its own writes produced (match batches and results). When the
+tournament's version moves past them, something else wrote to the tournament (a result corrected
+by an admin, a participant removed, a tournament deleted), and the arena is rebuilt: scores are
+read again and the games in progress are the unfinished matches of the arena's round. Participants
+waiting in the lobby stay in it. Pairings that were never written are lost with the process, so
+their players are 'away' again, not 'playing' a game that does not exist.
+
+Classes:
+    ArenaLobby: The priority queue of waiting participants, without database access.
+    MatchWriter: Batches new matches and inserts them in the background.
+    Arena: Lobby, scores and current games of one arena tournament.
+
+Functions:
+    get_arena(tournament_id): The arena of a tournament in this process, rebuilt when the tournament changed.
+"""
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Match, Participant, Round, Tournament
+from .services import record_result
+
+logger = logging.getLogger(__name__)
+
+MATCH_ID_BLOCK = 100
+
+
+class ArenaLobby:
+    """
+    Waiting participants of an arena, as a heap of (-score, ticket, participant_id) entries.
+
+    Tickets increase with every join, so among equal scores the participant waiting longest comes
+    first. Leaving only forgets the participant's ticket; its entry is dropped when it reaches the
+    top of the heap.
+
+    Attributes:
+        heap (list): The entries, a binary heap.
+        tickets (dict): Maps a waiting participant id to the ticket of its live entry.
+        last_opponent (dict): Maps a participant id to its previous opponent, the only one it is
+            not paired with.
+        color_balance (dict): Maps a participant id to (games as white - games as black).
+    """
+
+    def __init__(self):
+        self.heap = []
+        self.tickets = {}
+        self.last_opponent = {}
+        self.color_balance = {}
+        self._counter = itertools.count()
+
+    def __len__(self):
+        return len(self.tickets)
+
+    def __contains__(self, participant_id):
+        return participant_id in self.tickets
+
+    def join(self, participant_id, score):
+        """Queue a participant with its current score; joining again keeps the first ticket."""
+        if participant_id in self.tickets:
+            return
+        ticket = next(self._counter)
+        self.tickets[participant_id] = ticket
+        heapq.heappush(self.heap, (-score, ticket, participant_id))
+
+    def leave(self, participant_id):
+        """Remove a participant from the lobby, if it is waiting."""
+        self.tickets.pop(participant_id, None)
+
+    def _pop(self):
+        while self.heap:
+            entry = heapq.heappop(self.heap)
+            if self.tickets.get(entry[2]) == entry[1]:
+                return entry
+        return None
+
+    def pair(self):
+        """
+        Pair waiting participants in priority order.
+
+        Each participant at the top of the heap is paired with the next one that was not its
+        previous opponent. Participants left without an opponent keep their place in the lobby.
+
+        Returns:
+            list: (white_id, black_id) tuples. The participant with fewer games as white gets
+                white, the one with the higher priority on equal balance.
+        """
+        pairs, unpaired = [], []
+        while (first := self._pop()) is not None:
+            held, second = [], None
+            while (candidate := self._pop()) is not None:
+                if self.last_opponent.get(first[2]) == candidate[2]:
+                    held.append(candidate)
+                    continue
+                second = candidate
+                break
+            for entry in held:
+                heapq.heappush(self.heap, entry)
+            if second is None:
+                unpaired.append(first)
+                break
+            a, b = first[2], second[2]
+            del self.tickets[a], self.tickets[b]
+            if self.color_balance.get(a, 0) > self.color_balance.get(b, 0):
+                a, b = b, a
+            self.color_balance[a] = self.color_balance.get(a, 0) + 1
+            self.color_balance[b] = self.color_balance.get(b, 0) - 1
+            self.last_opponent[a], self.last_opponent[b] = b, a
+            pairs.append((a, b))
+        for entry in unpaired:
+            heapq.heappush(self.heap, entry)
+        return pairs
+
+
+class MatchWriter:
+    """
+    Inserts arena matches in batches.
+
+    Rows are queued with `submit` and written by `flush`, which a daemon thread calls every
+    `interval` seconds. Any thread can also flush, e.g. before reading back a match it just
+    queued. Each batch is a single INSERT ... SELECT FROM unnest() statement, followed by one
+    version bump per tournament, whose new versions are reported to the arenas once committed.
+    A batch that fails is queued again.
+    """
+
+    def __init__(self, interval=None):
+        self.interval = interval
+        self.pending = []
+        self.lock = threading.Lock()
+        self.write_lock = threading.RLock()
+        if interval:
+            threading.Thread(target=self._run, name='arena-match-writer', daemon=True).start()
+
+    def submit(self, row):
+        """Queue a match, given as (id, tournament_id, round_id, white_id, black_id, played_at)."""
+        with self.lock:
+            self.pending.append(row)
+
+    def flush(self):
+        """Insert every queued match. Returns the number of matches written."""
+        with self.write_lock:
+            with self.lock:
+                rows, self.pending = self.pending, []
+            if not rows:
+                return 0
+            try:
+                self._write(rows)
+            except Exception:
+                with self.lock:
+                    self.pending[:0] = rows
+                raise
+            return len(rows)
+
+    def _write(self, rows):
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {Match._meta.db_table} (id, tournament_id, round_id, white_id, black_id, draw, played_at)
+                SELECT id, tournament_id, round_id, white_id, black_id, false, played_at
+                FROM unnest(%s::bigint[], %s::bigint[], %s::bigint[], %s::bigint[], %s::bigint[], %s::timestamptz[])
+                    AS m(id, tournament_id, round_id, white_id, black_id, played_at)
+                """,
+                [list(column) for column in zip(*rows)],
+            )
+            cursor.execute(
+                f"""
+                UPDATE {Tournament._meta.db_table} SET version = version + 1, updated_at = %s
+                WHERE id = ANY(%s) RETURNING id, version
+                """,
+                [timezone.now(), sorted({row[1] for row in rows})],
+            )
+            versions = cursor.fetchall()
+        for tournament_id, version in versions:
+            with _registry_lock:
+                arena = _arenas.get(tournament_id)
+            if arena is not None:
+                arena.wrote(version)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Writing arena matches failed; retrying with a new connection")
+                connection.close()
+
+
+_writer = None
+_arenas = {}
+_registry_lock = threading.Lock()
+
+
+def _match_writer():
+    global _writer
+    with _registry_lock:
+        if _writer is None:
+            _writer = MatchWriter(getattr(settings, 'ARENA_WRITE_INTERVAL', 0.25))
+        return _writer
+
+
+class Arena:
+    """
+    The live state of one arena tournament in this process.
+
+    Attributes:
+        tournament_id (int): The arena tournament.
+        round_id (int): The round all games of the arena are recorded in.
+        lobby (ArenaLobby): Participants waiting for a game.
+        scores (dict): Maps a participant id to its score, loaded on first use.
+        games (dict): Maps a participant id to its current game, a dict with id, white_id and black_id.
+        matches (dict): Maps the match id of each current game to the game.
+        claims (dict): Maps a match id to the unconfirmed result reported for it, a dict with
+            participant_id, white_points and forfeit.
+        version (int): The tournament version up to which every write is known to the arena.
+        written (set): Versions produced by the arena's own writes, beyond `version`.
+    """
+
+    def __init__(self, tournament_id, writer, version):
+        self.tournament_id = tournament_id
+        self.round_id = Round.objects.get_or_create(tournament_id=tournament_id, round_number=1)[0].id
+        self.writer = writer
+        self.lobby = ArenaLobby()
+        self.scores = {}
+        self.games = {}
+        self.matches = {}
+        self.claims = {}
+        self.match_ids = []
+        self.version = version
+        self.written = set()
+        self.lock = threading.Lock()
+        self.version_lock = threading.Lock()
+        self._load_games()
+
+    def _load_games(self):
+        """Replay the matches of the arena's round: colors, previous opponents and games in progress."""
+        matches = (
+            Match.objects.filter(round_id=self.round_id, black__isnull=False)
+            .order_by('id').values_list('id', 'white_id', 'black_id', 'winner_id', 'draw')
+        )
+        balance, last_opponent = self.lobby.color_balance, self.lobby.last_opponent
+        for match_id, white_id, black_id, winner_id, draw in matches:
+            balance[white_id] = balance.get(white_id, 0) + 1
+            balance[black_id] = balance.get(black_id, 0) - 1
+            last_opponent[white_id], last_opponent[black_id] = black_id, white_id
+            if winner_id is None and not draw:
+                game = {'id': match_id, 'white_id': white_id, 'black_id': black_id}
+                self.games[white_id] = self.games[black_id] = self.matches[match_id] = game
+        self.scores.update(Participant.objects.filter(id__in=self.games).values_list('id', 'score'))
+
+    def _score(self, participant_id):
+        if participant_id not in self.scores:
+            self.scores[participant_id] = Participant.objects.values_list('score', flat=True).get(id=participant_id)
+        return self.scores[participant_id]
+
+    def wrote(self, version):
+        """Record a tournament version produced by a write of this arena."""
+        with self.version_lock:
+            if version > self.version:
+                self.written.add(version)
+
+    def is_current(self, version):
+        """Whether every write up to `version` of the tournament is one the arena knows of."""
+        with self.version_lock:
+            while self.version + 1 in self.written:
+                self.version += 1
+                self.written.discard(self.version)
+            return self.version == version
+
+    def _next_match_id(self):
+        if not self.match_ids:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT nextval(pg_get_serial_sequence(%s, 'id')) FROM generate_series(1, %s)",
+                    [Match._meta.db_table, MATCH_ID_BLOCK],
+                )
+                self.match_ids = [row[0] for row in reversed(cursor.fetchall())]
+        return self.match_ids.pop()
+
+    def _pair(self):
+        now = timezone.now()
+        for white_id, black_id in self.lobby.pair():
+            game = {'id': self._next_match_id(), 'white_id': white_id, 'black_id': black_id}
+            self.games[white_id] = self.games[black_id] = self.matches[game['id']] = game
+            self.writer.submit((game['id'], self.tournament_id, self.round_id, white_id, black_id, now))
+
+    def status(self, participant_id):
+        """The participant's current game, or its lobby status: 'playing', 'waiting' or 'away'."""
+        with self.lock:
+            if participant_id in self.games:
+                game = self.games[participant_id]
+                if game['id'] in self.claims:
+                    return {'status': 'playing', 'match': game, 'claim': self.claims[game['id']]}
+                return {'status': 'playing', 'match': game}
+            return {'status': 'waiting' if participant_id in self.lobby else 'away', 'match': None}
+
+    def join(self, participant_id):
+        """Put a participant in the lobby, pair whoever can be paired, and return its status."""
+        with self.lock:
+            if participant_id not in self.games:
+                self.lobby.join(participant_id, self._score(participant_id))
+                self._pair()
+        return self.status(participant_id)
+
+    def leave(self, participant_id):
+        """Take a participant out of the lobby; a game in progress is not affected."""
+        with self.lock:
+            self.lobby.leave(participant_id)
+
+    def report(self, match_id, participant_id, white_points, forfeit=False, user=None):
+        """
+        Report the result of a participant's current game, as one of its players.
+
+        The result is recorded when the reporter loses by it, or when the opponent reported the
+        same result before. Otherwise it waits for the opponent's confirmation, replacing any
+        earlier claim.
+
+        Returns:
+            Match: The match with its result, or None if the result waits for confirmation.
+
+        Raises:
+            ValueError: If the match is not the participant's game in progress, or the result is invalid.
+        """
+        with self.lock:
+            game = self.matches.get(match_id)
+            if game is None or participant_id not in (game['white_id'], game['black_id']):
+                raise ValueError("This match is not a game in progress in the arena.")
+            own_points = white_points if participant_id == game['white_id'] else 1 - white_points
+            claim = self.claims.get(match_id)
+            confirmed = (claim is not None and claim['participant_id'] != participant_id
+                         and (claim['white_points'], claim['forfeit']) == (white_points, forfeit))
+            if own_points != 0 and not confirmed:
+                self.claims[match_id] = {'participant_id': participant_id, 'white_points': white_points,
+                                         'forfeit': forfeit}
+                return None
+        return self.finish(match_id, white_points, forfeit=forfeit, user=user)
+
+    def finish(self, match_id, white_points, forfeit=False, user=None):
+        """
+        Record the result of a current game and put both players back in the lobby.
+
+        The game is taken out of `matches` under the arena's lock, so it is finished once. Queued
+        matches are written and the result is recorded without the lock, so that the lobby does
+        not wait for the database; the game is put back if that fails.
+
+        Returns:
+            Match: The match with its result.
+
+        Raises:
+            ValueError: If the match is not a current game of this arena, or the result is invalid.
+        """
+        with self.lock:
+            game = self.matches.pop(match_id, None)
+            if game is None:
+                raise ValueError("This match is not a game in progress in the arena.")
+        try:
+            self.writer.flush()
+            match = self._record(match_id, white_points, forfeit, user)
+        except Exception:
+            with self.lock:
+                self.matches[match_id] = game
+            raise
+        with self.lock:
+            self.claims.pop(match_id, None)
+            white_id, black_id = game['white_id'], game['black_id']
+            self.scores[white_id] = self._score(white_id) + white_points
+            self.scores[black_id] = self._score(black_id) + 1 - white_points
+            for participant_id in (white_id, black_id):
+                del self.games[participant_id]
+                self.lobby.join(participant_id, self.scores[participant_id])
+            self._pair()
+        return match
+
+    def _record(self, match_id, white_points, forfeit, user):
+        with transaction.atomic():
+            unfinished = Match.objects.select_for_update().filter(
+                id=match_id, winner__isnull=True, draw=False
+            ).exists()
+            version = Tournament.objects.values_list('version', flat=True).get(id=self.tournament_id)
+            match = record_result(match_id, white_points, forfeit=forfeit, user=user)
+            recorded = Tournament.objects.values_list('version', flat=True).get(id=self.tournament_id)
+        # Recording a first result bumps the version once; anything else was another writer.
+        if unfinished and recorded == version + 1:
+            self.wrote(recorded)
+        return match
+
+
+def get_arena(tournament_id):
+    """
+    The arena of a tournament in this process, created on first use and rebuilt from the database
+    when the tournament's version shows writes the arena did not make.
+
+    Raises:
+        Tournament.DoesNotExist: If the tournament does not exist.
+        ValueError: If the tournament is not an arena.
+    """
+    row = Tournament.objects.filter(id=tournament_id).values_list('pairing_system', 'version').first()
+    if row is None or row[0] != Tournament.ARENA:
+        with _registry_lock:
+            _arenas.pop(tournament_id, None)
+        if row is None:
+            raise Tournament.DoesNotExist(f"Tournament {tournament_id} does not exist.")
+        raise ValueError("The tournament is not an arena.")
+    with _registry_lock:
+        arena = _arenas.get(tournament_id)
+    if arena is not None and arena.is_current(row[1]):
+        return arena
+    return _rebuild(tournament_id, arena)
+
+
+def _rebuild(tournament_id, stale):
+    """Load the arena of a tournament from the database, keeping the lobby of the arena it replaces."""
+    writer = _match_writer()
+    # Holding the writer keeps batches (and their version bumps) out of the load.
+    with writer.write_lock:
+        writer.flush()
+        with _registry_lock:
+            current = _arenas.get(tournament_id)
+        if current is not None and current is not stale:
+            return current
+        version = Tournament.objects.values_list('version', flat=True).get(id=tournament_id)
+        arena = Arena(tournament_id, writer, version)
+        if stale is not None:
+            with stale.lock:
+                waiting = sorted(stale.lobby.tickets, key=stale.lobby.tickets.get)
+                arena.claims = {match_id: claim for match_id, claim in stale.claims.items() if match_id in arena.matches}
+            arena.scores.update(Participant.objects.filter(id__in=waiting).values_list('id', 'score'))
+            for participant_id in waiting:
+                if participant_id in arena.scores and participant_id not in arena.games:
+                    arena.lobby.join(participant_id, arena.scores[participant_id])
+        with _registry_lock:
+            _arenas[tournament_id] = arena
+    return arena
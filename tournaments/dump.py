@@ -0,0 +1,128 @@
+"""
+Streaming NDJSON dump of a whole tournament.
+
+A dump is one JSON object per line: a `tournament` header, then every `participant`, `round` and
+`match` of the tournament, each with a `type` key. PostgreSQL renders each row as JSON text
+(`json_build_object`), and the rows are read in chunks through server-side cursors
+(`connection.chunked_cursor()`), so the Python side only concatenates strings. Memory stays
+constant whatever the size of the tournament.
+
+All tables are read in one REPEATABLE READ transaction when the dump is not nested in another
+transaction, so the dump is a consistent snapshot that matches the `version` of its header.
+
+Classes:
+    NDJSONRenderer: Renders error responses of the dump endpoint as a single NDJSON line.
+
+Functions:
+    dump_tournament(tournament_id, chunk_size): Yields the NDJSON dump as byte chunks.
+    gzip_chunks(chunks, level): Compresses a stream of byte chunks into one gzip stream.
+"""
+
+import zlib
+
+from django.db import connection, transaction
+from rest_framework.renderers import JSONRenderer
+
+from users.models import Player
+from .models import Match, Participant, Round, Tournament
+
+DUMP_CHUNK_SIZE = 5000
+NDJSON_CONTENT_TYPE = 'application/x-ndjson'
+
+# (type, SQL producing one JSON text per row for the tournament given as %(tournament)s)
+SECTIONS = (
+    ('tournament', f"""
+        SELECT json_build_object(
+            'type', 'tournament', 'id', id, 'name', name, 'start_date', start_date, 'end_date', end_date,
+            'num_of_rounds', num_of_rounds, 'pairing_system', pairing_system, 'cycles', cycles,
+            'tiebreaks', tiebreaks,
+            'registration_closed_at', registration_closed_at, 'version', version, 'updated_at', updated_at
+        )::text
+        FROM {Tournament._meta.db_table}
+        WHERE id = %(tournament)s
+    """),
+    ('participant', f"""
+        SELECT json_build_object(
+            'type', 'participant', 'id', p.id, 'player_id', p.player_id, 'rating', pl.rating,
+            'country', pl.country, 'seed', p.seed, 'score', p.score, 'wins', p.wins, 'draws', p.draws,
+            'losses', p.losses, 'buchholz', p.buchholz, 'sonneborn_berger', p.sonneborn_berger,
+            'progressive', p.progressive
+        )::text
+        FROM {Participant._meta.db_table} AS p
+        JOIN {Player._meta.db_table} AS pl ON pl.id = p.player_id
+        WHERE p.tournament_id = %(tournament)s
+        ORDER BY p.id
+    """),
+    ('round', f"""
+        SELECT json_build_object(
+            'type', 'round', 'id', id, 'round_number', round_number, 'closed_at', closed_at,
+            'rated_at', rated_at
+        )::text
+        FROM {Round._meta.db_table}
+        WHERE tournament_id = %(tournament)s
+        ORDER BY round_number
+    """),
+    ('match', f"""
+        SELECT json_build_object(
+            'type', 'match', 'id', id, 'round_id', round_id, 'white_id', white_id, 'black_id', black_id,
+            'winner_id', winner_id, 'draw', draw, 'duration', duration, 'played_at', played_at
+        )::text
+        FROM {Match._meta.db_table}
+        WHERE tournament_id = %(tournament)s
+        ORDER BY round_id, id
+    """),
+)
+
+
+def _section_chunks(sql, tournament_id, chunk_size):
+    """Run `sql` on a server-side cursor and yield its JSON rows as newline terminated byte chunks."""
+    with connection.chunked_cursor() as cursor:
+        cursor.execute(sql, {'tournament': tournament_id})
+        while rows := cursor.fetchmany(chunk_size):
+            yield ("\n".join(row[0] for row in rows) + "\n").encode()
+
+
+def dump_tournament(tournament_id, chunk_size=DUMP_CHUNK_SIZE):
+    """
+    Yield the NDJSON dump of a tournament as byte chunks of up to `chunk_size` lines.
+
+    Nothing is yielded if the tournament does not exist. The generator holds a database
+    transaction open until it is exhausted or closed.
+    """
+    isolate = not connection.in_atomic_block
+    with transaction.atomic():
+        if isolate:
+            with connection.cursor() as cursor:
+                cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY")
+        for kind, sql in SECTIONS:
+            chunks = _section_chunks(sql, tournament_id, chunk_size)
+            if kind == 'tournament':
+                header = next(chunks, None)
+                chunks.close()
+                if header is None:
+                    return
+                yield header
+                continue
+            yield from chunks
+
+
+def gzip_chunks(chunks, level=6):
+    """Compress a stream of byte chunks into a single gzip stream, chunk by chunk."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+class NDJSONRenderer(JSONRenderer):
+    """
+    Lets clients ask for `application/x-ndjson`. Dumps are streamed without a renderer; this one only
+    renders error responses, as one JSON line.
+    """
+    media_type = NDJSON_CONTENT_TYPE
+    format = 'ndjson'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return super().render(data, accepted_media_type, renderer_context) + b"\n"
@@ -0,0 +1,65 @@
+"""
+Conditional GET for tournament reads, driven by the tournament's version stamp.
+
+Every write to a tournament, its participants, rounds or matches increments `Tournament.version`
+in the same transaction (see `Tournament.bump_version`). Responses derived from a tournament carry
+a strong ETag built from that version, and a request whose `If-None-Match` matches is answered
+with 304 after a single indexed lookup of the version, before the view queries or serializes
+anything else.
+
+The version is read before the payload, so a write committed in between can only make the ETag
+older than the body. The next request then simply downloads the body again.
+
+Functions:
+    tournament_etag(tournament_id, request): The ETag of a tournament representation, or None.
+    conditional(view_method): Decorator adding ETags and 304 answers to a view method.
+"""
+
+from functools import wraps
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+
+from .models import Tournament
+
+
+def tournament_etag(tournament_id, request):
+    """
+    Strong ETag of a tournament representation: the tournament id, its version and the negotiated
+    format, so the JSON and browsable renderings of a URL never share a tag.
+
+    Returns:
+        str: The quoted ETag, or None if the tournament does not exist.
+    """
+    try:
+        tournament_id = int(tournament_id)
+    except (TypeError, ValueError):
+        return None
+    version = Tournament.objects.filter(pk=tournament_id).values_list('version', flat=True).first()
+    if version is None:
+        return None
+    renderer = getattr(request, 'accepted_renderer', None)
+    return quote_etag(f"{tournament_id}.{version}.{getattr(renderer, 'format', '')}")
+
+
+def conditional(view_method):
+    """
+    Answer a GET of a tournament resource (`pk` in the URL) with 304 Not Modified when the
+    request's `If-None-Match` holds the current ETag, and tag successful responses otherwise.
+
+    Authentication, permissions and content negotiation have already run when the view method is
+    called, so a 304 is only sent to clients allowed to read the resource.
+    """
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        etag = tournament_etag(kwargs.get('pk'), request)
+        if etag is None:
+            return view_method(self, request, *args, **kwargs)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = view_method(self, request, *args, **kwargs)
+            if not 200 <= response.status_code < 300:
+                return response
+        response['ETag'] = etag
+        return response
+    return wrapper
@@ -0,0 +1,119 @@
+"""
+The append-only result log of tournaments (`ResultEvent`).
+
+Every result written to a match appends an event with the match's players, round and white's
+points: `set` for a first result, `corrected` when it replaces one, `forfeit` for a game won
+or lost without play. Events are never updated or deleted one by one, so the log is the audit trail
+of a tournament. Participant scores, W/D/L and tiebreaks are its projections: they are updated
+incrementally as results come in, and `services.replay_tournament` rebuilds them from the log.
+
+A replay takes the last event of each match, in one DISTINCT ON scan of the (tournament, match, id)
+index, and recomputes every projection in one vectorized pass (`tiebreaks.batch_tiebreaks`).
+
+Functions:
+    append_results(tournament_id, rows, kind, user): Appends many events with one INSERT.
+    match_results(matches, round_number): Event rows of Match instances that have a result.
+    final_results(tournament_id, until): The last result of each match, as of an event.
+    results_since(tournament_id, after): The events appended after an event, oldest first.
+    replay(tournament_id, until): Standings and tiebreaks of every participant, computed from the log.
+"""
+
+from django.db import connection
+from django.utils import timezone
+
+from .models import Match, Participant, ResultEvent
+from .standings import game_points
+from .tiebreaks import batch_tiebreaks
+
+
+def append_results(tournament_id, rows, kind=ResultEvent.SET, user=None):
+    """
+    Append result events with a single INSERT ... SELECT FROM unnest() statement.
+
+    Args:
+        rows (iterable): (match_id, round_number, white_id, black_id, white_points) tuples;
+            black_id is None for a bye.
+        kind (str): The kind of every event.
+        user (User, optional): Who recorded the results.
+
+    Returns:
+        int: The number of events appended.
+    """
+    rows = list(rows)
+    if not rows:
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {ResultEvent._meta.db_table} (tournament_id, match_id, round_number, white_id, black_id,
+                                                       white_points, kind, created_at, created_by_id)
+            SELECT %s, match_id, round_number, white_id, black_id, white_points, %s, %s, %s
+            FROM unnest(%s::bigint[], %s::integer[], %s::bigint[], %s::bigint[], %s::float8[])
+                AS e(match_id, round_number, white_id, black_id, white_points)
+            """,
+            [tournament_id, kind, timezone.now(), getattr(user, 'pk', None), *(list(column) for column in zip(*rows))],
+        )
+    return len(rows)
+
+
+def match_results(matches, round_number):
+    """Event rows of the given Match instances of one round that have a result."""
+    rows = []
+    for match in matches:
+        points = game_points(match.white_id, match.black_id, match.winner_id, match.draw)
+        if points is not None:
+            rows.append((match.id, round_number, match.white_id, match.black_id, points))
+    return rows
+
+
+def final_results(tournament_id, until=None):
+    """
+    The current result of each match of a tournament according to its log: the last event of
+    each match that still exists.
+
+    Args:
+        until (int, optional): Ignore events after this event id, to see results as they were then.
+
+    Returns:
+        list: (white_id, black_id, white_points, round_number) tuples in match id order; black_id is
+            None for a bye.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT DISTINCT ON (e.match_id) e.white_id, e.black_id, e.white_points, e.round_number
+            FROM {ResultEvent._meta.db_table} AS e
+            JOIN {Match._meta.db_table} AS m ON m.id = e.match_id
+            WHERE e.tournament_id = %(tournament)s AND (%(until)s IS NULL OR e.id <= %(until)s)
+            ORDER BY e.match_id, e.id DESC
+            """,
+            {'tournament': tournament_id, 'until': until},
+        )
+        return cursor.fetchall()
+
+
+def results_since(tournament_id, after):
+    """
+    The events of a tournament appended after the event `after` (an id, 0 for all), oldest first,
+    as (match_id, white_points) tuples.
+    """
+    return list(
+        ResultEvent.objects.filter(tournament_id=tournament_id, id__gt=after)
+        .order_by('id').values_list('match_id', 'white_points')
+    )
+
+
+def replay(tournament_id, until=None):
+    """
+    Compute score, W/D/L and tiebreaks of every participant of a tournament from its result log.
+
+    Args:
+        until (int, optional): Replay the log up to this event id only.
+
+    Returns:
+        tuple: (rows, games): one dict per participant with participant_id and every standings
+            field, and the number of games replayed.
+    """
+    participant_ids = list(Participant.objects.filter(tournament_id=tournament_id).values_list('id', flat=True))
+    games = final_results(tournament_id, until)
+    return batch_tiebreaks(participant_ids, games), len(games)
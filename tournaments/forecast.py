@@ -0,0 +1,218 @@
+"""
+Win-probability forecasts: Monte Carlo simulations of the rest of a tournament.
+
+A forecast starts from the current participant scores, plays the games already paired but not
+finished, then the remaining rounds, many times over. Each game is decided by the players' Elo
+expected score (`ratings.expected_score`), with a share of draws. Future rounds are paired Swiss
+style, by simulated score, without rematch avoidance. Final ties are broken at random rather
+than by the tiebreak chain. All simulations run at once as NumPy arrays of shape (simulations,
+participants).
+
+Forecasts are expensive, so they are stored in `Forecast` with the tournament version they were
+simulated from, and served from there (and from the cache backend, keyed on the version) until
+the tournament changes. The first request after a change queues one recomputation job and keeps
+getting the previous forecast, marked stale, until the job finishes.
+
+Functions:
+    simulate(scores, ratings, pending, rounds_left, simulations, rng): The vectorized simulation.
+    compute_forecast(tournament_id, simulations, seed): Simulates a tournament and stores the forecast.
+    request_forecast(tournament_id, version, user): Queues a recomputation once per version.
+    cached_forecast(tournament_id, user): The current forecast, from cache when possible.
+"""
+
+from datetime import timedelta
+
+import numpy as np
+from django.core.cache import cache
+from django.db.models import Q
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from jobs.queue import enqueue
+from .models import Forecast, Match, Participant, Tournament
+from .ratings import DEFAULT_RATING, expected_score
+
+DRAW_RATE = 0.25
+# Simulations are capped so that the (simulations, participants) score matrix stays around 40 MB.
+MAX_SIMULATIONS, MIN_SIMULATIONS, SIMULATION_CELLS = 10000, 500, 5_000_000
+TOP = 3
+CACHE_TIMEOUT = 600
+# A claimed recomputation that has not produced a forecast after this long is requested again.
+REQUEST_RETRY = timedelta(minutes=10)
+
+
+def _play(white, black, ratings, rng):
+    """White's points in games between participant index arrays `white` and `black`."""
+    expected = expected_score(ratings[white], ratings[black])
+    draw = DRAW_RATE * 2 * np.minimum(expected, 1 - expected)
+    win = expected - draw / 2
+    draws = rng.random(expected.shape)
+    return np.where(draws < win, 1.0, np.where(draws < win + draw, 0.5, 0.0))
+
+
+def simulate(scores, ratings, pending, rounds_left, simulations, rng):
+    """
+    Simulate the rest of a tournament.
+
+    Args:
+        scores (ndarray): Current score of each participant.
+        ratings (ndarray): Rating of each participant.
+        pending (tuple): (white, black) participant index arrays of paired games without a result.
+        rounds_left (int): Rounds not paired yet.
+        simulations (int): Number of simulated tournaments.
+        rng (numpy.random.Generator): Random source.
+
+    Returns:
+        tuple: (win, top, expected) arrays: the share of simulations each participant finishes
+            first and in the top `TOP`, and their mean final score.
+    """
+    n = len(scores)
+    total = np.tile(np.asarray(scores, dtype=np.float64), (simulations, 1))
+    ratings = np.asarray(ratings, dtype=np.float64)
+    rows = np.arange(simulations)[:, None]
+
+    white, black = pending
+    if len(white):
+        white = np.broadcast_to(white, (simulations, len(white)))
+        black = np.broadcast_to(black, (simulations, len(black)))
+        points = _play(white, black, ratings, rng)
+        # A participant can have unfinished games in several rounds, so indexes may repeat.
+        np.add.at(total, (rows, white), points)
+        np.add.at(total, (rows, black), 1 - points)
+
+    for _ in range(rounds_left):
+        # Scores are multiples of 0.5, so the noise only breaks ties, at random.
+        order = np.argsort(-(total + rng.random(total.shape) * 0.1), axis=1)
+        if n % 2:
+            total[rows[:, 0], order[:, -1]] += 1.0
+            order = order[:, :-1]
+        white, black = order[:, 0::2], order[:, 1::2]
+        points = _play(white, black, ratings, rng)
+        total[rows, white] += points
+        total[rows, black] += 1 - points
+
+    order = np.argsort(-(total + rng.random(total.shape) * 0.1), axis=1)
+    win = np.bincount(order[:, 0], minlength=n) / simulations
+    top = np.bincount(order[:, :TOP].ravel(), minlength=n) / simulations
+    return win, top, total.mean(axis=0)
+
+
+def compute_forecast(tournament_id, simulations=None, seed=None):
+    """
+    Simulate the rest of a tournament and store the forecast with the version it was computed from.
+
+    The version is read before the data, so a result recorded meanwhile leaves the stored forecast
+    older than the tournament, and the next request asks for a new one. A forecast never replaces
+    one computed from a newer version.
+
+    Returns:
+        dict: The tournament, the version and the number of simulations.
+    """
+    tournament = Tournament.objects.only('num_of_rounds', 'version').get(id=tournament_id)
+    version = tournament.version
+    rows = list(
+        Participant.objects.filter(tournament_id=tournament_id).order_by('id')
+        .values_list('id', 'player__user__username', 'score', Coalesce('player__rating', DEFAULT_RATING))
+    )
+    ids = [row[0] for row in rows]
+    index = {pid: i for i, pid in enumerate(ids)}
+    scores = np.array([row[2] for row in rows], dtype=np.float64)
+    ratings = np.array([row[3] for row in rows], dtype=np.float64)
+
+    matches = Match.objects.filter(tournament_id=tournament_id)
+    rounds_left = max(tournament.num_of_rounds - matches.values('round_id').distinct().count(), 0)
+    unfinished = list(matches.filter(black__isnull=False, draw=False, winner__isnull=True).values_list('white_id', 'black_id'))
+    pending = (
+        np.array([index[white] for white, _ in unfinished], dtype=np.int64),
+        np.array([index[black] for _, black in unfinished], dtype=np.int64),
+    )
+
+    if simulations is None:
+        simulations = int(np.clip(SIMULATION_CELLS // max(len(ids), 1), MIN_SIMULATIONS, MAX_SIMULATIONS))
+    if len(ids) >= 2:
+        win, top, expected = simulate(scores, ratings, pending, rounds_left, simulations, np.random.default_rng(seed))
+    else:
+        win = top = np.ones(len(ids))
+        expected = scores
+
+    participants = sorted(
+        (
+            {
+                'participant_id': pid,
+                'username': username,
+                'score': score,
+                'rating': int(rating),
+                'expected_score': round(float(expected[i]), 2),
+                'win': round(float(win[i]), 4),
+                f'top{TOP}': round(float(top[i]), 4),
+            }
+            for i, (pid, username, score, rating) in enumerate(rows)
+        ),
+        key=lambda row: (-row['win'], -row[f'top{TOP}'], -row['expected_score'], row['participant_id']),
+    )
+    now = timezone.now()
+    data = {
+        'tournament': tournament_id,
+        'version': version,
+        'computed_at': now.isoformat(),
+        'simulations': simulations,
+        'rounds_left': rounds_left,
+        'unfinished_games': len(unfinished),
+        'participants': participants,
+    }
+    Forecast.objects.get_or_create(tournament_id=tournament_id)
+    Forecast.objects.filter(tournament_id=tournament_id).filter(Q(version__isnull=True) | Q(version__lte=version)).update(
+        version=version, data=data, computed_at=now
+    )
+    return {'tournament': tournament_id, 'version': version, 'simulations': simulations}
+
+
+def request_forecast(tournament_id, version, user=None):
+    """
+    Queue a `forecast` job for `version` of a tournament, unless one was already requested.
+
+    The request is claimed with a conditional UPDATE of `Forecast.requested_version`, so concurrent
+    requests queue a single job per version.
+
+    Returns:
+        Job: The queued job, or None if a recomputation is already pending.
+    """
+    Forecast.objects.get_or_create(tournament_id=tournament_id)
+    now = timezone.now()
+    claimed = (
+        Forecast.objects.filter(tournament_id=tournament_id)
+        .filter(Q(requested_version__isnull=True) | Q(requested_version__lt=version)
+                | Q(requested_at__lt=now - REQUEST_RETRY))
+        .update(requested_version=version, requested_at=now)
+    )
+    if not claimed:
+        return None
+    return enqueue('forecast', user=user, tournament_id=tournament_id)
+
+
+def cached_forecast(tournament_id, user=None):
+    """
+    The forecast of a tournament as stored, and whether it matches the current version.
+
+    A fresh forecast is served from the cache backend, keyed on the tournament version, after a
+    single primary key lookup of the version. A stale or missing one triggers `request_forecast`.
+
+    Returns:
+        tuple: (data, fresh, job) where data is None if no forecast was ever computed, and job is
+            the recomputation queued by this call, if any.
+
+    Raises:
+        Tournament.DoesNotExist: If the tournament does not exist.
+    """
+    version = Tournament.objects.values_list('version', flat=True).get(id=tournament_id)
+    key = f"tournament-forecast:{tournament_id}:{version}"
+    data = cache.get(key)
+    if data is not None:
+        return data, True, None
+
+    stored = Forecast.objects.filter(tournament_id=tournament_id).values_list('version', 'data').first()
+    if stored is not None and stored[0] == version:
+        cache.set(key, stored[1], CACHE_TIMEOUT)
+        return stored[1], True, None
+    job = request_forecast(tournament_id, version, user=user)
+    return (stored[1] if stored else None), False, job
@@ -0,0 +1,106 @@
+"""
+Idempotent result submission with the `Idempotency-Key` header.
+
+Clients that retry a write send the same key with every attempt. The first attempt runs the view
+and stores its response under (user, key) in the same transaction as the write. Later attempts get
+the stored response back, with its status, body and `REPLAYED_HEADERS` (the `Location` of a
+queued job's 202, for one), marked with an `Idempotent-Replayed: true` header, without running the
+view again. A concurrent duplicate blocks on the unique index until the first attempt commits, then
+replays its response. If the first attempt fails with an exception, nothing is stored and the next
+attempt runs normally.
+
+Keys expire after `settings.IDEMPOTENCY_KEY_TTL` (24 hours by default).
+
+Functions:
+    idempotent(view_method): Decorator adding Idempotency-Key handling to a DRF view method.
+    purge_expired_keys(batch_size=10000): Deletes expired keys in batches.
+"""
+
+import functools
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+# Response headers stored with the body and sent again on replay.
+REPLAYED_HEADERS = ('Location', 'Retry-After', 'ETag')
+
+
+def key_ttl():
+    return getattr(settings, 'IDEMPOTENCY_KEY_TTL', timedelta(hours=24))
+
+
+def request_hash(request):
+    """SHA-256 of the method, path and parsed body, to detect a key reused for another request."""
+    data = request.data
+    if hasattr(data, 'lists'):
+        data = dict(data.lists())
+    payload = json.dumps([request.method, request.path, data], sort_keys=True, cls=JSONEncoder)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def idempotent(view_method):
+    """
+    Make a DRF view method replay its stored response when a request repeats an Idempotency-Key.
+
+    Requests without the header are handled as usual. Reusing a key for a different request
+    returns 422 Unprocessable Entity.
+    """
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if key is None or not request.user.is_authenticated:
+            return view_method(self, request, *args, **kwargs)
+        if not key or len(key) > 255:
+            return Response({'error': f"{HEADER} must be 1 to 255 characters long."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        fingerprint = request_hash(request)
+        with transaction.atomic():
+            IdempotencyKey.objects.filter(
+                user=request.user, key=key, created_at__lt=timezone.now() - key_ttl()
+            ).delete()
+            record, created = IdempotencyKey.objects.get_or_create(
+                user=request.user, key=key, defaults={'request_hash': fingerprint, 'status_code': 0},
+            )
+            if not created:
+                if record.request_hash != fingerprint:
+                    return Response({'error': f"{HEADER} was already used for a different request."},
+                                    status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+                replay = Response(record.response, status=record.status_code, headers=record.headers)
+                replay['Idempotent-Replayed'] = 'true'
+                return replay
+
+            response = view_method(self, request, *args, **kwargs)
+            record.status_code = response.status_code
+            record.response = response.data
+            record.headers = {name: response[name] for name in REPLAYED_HEADERS if response.has_header(name)}
+            record.save(update_fields=['status_code', 'response', 'headers'])
+        return response
+    return wrapper
+
+
+def purge_expired_keys(batch_size=10000):
+    """
+    Delete expired idempotency keys, `batch_size` rows per statement, using the created_at index.
+
+    Returns:
+        int: The number of deleted keys.
+    """
+    cutoff = timezone.now() - key_ttl()
+    deleted = 0
+    while True:
+        ids = list(IdempotencyKey.objects.filter(created_at__lt=cutoff).values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        # Nothing references the table, so Django deletes with a single DELETE ... WHERE id IN.
+        deleted += IdempotencyKey.objects.filter(id__in=ids).delete()[0]
@@ -0,0 +1,62 @@
+"""
+Background job handlers of the tournaments app, run by `manage.py runworker`.
+"""
+
+from datetime import date
+
+from jobs.queue import register
+
+from .archive import archive_tournaments
+from .forecast import compute_forecast
+from .idempotency import purge_expired_keys
+from .ratings import rerate_players
+from .services import run_tournament, export_standings, pair_next_round, ingest_pgn, delete_tournament
+
+
+@register('run_tournament')
+def run_tournament_job(context, tournament_id, seed=None):
+    return run_tournament(tournament_id, seed=seed, progress=context.progress)
+
+
+@register('pair_round')
+def pair_round_job(context, tournament_id, seed=None):
+    return pair_next_round(tournament_id, seed=seed)
+
+
+@register('export_standings')
+def export_standings_job(context, tournament_id):
+    return {
+        'filename': f"tournament-{tournament_id}-standings.csv",
+        'content_type': 'text/csv',
+        'content': export_standings(tournament_id),
+    }
+
+
+@register('rerate_players')
+def rerate_players_job(context, **options):
+    return rerate_players(progress=context.progress, **options)
+
+
+@register('purge_idempotency_keys')
+def purge_idempotency_keys_job(context):
+    return {'deleted': purge_expired_keys()}
+
+
+@register('ingest_pgn')
+def ingest_pgn_job(context, tournament_id, path, workers=None):
+    return ingest_pgn(tournament_id, path, workers=workers, progress=context.progress)
+
+
+@register('forecast')
+def forecast_job(context, tournament_id):
+    return compute_forecast(tournament_id)
+
+
+@register('delete_tournament')
+def delete_tournament_job(context, tournament_id):
+    return {'tournament': tournament_id, 'deleted': delete_tournament(tournament_id, progress=context.progress)}
+
+
+@register('archive_tournaments')
+def archive_tournaments_job(context, before):
+    return archive_tournaments(date.fromisoformat(before), progress=context.progress)
@@ -0,0 +1,52 @@
+"""
+Moves finished tournaments out of the hot tables into compressed archive blobs, or back.
+
+Usage:
+    python manage.py archive_tournaments --days 90
+    python manage.py archive_tournaments --before 2024-01-01
+    python manage.py archive_tournaments --restore <tournament_id> [<tournament_id> ...]
+"""
+
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tournaments.archive import archive_tournaments, restore_tournament
+
+
+class Command(BaseCommand):
+    help = "Archive finished tournaments that ended before a cutoff, or restore archived ones"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--before', type=date.fromisoformat, help="Archive tournaments that ended before this date.")
+        parser.add_argument('--days', type=int, help="Archive tournaments that ended more than this many days ago.")
+        parser.add_argument('--restore', type=int, nargs='+', metavar='TOURNAMENT_ID',
+                            help="Move these tournaments back into the hot tables.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        if options['restore']:
+            for tournament_id in options['restore']:
+                try:
+                    summary = restore_tournament(tournament_id)
+                except ValueError as error:
+                    raise CommandError(f"Tournament {tournament_id}: {error}")
+                self.stdout.write(self.style.SUCCESS(
+                    f"Restored tournament {tournament_id}: {summary['participants']} participants, "
+                    f"{summary['matches']} matches"
+                ))
+            return
+        if options['before'] is not None:
+            before = options['before']
+        elif options['days'] is not None:
+            before = date.today() - timedelta(days=options['days'])
+        else:
+            raise CommandError("Pass --before, --days or --restore")
+
+        summary = archive_tournaments(before)
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {summary['archived']} tournaments ({summary['participants']} participants, "
+            f"{summary['matches']} matches), skipped {summary['skipped']} unfinished, "
+            f"in {time.perf_counter() - started:.2f}s"
+        ))
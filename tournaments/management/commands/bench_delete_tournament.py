@@ -0,0 +1,188 @@
+"""
+Benchmarks the deletion of a large tournament: `services.delete_tournament` against Django's
+cascade collector (`Tournament.delete()`).
+
+Usage:
+    python manage.py bench_delete_tournament --players 20000 --rounds 10
+    python manage.py bench_delete_tournament --compare --trace-memory
+    python manage.py bench_delete_tournament --cleanup
+
+Each run seeds a tournament of `--players` participants and `--rounds` rounds (players / 2 matches
+per round, 100k matches by default) with a game score per match and a standings snapshot per
+participant and round, all with INSERT ... SELECT statements, then times its deletion. With
+`--compare` a second, identical tournament is deleted through the collector.
+"""
+
+import time
+import tracemalloc
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from tournaments.models import GameScore, Match, Participant, Round, StandingSnapshot, Tournament
+from tournaments.pgn import encode_moves
+from tournaments.services import DELETE_CHUNK_SIZE, delete_tournament
+from users.models import Player
+
+PREFIX = 'benchdel'
+MOVES = encode_moves('e4 e5 Nf3 Nc6 Bb5 a6 Ba4 Nf6 O-O Be7 Re1 b5 Bb3 d6 c3 O-O'.split())
+
+
+class Command(BaseCommand):
+    help = "Seed a large tournament and time its deletion"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--players', type=int, default=20000, help="Participants, rounded up to an even number.")
+        parser.add_argument('--rounds', type=int, default=10)
+        parser.add_argument('--chunk-size', type=int, default=DELETE_CHUNK_SIZE)
+        parser.add_argument('--compare', action='store_true', help="Also time Tournament.delete().")
+        parser.add_argument('--trace-memory', action='store_true',
+                            help="Also measure peak Python allocations (slows the collector down).")
+        parser.add_argument('--cleanup', action='store_true', help="Delete the seeded players and exit.")
+
+    def handle(self, *args, **options):
+        if options['cleanup']:
+            self.cleanup()
+            return
+        players = options['players'] + options['players'] % 2
+        self.seed_players(players)
+
+        tournament_id = self.seed_tournament(players, options['rounds'])
+        self.measure(
+            'delete_tournament',
+            lambda: delete_tournament(tournament_id, chunk_size=options['chunk_size']),
+            options['trace_memory'],
+        )
+        if options['compare']:
+            tournament_id = self.seed_tournament(players, options['rounds'])
+            self.measure(
+                'Tournament.delete()',
+                lambda: Tournament.objects.get(id=tournament_id).delete(),
+                options['trace_memory'],
+            )
+
+    def measure(self, label, delete, trace_memory):
+        if trace_memory:
+            tracemalloc.start()
+        started = time.perf_counter()
+        delete()
+        elapsed = time.perf_counter() - started
+        line = f"{label:<20} {elapsed:7.2f}s"
+        if trace_memory:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            line += f"  peak {peak / 2 ** 20:7.1f} MiB"
+        self.stdout.write(line)
+
+    def seed_players(self, count):
+        users, players = User._meta.db_table, Player._meta.db_table
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {users} (username, first_name, last_name, email, password, is_superuser,
+                                     is_staff, is_active, date_joined)
+                SELECT %(prefix)s || '_' || i, '', '', '', '!', false, false, true, now()
+                FROM generate_series(0, %(count)s - 1) AS i
+                ON CONFLICT (username) DO NOTHING
+                """,
+                {'prefix': PREFIX, 'count': count},
+            )
+            cursor.execute(
+                f"""
+                INSERT INTO {players} (user_id, rating)
+                SELECT u.id, 1000 + (hashtext(u.username) & 2147483647) %% 1800
+                FROM {users} AS u
+                LEFT JOIN {players} AS p ON p.user_id = u.id
+                WHERE u.username LIKE %(pattern)s AND p.id IS NULL
+                """,
+                {'pattern': f'{PREFIX}\\_%'},
+            )
+
+    def seed_tournament(self, players, rounds):
+        """Seed a played tournament; every round pairs even with odd positions, shifted by the round."""
+        started = time.perf_counter()
+        tournament = Tournament.objects.create(name='Delete benchmark', num_of_rounds=rounds)
+        params = {'tournament': tournament.id, 'rounds': rounds, 'n': players, 'pattern': f'{PREFIX}\\_%',
+                  'moves': MOVES}
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {Participant._meta.db_table} (player_id, tournament_id, score, wins, draws, losses,
+                                                           buchholz, sonneborn_berger, progressive)
+                SELECT p.id, %(tournament)s, 0, 0, 0, 0, 0, 0, 0
+                FROM {Player._meta.db_table} AS p JOIN {User._meta.db_table} AS u ON u.id = p.user_id
+                WHERE u.username LIKE %(pattern)s
+                ORDER BY p.id LIMIT %(n)s
+                """,
+                params,
+            )
+            cursor.execute(
+                f"""
+                INSERT INTO {Round._meta.db_table} (tournament_id, round_number, closed_at)
+                SELECT %(tournament)s, r, now() FROM generate_series(1, %(rounds)s) AS r
+                """,
+                params,
+            )
+            cursor.execute(f"SELECT id FROM {Participant._meta.db_table} WHERE tournament_id = %s ORDER BY id",
+                           [tournament.id])
+            ids = np.array([row[0] for row in cursor.fetchall()], dtype=np.int64)
+            cursor.execute(f"SELECT id FROM {Round._meta.db_table} WHERE tournament_id = %s ORDER BY round_number",
+                           [tournament.id])
+            round_ids = [row[0] for row in cursor.fetchall()]
+            columns = [[], [], [], [], []]
+            for number, round_id in enumerate(round_ids, start=1):
+                white = np.arange(0, len(ids), 2)
+                black = (white + 2 * number - 1) % len(ids)
+                result = (white + number) % 3  # 0: white wins, 1: black wins, 2: draw.
+                winner = np.where(result == 0, ids[white], np.where(result == 1, ids[black], 0))
+                for column, values in zip(columns, ([round_id] * len(white), ids[white], ids[black], winner,
+                                                    result == 2)):
+                    column.extend(np.asarray(values).tolist())
+            cursor.execute(
+                f"""
+                INSERT INTO {Match._meta.db_table} (tournament_id, round_id, white_id, black_id, winner_id, draw,
+                                                     played_at)
+                SELECT %s, round_id, white_id, black_id, NULLIF(winner_id, 0), draw, now()
+                FROM unnest(%s::bigint[], %s::bigint[], %s::bigint[], %s::bigint[], %s::boolean[])
+                    AS m(round_id, white_id, black_id, winner_id, draw)
+                """,
+                [tournament.id, *columns],
+            )
+            cursor.execute(
+                f"""
+                INSERT INTO {GameScore._meta.db_table} (match_id, ply_count, moves, tags)
+                SELECT id, 16, %(moves)s, '{{}}'::jsonb FROM {Match._meta.db_table} WHERE tournament_id = %(tournament)s
+                """,
+                params,
+            )
+            cursor.execute(
+                f"""
+                INSERT INTO {StandingSnapshot._meta.db_table} (tournament_id, participant_id, round_number, rank,
+                                                                score, wins, draws, losses, buchholz,
+                                                                sonneborn_berger, progressive)
+                SELECT %(tournament)s, p.id, r, p.i, 0, 0, 0, 0, 0, 0, 0
+                FROM (SELECT id, row_number() OVER (ORDER BY id) AS i
+                      FROM {Participant._meta.db_table} WHERE tournament_id = %(tournament)s) AS p,
+                     generate_series(1, %(rounds)s) AS r
+                """,
+                params,
+            )
+        matches = Match.objects.filter(tournament_id=tournament.id).count()
+        self.stdout.write(
+            f"Seeded tournament {tournament.id}: {players} participants, {matches} matches "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
+        return tournament.id
+
+    def cleanup(self):
+        users, players = User._meta.db_table, Player._meta.db_table
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {players} WHERE user_id IN (SELECT id FROM {users} WHERE username LIKE %s)",
+                [f'{PREFIX}\\_%'],
+            )
+            cursor.execute(f"DELETE FROM {users} WHERE username LIKE %s", [f'{PREFIX}\\_%'])
+            deleted = cursor.rowcount
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} seeded players"))
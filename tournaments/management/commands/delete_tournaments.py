@@ -0,0 +1,30 @@
+"""
+Deletes tournaments with everything in them, in chunks, without Django's cascade collector.
+
+Usage:
+    python manage.py delete_tournaments <tournament_id> [<tournament_id> ...] [--chunk-size 20000]
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from tournaments.services import DELETE_CHUNK_SIZE, delete_tournament
+
+
+class Command(BaseCommand):
+    help = "Delete tournaments with chunked set-based DELETE statements"
+
+    def add_arguments(self, parser):
+        parser.add_argument('tournament_ids', nargs='+', type=int)
+        parser.add_argument('--chunk-size', type=int, default=DELETE_CHUNK_SIZE,
+                            help="Rows deleted per statement and transaction.")
+
+    def handle(self, *args, **options):
+        for tournament_id in options['tournament_ids']:
+            started = time.perf_counter()
+            deleted = delete_tournament(tournament_id, chunk_size=options['chunk_size'])
+            rows = ', '.join(f"{count} {table}" for table, count in deleted.items() if count)
+            self.stdout.write(self.style.SUCCESS(
+                f"Tournament {tournament_id}: deleted {rows or 'nothing'} in {time.perf_counter() - started:.2f}s"
+            ))
@@ -0,0 +1,32 @@
+"""
+Writes a tournament as a FIDE Tournament Report File (TRF).
+
+Usage:
+    python manage.py export_trf <tournament_id> [--output tournament.trf]
+"""
+
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tournaments.models import Tournament
+from tournaments.trf import export_trf
+
+
+class Command(BaseCommand):
+    help = "Export a tournament as a TRF file (to standard output by default)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('tournament_id', type=int)
+        parser.add_argument('--output', help="File to write instead of standard output.")
+
+    def handle(self, *args, **options):
+        output = open(options['output'], 'w', encoding='utf-8') if options['output'] else sys.stdout
+        try:
+            for line in export_trf(options['tournament_id']):
+                output.write(f"{line}\n")
+        except Tournament.DoesNotExist:
+            raise CommandError(f"Tournament {options['tournament_id']} does not exist")
+        finally:
+            if output is not sys.stdout:
+                output.close()
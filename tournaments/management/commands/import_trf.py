@@ -0,0 +1,33 @@
+"""
+Creates a tournament from a FIDE Tournament Report File (TRF).
+
+Usage:
+    python manage.py import_trf <path> [--encoding latin-1]
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tournaments.trf import import_trf
+
+
+class Command(BaseCommand):
+    help = "Import a tournament with its participants, rounds and matches from a TRF file"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--encoding', default='utf-8', help="Encoding of the file (default utf-8).")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            with open(options['path'], encoding=options['encoding'], errors='replace') as lines:
+                summary = import_trf(lines)
+        except (OSError, ValueError) as error:
+            raise CommandError(str(error))
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported tournament {summary['tournament']}: {summary['participants']} participants "
+            f"({summary['players_created']} new players), {summary['matches']} matches, "
+            f"{summary['skipped_byes']} skipped byes in {time.perf_counter() - started:.2f}s"
+        ))
@@ -0,0 +1,39 @@
+"""
+Stores the moves of the games of a PGN file with the matches of a tournament.
+
+Usage:
+    python manage.py ingest_pgn <tournament_id> <path> [--workers 8] [--chunk-mb 16]
+"""
+
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tournaments.models import Tournament
+from tournaments.services import ingest_pgn
+
+
+class Command(BaseCommand):
+    help = "Parse a PGN file on a process pool and store each game's moves with its match"
+
+    def add_arguments(self, parser):
+        parser.add_argument('tournament_id', type=int)
+        parser.add_argument('path')
+        parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                            help="Parser processes; 0 parses in this process.")
+        parser.add_argument('--chunk-mb', type=int, default=16, help="Size of the ranges handed to the parsers.")
+
+    def handle(self, *args, **options):
+        if not Tournament.objects.filter(id=options['tournament_id']).exists():
+            raise CommandError(f"Tournament {options['tournament_id']} does not exist")
+        if not os.path.isfile(options['path']):
+            raise CommandError(f"{options['path']} is not a file")
+
+        started = time.perf_counter()
+        summary = ingest_pgn(options['tournament_id'], options['path'], workers=options['workers'],
+                             chunk_size=options['chunk_mb'] * 1024 * 1024)
+        self.stdout.write(self.style.SUCCESS(
+            f"Read {summary['games']} games, stored {summary['stored']}, {summary['unmatched']} unmatched, "
+            f"{summary['result_mismatches']} with a different result in {time.perf_counter() - started:.2f}s"
+        ))
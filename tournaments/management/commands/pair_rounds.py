@@ -0,0 +1,55 @@
+"""
+Pairs the next round of many tournaments in parallel.
+
+Usage:
+    python manage.py pair_rounds <tournament_id> [<tournament_id> ...] [--workers 8]
+    python manage.py pair_rounds --open [--workers 8]
+    python manage.py pair_rounds --open --queue
+
+With --queue one `pair_round` job per tournament is queued instead, to be run by `runworker`.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Exists, OuterRef
+
+from jobs.queue import enqueue
+from tournaments.models import Round, Tournament
+from tournaments.services import pair_rounds
+
+
+class Command(BaseCommand):
+    help = "Pair the next round of many tournaments concurrently"
+
+    def add_arguments(self, parser):
+        parser.add_argument('tournament_ids', nargs='*', type=int)
+        parser.add_argument('--open', action='store_true', help="Every tournament with an unclosed round.")
+        parser.add_argument('--workers', type=int, default=8, help="Tournaments paired at the same time.")
+        parser.add_argument('--seed', type=int, default=None, help="Seed for reproducible results.")
+        parser.add_argument('--queue', action='store_true', help="Queue background jobs instead.")
+
+    def handle(self, *args, **options):
+        if options['open']:
+            open_round = Round.objects.filter(tournament=OuterRef('pk'), closed_at__isnull=True)
+            tournament_ids = list(
+                Tournament.objects.filter(Exists(open_round)).order_by('id').values_list('id', flat=True)
+            )
+        elif options['tournament_ids']:
+            tournament_ids = options['tournament_ids']
+        else:
+            raise CommandError("Pass tournament ids or --open")
+
+        if options['queue']:
+            for tournament_id in tournament_ids:
+                enqueue('pair_round', tournament_id=tournament_id, seed=options['seed'])
+            self.stdout.write(self.style.SUCCESS(f"Queued {len(tournament_ids)} pair_round jobs"))
+            return
+
+        started = time.perf_counter()
+        paired = pair_rounds(tournament_ids, workers=options['workers'], seed=options['seed'])
+        matches = sum(summary['matches_created'] for summary in paired)
+        self.stdout.write(self.style.SUCCESS(
+            f"Paired {len(paired)} of {len(tournament_ids)} tournaments ({matches} matches) "
+            f"with {options['workers']} workers in {time.perf_counter() - started:.2f}s"
+        ))
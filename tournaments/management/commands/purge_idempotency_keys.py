@@ -0,0 +1,21 @@
+"""
+Deletes idempotency keys older than settings.IDEMPOTENCY_KEY_TTL. Run it periodically, e.g. hourly from cron.
+
+Usage:
+    python manage.py purge_idempotency_keys [--batch-size 10000]
+"""
+
+from django.core.management.base import BaseCommand
+
+from tournaments.idempotency import purge_expired_keys
+
+
+class Command(BaseCommand):
+    help = "Delete expired Idempotency-Key responses"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        deleted = purge_expired_keys(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired idempotency keys"))
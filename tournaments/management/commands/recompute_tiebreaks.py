@@ -0,0 +1,42 @@
+"""
+Recomputes score, W/D/L and tiebreaks of participants from their matches.
+
+Usage:
+    python manage.py recompute_tiebreaks <tournament_id> [<tournament_id> ...]
+    python manage.py recompute_tiebreaks --all
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from tournaments.models import Tournament
+from tournaments.services import recompute_tiebreaks
+
+
+class Command(BaseCommand):
+    help = "Recompute standings and tiebreaks of tournaments in one vectorized pass each"
+
+    def add_arguments(self, parser):
+        parser.add_argument('tournament_ids', nargs='*', type=int)
+        parser.add_argument('--all', action='store_true', help="Recompute every tournament.")
+
+    def handle(self, *args, **options):
+        if options['all']:
+            tournament_ids = list(Tournament.objects.order_by('id').values_list('id', flat=True))
+        elif options['tournament_ids']:
+            tournament_ids = options['tournament_ids']
+        else:
+            raise CommandError("Pass tournament ids or --all")
+
+        started = time.perf_counter()
+        participants = 0
+        for tournament_id in tournament_ids:
+            with transaction.atomic():
+                participants += recompute_tiebreaks(tournament_id)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Recomputed {participants} participants of {len(tournament_ids)} tournaments "
+            f"in {time.perf_counter() - started:.2f}s"
+        ))
@@ -0,0 +1,53 @@
+"""
+Recomputes participants' score and W/D/L from their matches and reports the rows that drifted.
+
+Usage:
+    python manage.py reconcile_standings <tournament_id> [<tournament_id> ...] [--dry-run]
+    python manage.py reconcile_standings --all [--tiebreaks]
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tournaments.models import Tournament
+from tournaments.services import reconcile_standings, recompute_tiebreaks
+
+
+class Command(BaseCommand):
+    help = "Repair participant scores and W/D/L with one aggregate UPDATE per tournament"
+
+    def add_arguments(self, parser):
+        parser.add_argument('tournament_ids', nargs='*', type=int)
+        parser.add_argument('--all', action='store_true', help="Reconcile every tournament.")
+        parser.add_argument('--dry-run', action='store_true', help="Report drifted rows without fixing them.")
+        parser.add_argument('--tiebreaks', action='store_true',
+                            help="Also recompute tiebreaks of tournaments that drifted.")
+        parser.add_argument('--show', type=int, default=20, help="Drifted rows to print per tournament.")
+
+    def handle(self, *args, **options):
+        if options['all']:
+            tournament_ids = list(Tournament.objects.order_by('id').values_list('id', flat=True))
+        elif options['tournament_ids']:
+            tournament_ids = options['tournament_ids']
+        else:
+            raise CommandError("Pass tournament ids or --all")
+
+        started = time.perf_counter()
+        total = 0
+        for tournament_id in tournament_ids:
+            drifted = reconcile_standings(tournament_id, dry_run=options['dry_run'])
+            if not drifted:
+                continue
+            total += len(drifted)
+            self.stdout.write(f"Tournament {tournament_id}: {len(drifted)} drifted participants")
+            for row in drifted[:options['show']]:
+                self.stdout.write(f"  participant {row['participant_id']}: {row['old']} -> {row['new']}")
+            if options['tiebreaks'] and not options['dry_run']:
+                recompute_tiebreaks(tournament_id)
+
+        verb = "Found" if options['dry_run'] else "Repaired"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {total} drifted participants in {len(tournament_ids)} tournaments "
+            f"in {time.perf_counter() - started:.2f}s (score, wins, draws, losses)"
+        ))
@@ -0,0 +1,50 @@
+"""
+Rebuilds participants' score, W/D/L and tiebreaks from the result log of their tournament.
+
+Usage:
+    python manage.py replay_results <tournament_id> [<tournament_id> ...] [--until <event_id>] [--dry-run]
+    python manage.py replay_results --all [--dry-run]
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tournaments.models import Tournament
+from tournaments.services import replay_tournament
+
+
+class Command(BaseCommand):
+    help = "Replay the result log of tournaments into their standings and tiebreaks"
+
+    def add_arguments(self, parser):
+        parser.add_argument('tournament_ids', nargs='*', type=int)
+        parser.add_argument('--all', action='store_true', help="Replay every tournament.")
+        parser.add_argument('--until', type=int, metavar='EVENT_ID',
+                            help="Replay the log up to this event only, to restore the standings of that moment.")
+        parser.add_argument('--dry-run', action='store_true', help="Report differing rows without writing them.")
+
+    def handle(self, *args, **options):
+        if options['all']:
+            tournament_ids = list(Tournament.objects.order_by('id').values_list('id', flat=True))
+        elif options['tournament_ids']:
+            tournament_ids = options['tournament_ids']
+        else:
+            raise CommandError("Pass tournament ids or --all")
+
+        started = time.perf_counter()
+        changed = 0
+        for tournament_id in tournament_ids:
+            tournament_started = time.perf_counter()
+            result = replay_tournament(tournament_id, until=options['until'], dry_run=options['dry_run'])
+            changed += result['changed']
+            self.stdout.write(
+                f"Tournament {tournament_id}: {result['games']} games, {result['participants']} participants, "
+                f"{result['changed']} changed in {(time.perf_counter() - tournament_started) * 1000:.1f}ms"
+            )
+
+        verb = "Found" if options['dry_run'] else "Rebuilt"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {changed} differing participants in {len(tournament_ids)} tournaments "
+            f"in {time.perf_counter() - started:.2f}s"
+        ))
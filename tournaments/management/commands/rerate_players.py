@@ -0,0 +1,32 @@
+"""
+Recomputes every player's Elo rating by replaying all closed rounds in chronological order.
+
+Usage:
+    python manage.py rerate_players [--initial-rating 800] [--k 20]
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tournaments.ratings import DEFAULT_RATING, K_FACTOR, rerate_players
+
+
+class Command(BaseCommand):
+    help = "Replay the rating history of all closed rounds and rewrite player ratings"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--initial-rating', type=int, default=DEFAULT_RATING,
+                            help="Rating every replayed player starts from.")
+        parser.add_argument('--k', type=float, default=K_FACTOR, help="The Elo K-factor.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            summary = rerate_players(initial_rating=options['initial_rating'], k=options['k'])
+        except ValueError as error:
+            raise CommandError(str(error))
+        self.stdout.write(self.style.SUCCESS(
+            f"Replayed {summary['games']} games of {summary['rounds']} rounds for {summary['players']} players "
+            f"in {time.perf_counter() - started:.2f}s"
+        ))
@@ -0,0 +1,33 @@
+"""
+Runs all remaining rounds of a tournament on the server.
+
+Usage:
+    python manage.py run_tournament <tournament_id> [--seed 42]
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tournaments.models import Tournament
+from tournaments.services import run_tournament
+
+
+class Command(BaseCommand):
+    help = "Pair, play and record every remaining round of a tournament"
+
+    def add_arguments(self, parser):
+        parser.add_argument('tournament_id', type=int)
+        parser.add_argument('--seed', type=int, default=None, help="Seed for reproducible results.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            summary = run_tournament(options['tournament_id'], seed=options['seed'])
+        except Tournament.DoesNotExist:
+            raise CommandError(f"Tournament {options['tournament_id']} does not exist")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Tournament {summary['tournament']}: {summary['rounds_played']} rounds, "
+            f"{summary['matches_created']} matches in {time.perf_counter() - started:.2f}s"
+        ))
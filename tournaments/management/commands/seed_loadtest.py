@@ -0,0 +1,75 @@
+"""
+Seeds the database with a pool of users, players and a tournament for the load-testing harness.
+
+All seeded users share one password, which is hashed once and reused for every row, so seeding
+thousands of users takes seconds instead of paying the password hasher cost per user.
+
+Usage:
+    python manage.py seed_loadtest --users 500 --password loadtest123
+"""
+
+import random
+from datetime import date
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from tournaments.models import Tournament, Participant, Round
+from users.models import Player
+
+
+class Command(BaseCommand):
+    help = "Seed users, players and a tournament used by loadtest.py"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200, help="Number of users/players to create.")
+        parser.add_argument('--password', default='loadtest123', help="Password shared by all seeded users.")
+        parser.add_argument('--prefix', default='loadtest', help="Username prefix of the seeded users.")
+        parser.add_argument('--admin', default='loadtest_admin', help="Username of the seeded admin user.")
+        parser.add_argument('--rounds', type=int, default=7, help="Number of rounds of the seeded tournament.")
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        password = make_password(options['password'])
+
+        pool = User.objects.filter(username__regex=rf"^{prefix}_[0-9]+$")
+        existing = set(pool.values_list('username', flat=True))
+        users = [
+            User(username=f"{prefix}_{i}", password=password)
+            for i in range(options['users'])
+            if f"{prefix}_{i}" not in existing
+        ]
+        User.objects.bulk_create(users, batch_size=1000)
+
+        Player.objects.bulk_create(
+            [Player(user=user, rating=random.randint(800, 2800)) for user in pool.filter(player__isnull=True)],
+            batch_size=1000,
+        )
+
+        admin, created = User.objects.get_or_create(
+            username=options['admin'],
+            defaults={'password': password, 'is_staff': True, 'is_superuser': True},
+        )
+
+        tournament = Tournament.objects.create(
+            name=f"Load test cup #{Tournament.objects.count() + 1}",
+            num_of_rounds=options['rounds'],
+            start_date=date.today(),
+            end_date=date.today(),
+        )
+        Round.objects.bulk_create(
+            [Round(tournament=tournament, round_number=i) for i in range(1, tournament.num_of_rounds + 1)]
+        )
+        players = Player.objects.filter(user__in=pool)
+        Participant.objects.bulk_create(
+            [Participant(player=player, tournament=tournament) for player in players],
+            batch_size=1000,
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {len(users)} new users ({players.count()} players in pool), "
+            f"admin '{admin.username}', tournament id={tournament.id}"
+        ))
@@ -0,0 +1,63 @@
+# Generated by Django 5.0.7 on 2026-10-19 09:12
+
+import datetime
+import django.core.validators
+import django.db.models.deletion
+import tournaments.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('users', '0002_alter_player_birthdate_alter_player_country_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tournament',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(default=tournaments.models.default_tournament_name, max_length=100)),
+                ('start_date', models.DateField(default=datetime.date.today)),
+                ('end_date', models.DateField(default=datetime.date.today)),
+                ('num_of_rounds', models.IntegerField(default=1, validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(11)])),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Participant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(default=0)),
+                ('wins', models.IntegerField(default=0)),
+                ('draws', models.IntegerField(default=0)),
+                ('losses', models.IntegerField(default=0)),
+                ('player', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='users.player')),
+                ('tournament', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='participants', to='tournaments.tournament')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Round',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('round_number', models.IntegerField(default=1)),
+                ('tournament', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rounds', to='tournaments.tournament')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Match',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('draw', models.BooleanField(default=False)),
+                ('duration', models.DurationField(blank=True)),
+                ('played_at', models.DateTimeField(auto_now=True)),
+                ('black', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='black_matches', to='tournaments.participant')),
+                ('white', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='white_matches', to='tournaments.participant')),
+                ('winner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='won_matches', to='tournaments.participant')),
+                ('round', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='matches', to='tournaments.round')),
+                ('tournament', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='matches', to='tournaments.tournament')),
+            ],
+        ),
+    ]
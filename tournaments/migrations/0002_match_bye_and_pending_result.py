@@ -0,0 +1,29 @@
+# Generated by Django 5.0.7 on 2026-10-19 09:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tournaments', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='match',
+            name='black',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='black_matches', to='tournaments.participant'),
+        ),
+        migrations.AlterField(
+            model_name='match',
+            name='duration',
+            field=models.DurationField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='match',
+            name='winner',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='won_matches', to='tournaments.participant'),
+        ),
+    ]
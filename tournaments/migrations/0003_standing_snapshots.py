@@ -0,0 +1,39 @@
+# Generated by Django 5.0.7 on 2026-10-19 12:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tournaments', '0002_match_bye_and_pending_result'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='round',
+            name='closed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='StandingSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('round_number', models.PositiveSmallIntegerField()),
+                ('rank', models.PositiveIntegerField()),
+                ('score', models.FloatField(default=0)),
+                ('wins', models.PositiveSmallIntegerField(default=0)),
+                ('draws', models.PositiveSmallIntegerField(default=0)),
+                ('losses', models.PositiveSmallIntegerField(default=0)),
+                ('buchholz', models.FloatField(default=0)),
+                ('sonneborn_berger', models.FloatField(default=0)),
+                ('participant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='standings', to='tournaments.participant')),
+                ('tournament', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='standings', to='tournaments.tournament')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='standingsnapshot',
+            constraint=models.UniqueConstraint(fields=('tournament', 'round_number', 'rank'), name='unique_standing_rank'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.0.7 on 2026-10-19 13:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tournaments', '0003_standing_snapshots'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='participant',
+            name='buchholz',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='participant',
+            name='progressive',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='participant',
+            name='sonneborn_berger',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='standingsnapshot',
+            name='progressive',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='tournament',
+            name='tiebreaks',
+            field=models.CharField(blank=True, default='buchholz,sonneborn_berger,progressive', help_text='Comma separated tiebreak chain applied after score.', max_length=100),
+        ),
+    ]
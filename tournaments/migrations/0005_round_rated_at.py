@@ -0,0 +1,18 @@
+# Generated by Django 5.0.7 on 2026-10-19 14:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tournaments', '0004_tiebreaks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='round',
+            name='rated_at',
+            field=models.DateTimeField(blank=True, help_text="When the round's results were applied to player ratings.", null=True),
+        ),
+    ]
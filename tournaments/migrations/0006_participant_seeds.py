@@ -0,0 +1,28 @@
+# Generated by Django 5.0.7 on 2026-10-19 15:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tournaments', '0005_round_rated_at'),
+        ('users', '0003_player_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='participant',
+            name='seed',
+            field=models.PositiveIntegerField(blank=True, help_text='Starting rank by rating, 1 is the top seed.', null=True),
+        ),
+        migrations.AddField(
+            model_name='tournament',
+            name='registration_closed_at',
+            field=models.DateTimeField(blank=True, help_text='When seeds were assigned to the participants.', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='participant',
+            index=models.Index(fields=['tournament', 'seed'], name='participant_seed_idx'),
+        ),
+    ]
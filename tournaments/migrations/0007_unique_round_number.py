@@ -0,0 +1,17 @@
+# Generated by Django 5.0.7 on 2026-10-19 16:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tournaments', '0006_participant_seeds'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='round',
+            constraint=models.UniqueConstraint(fields=('tournament', 'round_number'), name='unique_round_number'),
+        ),
+    ]
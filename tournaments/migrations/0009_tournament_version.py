@@ -0,0 +1,24 @@
+# Generated by Django 5.0.7 on 2026-10-19 17:45
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tournaments', '0008_idempotency_keys'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tournament',
+            name='updated_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='tournament',
+            name='version',
+            field=models.PositiveBigIntegerField(default=0, help_text='Incremented by every write to the tournament, its participants, rounds or matches.'),
+        ),
+    ]
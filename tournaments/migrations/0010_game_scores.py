@@ -0,0 +1,23 @@
+# Generated by Django 5.0.7 on 2026-10-19 18:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tournaments', '0009_tournament_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GameScore',
+            fields=[
+                ('match', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='game_score', serialize=False, to='tournaments.match')),
+                ('ply_count', models.PositiveSmallIntegerField(default=0)),
+                ('moves', models.BinaryField()),
+                ('tags', models.JSONField(blank=True, default=dict)),
+            ],
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.0.7 on 2026-10-19 19:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tournaments', '0010_game_scores'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Forecast',
+            fields=[
+                ('tournament', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='forecast', serialize=False, to='tournaments.tournament')),
+                ('version', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('data', models.JSONField(blank=True, null=True)),
+                ('computed_at', models.DateTimeField(blank=True, null=True)),
+                ('requested_version', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('requested_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.0.7 on 2026-10-19 19:50
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tournaments', '0011_forecasts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tournament',
+            name='cycles',
+            field=models.PositiveSmallIntegerField(default=1, help_text='How many times everybody meets in a round-robin; 2 for a double round-robin.', validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(4)]),
+        ),
+        migrations.AddField(
+            model_name='tournament',
+            name='pairing_system',
+            field=models.CharField(choices=[('swiss', 'Swiss'), ('round_robin', 'Round-robin')], default='swiss', max_length=16),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.7 on 2026-10-19 20:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tournaments', '0012_round_robin'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='tournament',
+            name='pairing_system',
+            field=models.CharField(choices=[('swiss', 'Swiss'), ('round_robin', 'Round-robin'), ('arena', 'Arena')], default='swiss', max_length=16),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.0.7 on 2026-10-19 21:10
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tournaments', '0013_arena'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TournamentArchive',
+            fields=[
+                ('tournament', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='archive', serialize=False, to='tournaments.tournament')),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('participants', models.PositiveIntegerField(default=0)),
+                ('matches', models.PositiveIntegerField(default=0)),
+                ('data', models.BinaryField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.0.7 on 2026-10-19 21:50
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+# Existing results become the first events of the log, in match order.
+BACKFILL = """
+    INSERT INTO tournaments_resultevent (tournament_id, match_id, round_number, white_id, black_id, white_points,
+                                         kind, created_at)
+    SELECT m.tournament_id, m.id, r.round_number, m.white_id, m.black_id,
+           CASE WHEN m.black_id IS NULL OR m.winner_id = m.white_id THEN 1 WHEN m.draw THEN 0.5 ELSE 0 END,
+           'set', COALESCE(m.played_at, now())
+    FROM tournaments_match AS m
+    JOIN tournaments_round AS r ON r.id = m.round_id
+    WHERE m.black_id IS NULL OR m.draw OR m.winner_id IS NOT NULL
+    ORDER BY m.id
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tournaments', '0014_tournament_archives'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResultEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('round_number', models.PositiveSmallIntegerField()),
+                ('white_id', models.BigIntegerField()),
+                ('black_id', models.BigIntegerField(blank=True, help_text='None for a bye.', null=True)),
+                ('white_points', models.FloatField(help_text='1, 0.5 or 0.')),
+                ('kind', models.CharField(choices=[('set', 'Result set'), ('corrected', 'Result corrected'), ('forfeit', 'Forfeit')], default='set', max_length=16)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('match', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='result_events', to='tournaments.match')),
+                ('tournament', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='result_events', to='tournaments.tournament')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['tournament', 'match', 'id'], name='result_event_replay_idx')],
+            },
+        ),
+        migrations.RunSQL(BACKFILL, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.7 on 2026-10-20 09:12
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tournaments', '0015_result_events'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='tournament',
+            name='num_of_rounds',
+            field=models.IntegerField(default=1, help_text='At most 11, except in round-robins, where the schedule sets it.', validators=[django.core.validators.MinValueValidator(1)]),
+        ),
+    ]
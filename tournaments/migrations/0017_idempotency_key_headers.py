@@ -0,0 +1,18 @@
+# Generated by Django 5.0.7 on 2026-10-20 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tournaments', '0016_num_of_rounds_round_robin'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='idempotencykey',
+            name='headers',
+            field=models.JSONField(blank=True, default=dict, help_text='Response headers replayed with it, such as Location.'),
+        ),
+    ]
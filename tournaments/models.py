@@ -1,19 +1,96 @@
+from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.db import models
+from django.utils import timezone
 from django.core.validators import MaxValueValidator, MinValueValidator
-from datetime import datetime
+from datetime import date
+
+from rest_framework.utils.encoders import JSONEncoder
 
 from users.models import Player
+from .pgn import decode_moves
+from .tiebreaks import DEFAULT_TIEBREAKS, parse_chain
 
 from faker import Faker
 
 faker = Faker()
 
 
+def default_tournament_name():
+    return f"{faker.name()}'s Cup"
+
+
 class Tournament(models.Model):
-    name = models.CharField(max_length=100, default=f"{faker.name()}'s Cup", blank=False, null=False)
-    start_date = models.DateField(default=datetime.utcnow().strftime("%Y-%M-%d"))
-    end_date = models.DateField(default=datetime.utcnow().strftime("%Y-%M-%d"))
-    num_of_rounds = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(11)], default=1, blank=False, null=False)
+    SWISS = 'swiss'
+    ROUND_ROBIN = 'round_robin'
+    ARENA = 'arena'
+    PAIRING_SYSTEMS = [
+        (SWISS, 'Swiss'),
+        (ROUND_ROBIN, 'Round-robin'),
+        (ARENA, 'Arena'),
+    ]
+
+    name = models.CharField(max_length=100, default=default_tournament_name, blank=False, null=False)
+    start_date = models.DateField(default=date.today)
+    end_date = models.DateField(default=date.today)
+    num_of_rounds = models.IntegerField(validators=[MinValueValidator(1)], default=1, blank=False, null=False,
+                                        help_text="At most 11, except in round-robins, where the schedule sets it.")
+    tiebreaks = models.CharField(max_length=100, default=DEFAULT_TIEBREAKS, blank=True, null=False,
+                                 help_text="Comma separated tiebreak chain applied after score.")
+    registration_closed_at = models.DateTimeField(blank=True, null=True,
+                                                  help_text="When seeds were assigned to the participants.")
+    pairing_system = models.CharField(max_length=16, choices=PAIRING_SYSTEMS, default=SWISS, blank=False, null=False)
+    cycles = models.PositiveSmallIntegerField(validators=[MinValueValidator(1), MaxValueValidator(4)], default=1,
+                                              help_text="How many times everybody meets in a round-robin; "
+                                                        "2 for a double round-robin.")
+    version = models.PositiveBigIntegerField(default=0, help_text="Incremented by every write to the tournament, "
+                                                                  "its participants, rounds or matches.")
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    STAMP_FIELDS = ('version', 'updated_at')
+    # Swiss and arena tournaments; a round-robin has as many rounds as its schedule.
+    MAX_ROUNDS = 11
+
+    @classmethod
+    def bump_version(cls, *tournament_ids):
+        """Mark tournaments as changed: increment their version and set updated_at, in one UPDATE."""
+        cls.objects.filter(id__in=tournament_ids).update(version=models.F('version') + 1, updated_at=timezone.now())
+
+    @classmethod
+    def bump_player_versions(cls, player_ids):
+        """Bump the version of every tournament one of the given players takes part in."""
+        cls.objects.filter(participants__player_id__in=player_ids).update(
+            version=models.F('version') + 1, updated_at=timezone.now()
+        )
+
+    def save(self, *args, **kwargs):
+        """
+        Save the tournament without ever writing `version` and `updated_at` of an existing row.
+
+        The stamp is only changed by `bump_version`, so a stale instance cannot move it backwards.
+        """
+        if not self._state.adding:
+            update_fields = kwargs.get('update_fields')
+            if update_fields is None:
+                update_fields = [field.name for field in self._meta.concrete_fields if not field.primary_key]
+            kwargs['update_fields'] = [name for name in update_fields if name not in self.STAMP_FIELDS]
+        super().save(*args, **kwargs)
+
+    @property
+    def is_round_robin(self):
+        return self.pairing_system == self.ROUND_ROBIN
+
+    @property
+    def is_arena(self):
+        return self.pairing_system == self.ARENA
+
+    def tiebreak_chain(self):
+        """The tiebreak names applied after score, in order."""
+        return parse_chain(self.tiebreaks)
+
+    def clean(self):
+        if not self.is_round_robin and self.num_of_rounds > self.MAX_ROUNDS:
+            raise ValidationError({'num_of_rounds': f"Ensure this value is less than or equal to {self.MAX_ROUNDS}."})
 
     def __str__(self):
         return f"Tournament: {self.name}, Rounds: {self.num_of_rounds}"
@@ -26,39 +103,201 @@ class Participant(models.Model):
     wins = models.IntegerField(default=0, blank=False, null=False)
     draws = models.IntegerField(default=0, blank=False, null=False)
     losses = models.IntegerField(default=0, blank=False, null=False)
+    buchholz = models.FloatField(default=0, blank=False, null=False)
+    sonneborn_berger = models.FloatField(default=0, blank=False, null=False)
+    progressive = models.FloatField(default=0, blank=False, null=False)
+    seed = models.PositiveIntegerField(blank=True, null=True, help_text="Starting rank by rating, 1 is the top seed.")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['tournament', 'seed'], name='participant_seed_idx'),
+        ]
 
     def __str__(self):
-        return f"{self.user.username} - {self.tournament.name}"
+        return f"{self.player.user.username} - {self.tournament.name}"
     
 
+
 class Round(models.Model):
     tournament = models.ForeignKey(Tournament, related_name='rounds', on_delete=models.CASCADE)
     round_number = models.IntegerField(default=1, blank=False, null=False)
+    closed_at = models.DateTimeField(blank=True, null=True)
+    rated_at = models.DateTimeField(blank=True, null=True, help_text="When the round's results were applied to player ratings.")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tournament', 'round_number'], name='unique_round_number'),
+        ]
 
     def __str__(self):
         return f"Round {self.round_number} - {self.tournament.name}"
     
 
+
 class Match(models.Model):
     tournament = models.ForeignKey(Tournament, related_name='matches', on_delete=models.CASCADE)
     round = models.ForeignKey(Round, related_name='matches', on_delete=models.CASCADE)
     white = models.ForeignKey(Participant, related_name='white_matches', on_delete=models.CASCADE)
-    black = models.ForeignKey(Participant, related_name='black_matches', on_delete=models.CASCADE)
-    winner = models.ForeignKey(Participant, related_name='won_matches', on_delete=models.CASCADE)
+    black = models.ForeignKey(Participant, related_name='black_matches', on_delete=models.CASCADE, blank=True, null=True)
+    winner = models.ForeignKey(Participant, related_name='won_matches', on_delete=models.CASCADE, blank=True, null=True)
     draw = models.BooleanField(default=False, blank=False, null=False)
-    duration = models.DurationField(blank=True)
+    duration = models.DurationField(blank=True, null=True)
     played_at = models.DateTimeField(auto_now=True, blank=True)
 
+    def __str__(self):
+        black = self.black.player.user.username if self.black_id else "bye"
+        return f"{self.white.player.user.username} vs {black} - {self.tournament.name}"
+
+
+class StandingSnapshot(models.Model):
+    """
+    Standings of one participant after a closed round.
+
+    Rows are written once, when the round closes, and never updated. Rows are narrow and fixed-width
+    (no names, small integers for counters), so many rounds stay cheap to store, and the
+    (tournament, round_number, rank) index serves any historical leaderboard page as a range scan.
+    """
+    tournament = models.ForeignKey(Tournament, related_name='standings', on_delete=models.CASCADE)
+    participant = models.ForeignKey(Participant, related_name='standings', on_delete=models.CASCADE)
+    round_number = models.PositiveSmallIntegerField(blank=False, null=False)
+    rank = models.PositiveIntegerField(blank=False, null=False)
+    score = models.FloatField(default=0, blank=False, null=False)
+    wins = models.PositiveSmallIntegerField(default=0, blank=False, null=False)
+    draws = models.PositiveSmallIntegerField(default=0, blank=False, null=False)
+    losses = models.PositiveSmallIntegerField(default=0, blank=False, null=False)
+    buchholz = models.FloatField(default=0, blank=False, null=False)
+    sonneborn_berger = models.FloatField(default=0, blank=False, null=False)
+    progressive = models.FloatField(default=0, blank=False, null=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tournament', 'round_number', 'rank'], name='unique_standing_rank'),
+        ]
+
+    def __str__(self):
+        return f"#{self.rank} after round {self.round_number}: participant {self.participant_id} ({self.score})"
+
+
+class IdempotencyKey(models.Model):
+    """
+    A response stored under the `Idempotency-Key` header of a result-writing request.
+
+    A retried request with the same key gets the stored response back instead of being run again.
+    Rows expire after `IDEMPOTENCY_KEY_TTL` and are purged by `manage.py purge_idempotency_keys`.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='+', on_delete=models.CASCADE)
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64, help_text="SHA-256 of the method, path and body.")
+    status_code = models.PositiveSmallIntegerField()
+    response = models.JSONField(encoder=JSONEncoder, blank=True, null=True)
+    headers = models.JSONField(default=dict, blank=True, help_text="Response headers replayed with it, such as Location.")
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='unique_idempotency_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.key} ({self.status_code})"
+
+
+class GameScore(models.Model):
+    """
+    The moves of a played match, ingested from a PGN file (see `services.ingest_pgn`).
+
+    Moves are the SAN tokens of the main line, space separated and zlib compressed
+    (`pgn.encode_moves`); the PGN tag pairs are kept as they were in the file.
+    """
+    match = models.OneToOneField(Match, related_name='game_score', primary_key=True, on_delete=models.CASCADE)
+    ply_count = models.PositiveSmallIntegerField(default=0)
+    moves = models.BinaryField()
+    tags = models.JSONField(default=dict, blank=True)
+
+    def move_list(self):
+        """The SAN moves of the game, in order."""
+        return decode_moves(self.moves)
+
+    def __str__(self):
+        return f"Game of match {self.match_id} ({self.ply_count} plies)"
+
+
+class Forecast(models.Model):
+    """
+    The latest win-probability forecast of a tournament (see `forecast.py`).
+
+    `version` is the tournament version the forecast was simulated from. A request that finds it
+    older than the tournament claims a recomputation by raising `requested_version`, so each
+    version is simulated once however many clients ask.
+    """
+    tournament = models.OneToOneField(Tournament, related_name='forecast', primary_key=True, on_delete=models.CASCADE)
+    version = models.PositiveBigIntegerField(blank=True, null=True)
+    data = models.JSONField(blank=True, null=True)
+    computed_at = models.DateTimeField(blank=True, null=True)
+    requested_version = models.PositiveBigIntegerField(blank=True, null=True)
+    requested_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"Forecast of tournament {self.tournament_id} at version {self.version}"
+
+
+class TournamentArchive(models.Model):
+    """
+    A finished tournament moved out of the hot tables (see `archive.py`).
+
+    `data` is one zlib compressed JSON document holding the participants, the standings snapshots
+    and the NDJSON dump of the tournament as the read endpoints render them, plus the game scores,
+    so the tournament can be served, and restored, without any participant or match row.
+    """
+    tournament = models.OneToOneField(Tournament, related_name='archive', primary_key=True, on_delete=models.CASCADE)
+    archived_at = models.DateTimeField(default=timezone.now)
+    participants = models.PositiveIntegerField(default=0)
+    matches = models.PositiveIntegerField(default=0)
+    data = models.BinaryField()
+
+    def __str__(self):
+        return f"Archive of tournament {self.tournament_id} ({len(self.data)} bytes)"
+
+
+class ResultEvent(models.Model):
+    """
+    One entry of a tournament's append-only result log (see `events.py`).
+
+    Every result written to a match, by the runner, `services.record_result` or an import, appends
+    an event; rows are never updated. Participant standings and tiebreaks are projections of the
+    log, kept up to date incrementally and rebuilt from it by `events.replay_tournament`. The
+    players are the participant ids of the match, so a replay never joins participants, and the
+    match is referenced without a constraint, so the log outlives deleted matches.
+    """
+    SET = 'set'
+    CORRECTED = 'corrected'
+    FORFEIT = 'forfeit'
+    KINDS = [
+        (SET, 'Result set'),
+        (CORRECTED, 'Result corrected'),
+        (FORFEIT, 'Forfeit'),
+    ]
+
+    tournament = models.ForeignKey(Tournament, related_name='result_events', on_delete=models.CASCADE)
+    match = models.ForeignKey(Match, related_name='result_events', on_delete=models.DO_NOTHING, db_constraint=False)
+    round_number = models.PositiveSmallIntegerField()
+    white_id = models.BigIntegerField()
+    black_id = models.BigIntegerField(blank=True, null=True, help_text="None for a bye.")
+    white_points = models.FloatField(help_text="1, 0.5 or 0.")
+    kind = models.CharField(max_length=16, choices=KINDS, default=SET)
+    created_at = models.DateTimeField(default=timezone.now)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='+', on_delete=models.SET_NULL,
+                                   blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['tournament', 'match', 'id'], name='result_event_replay_idx'),
+        ]
+
     def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Result events are append-only.")
         super().save(*args, **kwargs)
-        if self.draw:
-            self.first_participant.score += 0.5
-            self.second_participant.score += 0.5
-            self.first_participant.save()
-            self.second_participant.save()
-        elif self.winner:
-            self.winner.score += 1
-            self.winner.save()
 
     def __str__(self):
-        return f"{self.white} vs {self.black} - {self.tournament.name}"
\ No newline at end of file
+        return f"{self.get_kind_display()} of match {self.match_id}: {self.white_points} for white"
@@ -0,0 +1,181 @@
+"""
+Pairing algorithms that work on in-memory standings, without touching the database.
+
+The functions here only see participant ids, so the same code serves the Django services
+(`tournaments/services.py`) and can be reused by offline simulations.
+
+Classes:
+    OpponentHistory: Compact record of who has played whom, with constant time rematch checks.
+
+Functions:
+    seeded_pairings(seeding): Pairs the first round top half against bottom half.
+    swiss_pairings(ranking, history, color_balance, had_bye): Pairs a ranked list of participants
+        for one Swiss round, avoiding rematches where possible and assigning colors.
+    berger_schedule(participant_ids, cycles): Every round of a round-robin, from the Berger tables.
+"""
+
+
+class OpponentHistory:
+    """
+    Which participants of a tournament have already played each other, as a bit matrix.
+
+    Participant ids are mapped to dense indexes, and row i holds one bit per participant that i
+    has played. A rematch check is a single byte lookup, and 1000 participants take 125 KB.
+
+    Attributes:
+        index (dict): Maps a participant id to its row and bit position.
+        stride (int): Bytes per row.
+        bits (bytearray): The rows, one after another.
+    """
+
+    def __init__(self, participant_ids, pairs=()):
+        self.index = {pid: i for i, pid in enumerate(participant_ids)}
+        self.stride = (len(self.index) + 7) // 8
+        self.bits = bytearray(self.stride * len(self.index))
+        for a, b in pairs:
+            self.add(a, b)
+
+    def add(self, a, b):
+        """Record a game between participants `a` and `b`."""
+        i, j = self.index[a], self.index[b]
+        self.bits[i * self.stride + (j >> 3)] |= 1 << (j & 7)
+        self.bits[j * self.stride + (i >> 3)] |= 1 << (i & 7)
+
+    def played(self, a, b):
+        """Whether participants `a` and `b` have already played each other."""
+        i, j = self.index[a], self.index[b]
+        return bool(self.bits[i * self.stride + (j >> 3)] >> (j & 7) & 1)
+
+    def opponents(self, a):
+        """Set of participant ids `a` has played."""
+        ids = list(self.index)
+        row = self.stride * self.index[a]
+        return {
+            ids[byte * 8 + bit]
+            for byte, value in enumerate(self.bits[row:row + self.stride]) if value
+            for bit in range(8) if value >> bit & 1
+        }
+
+
+def _colors(a, b, color_balance):
+    """
+    Return (white, black) for two participants.
+
+    The participant who has played black more often gets white. On equal balance the higher ranked
+    participant (`a`) gets white.
+    """
+    if color_balance.get(a, 0) > color_balance.get(b, 0):
+        return b, a
+    return a, b
+
+
+def seeded_pairings(seeding):
+    """
+    Pair the first round: the top half of the seeding against the bottom half.
+
+    Seed 1 plays the first seed of the bottom half, seed 2 the second, and so on. Colors alternate
+    by board, starting with white for the top seed. With an odd number of participants the lowest
+    seed receives the bye.
+
+    Args:
+        seeding (list): Participant ids ordered by seed (top seed first).
+
+    Returns:
+        tuple: (pairs, bye) as returned by `swiss_pairings`.
+    """
+    pool = list(seeding)
+    bye = pool.pop() if len(pool) % 2 else None
+    half = len(pool) // 2
+    pairs = [
+        (top, bottom) if board % 2 == 0 else (bottom, top)
+        for board, (top, bottom) in enumerate(zip(pool[:half], pool[half:]))
+    ]
+    return pairs, bye
+
+
+def swiss_pairings(ranking, history, color_balance=None, had_bye=None):
+    """
+    Pair participants for one Swiss round.
+
+    Participants are paired top-down: each unpaired participant is matched with the highest ranked
+    unpaired participant they have not met yet. If everybody left has already been met, the next
+    unpaired participant is taken, so a round is always complete. With an odd number of participants
+    the lowest ranked participant without a bye so far receives the bye.
+
+    Args:
+        ranking (list): Participant ids ordered by standing (best first).
+        history (OpponentHistory): Games already played in the tournament.
+        color_balance (dict, optional): Maps a participant id to (games as white - games as black).
+        had_bye (set, optional): Participant ids that already received a bye.
+
+    Returns:
+        tuple: (pairs, bye) where pairs is a list of (white_id, black_id) tuples and bye is the id
+            of the participant without an opponent, or None.
+    """
+    color_balance = color_balance or {}
+    had_bye = had_bye or set()
+    pool = list(ranking)
+
+    bye = None
+    if len(pool) % 2:
+        candidates = [pid for pid in reversed(pool) if pid not in had_bye]
+        bye = candidates[0] if candidates else pool[-1]
+        pool.remove(bye)
+
+    pairs = []
+    while pool:
+        a = pool.pop(0)
+        index = next((i for i, b in enumerate(pool) if not history.played(a, b)), 0)
+        b = pool.pop(index)
+        pairs.append(_colors(a, b, color_balance))
+
+    return pairs, bye
+
+
+def berger_schedule(participant_ids, cycles=1):
+    """
+    Pair every round of a round-robin with the FIDE Berger tables.
+
+    Participants are numbered in the given order (1 is the first). With an odd number of
+    participants a dummy takes the last number, and whoever meets it gets the bye. In round r the
+    last number meets the number 1 + (r - 1) * n/2 (mod n - 1), with black in odd rounds, and the
+    other boards pair the numbers on both sides of it. Every round is built directly from its
+    number, so the whole schedule takes O(n^2) time. Further cycles (2 for a double round-robin)
+    repeat the first one with colors reversed every other cycle.
+
+    Args:
+        participant_ids (list): Participant ids in pairing number order, e.g. by seed.
+        cycles (int): How many times every participant meets every other one.
+
+    Returns:
+        list: One (pairs, bye) tuple per round, as returned by `swiss_pairings`.
+    """
+    players = list(participant_ids)
+    if len(players) % 2:
+        players.append(None)
+    n = len(players)
+    if n < 2:
+        return []
+    last, half = n - 1, n // 2
+
+    cycle = []
+    for r in range(last):
+        start = r * half % last
+        pairs = [(players[start], players[last]) if r % 2 == 0 else (players[last], players[start])]
+        pairs.extend((players[(start + i) % last], players[(start - i) % last]) for i in range(1, half))
+        bye = None
+        for board, (white, black) in enumerate(pairs):
+            if white is None or black is None:
+                bye = black if white is None else white
+                del pairs[board]
+                break
+        cycle.append((pairs, bye))
+
+    schedule = list(cycle)
+    for number in range(1, cycles):
+        reverse = number % 2
+        schedule.extend(
+            ([(black, white) if reverse else (white, black) for white, black in pairs], bye)
+            for pairs, bye in cycle
+        )
+    return schedule
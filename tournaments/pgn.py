@@ -0,0 +1,164 @@
+"""
+Streaming parser for PGN (Portable Game Notation) files.
+
+Files are memory-mapped and cut into byte ranges that start at game boundaries, so each range can
+be parsed by a separate process mapping the same file: only the range boundaries and the parsed,
+compressed games cross process boundaries, and no process ever holds the whole file.
+
+This module does not import Django, like `pairing.py`. Worker processes started with the 'spawn'
+method load it quickly, without the app registry and without inheriting a database connection.
+
+Moves are stored as their SAN tokens (comments, variations, annotations and move numbers
+removed), joined by spaces and zlib compressed, which takes about a third of the raw movetext.
+
+Functions:
+    split_ranges(path, chunk_size): Byte ranges of a file that start and end at game boundaries.
+    parse_range(path, start, end): Parses the games of one byte range of a file.
+    parse_games(text): Parses the games of a PGN string.
+    parse_movetext(text): SAN moves of a movetext, with the result token if any.
+    encode_moves(moves), decode_moves(data): Compact storage of a list of SAN moves.
+"""
+
+import mmap
+import re
+import zlib
+
+PGN_CHUNK_SIZE = 16 * 1024 * 1024
+RESULTS = ('1-0', '0-1', '1/2-1/2', '*')
+
+TAG_RE = re.compile(r'\[\s*(\w+)\s+"((?:[^"\\]|\\.)*)"\s*\]')
+TAG_START_RE = re.compile(rb'\[[ \t]*\w+[ \t]+"')
+COMMENT_RE = re.compile(r'\{[^}]*\}?|;[^\n]*|\$\d+')
+VARIATION_RE = re.compile(r'\([^()]*\)')
+MOVE_NUMBER_RE = re.compile(r'\d+\.+')
+
+
+def encode_moves(moves):
+    return zlib.compress(' '.join(moves).encode())
+
+
+def decode_moves(data):
+    text = zlib.decompress(bytes(data)).decode()
+    return text.split(' ') if text else []
+
+
+def parse_movetext(text):
+    """
+    Extract the SAN moves of the main line from a movetext.
+
+    Comments and NAGs, then variations (innermost first) and move numbers are removed with a few
+    whole-string regex passes, and the rest is split on whitespace.
+
+    Returns:
+        tuple: (moves, result) where result is '1-0', '0-1', '1/2-1/2', '*' or None.
+    """
+    text = COMMENT_RE.sub(' ', text)
+    while '(' in text:
+        text, removed = VARIATION_RE.subn(' ', text)
+        if not removed:
+            text = text.replace('(', ' ').replace(')', ' ')
+    tokens = MOVE_NUMBER_RE.sub(' ', text).split()
+    result = tokens.pop() if tokens and tokens[-1] in RESULTS else None
+    return [token.rstrip('!?') for token in tokens], result
+
+
+def _game(tags, movetext):
+    moves, result = parse_movetext('\n'.join(movetext))
+    if result is not None:
+        tags.setdefault('Result', result)
+    return tags, encode_moves(moves), len(moves)
+
+
+def parse_games(text):
+    """
+    Parse every game of a PGN string.
+
+    A game is a block of tag pairs followed by movetext; the next tag pair after movetext starts a
+    new game. Lines inside a multi-line `{...}` comment are always movetext.
+
+    Returns:
+        list: (tags, moves, ply_count) tuples, with `moves` as returned by `encode_moves`.
+    """
+    games = []
+    tags, movetext, in_comment = {}, [], False
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line[0] == '%':
+            continue
+        if line[0] == '[' and not in_comment:
+            if movetext:
+                games.append(_game(tags, movetext))
+                tags, movetext = {}, []
+            match = TAG_RE.match(line)
+            if match:
+                tags[match.group(1)] = match.group(2).replace('\\"', '"').replace('\\\\', '\\')
+            continue
+        movetext.append(line)
+        opened, closed = line.rfind('{'), line.rfind('}')
+        if opened != closed:
+            in_comment = opened > closed
+    if tags or movetext:
+        games.append(_game(tags, movetext))
+    return games
+
+
+def _is_game_start(mm, pos):
+    """
+    Whether a tag pair starts at `pos` and is the first of a game: the previous non-blank line is
+    not a tag pair. Lines such as `[%clk 0:03:00]` inside a multi-line comment are not tag pairs.
+    """
+    if not TAG_START_RE.match(mm, pos):
+        return False
+    end = pos
+    while end > 0 and mm[end - 1:end] in (b'\n', b'\r', b' ', b'\t'):
+        end -= 1
+    if end == 0:
+        return True
+    start = mm.rfind(b'\n', 0, end) + 1
+    while mm[start:start + 1] in (b' ', b'\t'):
+        start += 1
+    return not TAG_START_RE.match(mm, start)
+
+
+def _next_game(mm, offset):
+    """Offset of the first game starting at or after `offset`, or the file size."""
+    if offset == 0:
+        return 0
+    pos = mm.find(b'\n[', offset - 1)
+    while pos != -1:
+        if _is_game_start(mm, pos + 1):
+            return pos + 1
+        pos = mm.find(b'\n[', pos + 1)
+    return len(mm)
+
+
+def split_ranges(path, chunk_size=PGN_CHUNK_SIZE):
+    """
+    Cut a PGN file into (start, end) byte ranges of about `chunk_size` bytes, each starting at the
+    first tag pair of a game, without reading the file beyond the boundaries.
+    """
+    with open(path, 'rb') as file:
+        if not file.seek(0, 2):
+            return []
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            starts = sorted({_next_game(mm, offset) for offset in range(0, len(mm), chunk_size)})
+            starts = [start for start in starts if start < len(mm)]
+            return list(zip(starts, starts[1:] + [len(mm)]))
+
+
+def parse_range(path, start, end):
+    """
+    Parse the games in bytes [start, end) of a PGN file, read through a memory map.
+
+    Text is decoded as UTF-8, falling back to Latin-1, the encoding of older PGN exports.
+
+    Returns:
+        list: (tags, moves, ply_count) tuples, see `parse_games`.
+    """
+    with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        data = mm[start:end]
+    try:
+        text = data.decode('utf-8')
+    except UnicodeDecodeError:
+        text = data.decode('latin-1')
+    return parse_games(text)
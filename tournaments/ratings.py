@@ -0,0 +1,188 @@
+"""
+Elo ratings of players, updated from finished games.
+
+A round is one rating period: every game of the round is rated against the ratings the players had
+before the round, so the changes of a whole round are computed in one vectorized pass and written
+with a single UPDATE. Ratings are stored as integers, so they are rounded after every period and
+clamped to the range allowed by `Player.rating`.
+
+Each round is rated once, when it closes (`Round.rated_at` records it). Results corrected after that
+are picked up by replaying the whole history with `rerate_players`, which refuses to run while
+tournaments are archived: their games are no longer rows to replay.
+
+Functions:
+    expected_score(white_ratings, black_ratings): Expected points of white for each game.
+    elo_changes(white_ratings, black_ratings, white_points, k): Rating change of white for each game.
+    apply_period(ratings, white, black, white_points, k): Rates one period of games in place.
+    update_ratings(ratings): Writes many player ratings in as few statements as possible.
+    rate_round(round_obj, k): Applies the results of a closed round to player ratings once.
+    rerate_players(initial_rating, k, progress): Replays every closed round in chronological order.
+"""
+
+import numpy as np
+from django.db import connection, transaction
+from django.db.models import Case, F, FloatField, Q, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from users.models import Player
+from .models import Match, Round, Tournament, TournamentArchive
+
+
+K_FACTOR = 20
+DEFAULT_RATING = Player._meta.get_field('rating').default
+MIN_RATING, MAX_RATING = 0, 3000
+
+# Points scored by white, computed by the database.
+WHITE_POINTS = Case(
+    When(draw=True, then=Value(0.5)),
+    When(winner_id=F('white_id'), then=Value(1.0)),
+    default=Value(0.0),
+    output_field=FloatField(),
+)
+
+
+def expected_score(white_ratings, black_ratings):
+    """Expected points of white against black for each game."""
+    return 1.0 / (1.0 + 10.0 ** ((black_ratings - white_ratings) / 400.0))
+
+
+def elo_changes(white_ratings, black_ratings, white_points, k=K_FACTOR):
+    """Rating change of white for each game; black changes by the opposite amount."""
+    return k * (white_points - expected_score(white_ratings, black_ratings))
+
+
+def apply_period(ratings, white, black, white_points, k=K_FACTOR):
+    """
+    Rate one period of games in place.
+
+    Args:
+        ratings (ndarray): Float ratings indexed by player index.
+        white, black (ndarray): Player indexes of each game.
+        white_points (ndarray): Points scored by white in each game.
+        k (float): The K-factor.
+
+    Returns:
+        ndarray: Indexes of the players whose rating changed.
+    """
+    change = elo_changes(ratings[white], ratings[black], white_points, k)
+    players = np.concatenate((white, black))
+    np.add.at(ratings, players, np.concatenate((change, -change)))
+    ratings[players] = np.clip(np.rint(ratings[players]), MIN_RATING, MAX_RATING)
+    return players
+
+
+def update_ratings(ratings, batch_size=10000):
+    """
+    Write player ratings with UPDATE ... FROM (VALUES ...) statements of `batch_size` rows, and bump
+    the version of the tournaments the players take part in, whose participant lists show ratings.
+
+    Args:
+        ratings (dict): Maps a player id to the new rating.
+    """
+    items = list(ratings.items())
+    with connection.cursor() as cursor:
+        for start in range(0, len(items), batch_size):
+            batch = items[start:start + batch_size]
+            cursor.execute(
+                f"""
+                UPDATE {Player._meta.db_table} AS p
+                SET rating = v.rating
+                FROM (VALUES {", ".join(["(%s, %s)"] * len(batch))}) AS v(id, rating)
+                WHERE p.id = v.id
+                """,
+                [int(value) for item in batch for value in item],
+            )
+            Tournament.bump_player_versions([int(player_id) for player_id, _ in batch])
+
+
+def _finished_games(matches):
+    return matches.filter(black__isnull=False).filter(Q(draw=True) | Q(winner__isnull=False))
+
+
+def rate_round(round_obj, k=K_FACTOR):
+    """
+    Apply the results of a round to the ratings of its players, unless it was already rated.
+
+    The round is claimed with a conditional UPDATE of `rated_at`, so concurrent calls rate it once.
+
+    Returns:
+        int: The number of players whose rating was written.
+    """
+    with transaction.atomic():
+        claimed = Round.objects.filter(pk=round_obj.pk, rated_at__isnull=True).update(rated_at=timezone.now())
+        if not claimed:
+            return 0
+        games = list(_finished_games(Match.objects.filter(round_id=round_obj.pk)).values_list(
+            'white__player_id', 'black__player_id', WHITE_POINTS,
+        ))
+        if not games:
+            return 0
+
+        white_players, black_players, white_points = (np.array(column) for column in zip(*games))
+        player_ids, inverse = np.unique(np.concatenate((white_players, black_players)), return_inverse=True)
+        # Rounds of different tournaments can share players: lock them in id order, which also
+        # avoids deadlocks, before reading their current ratings.
+        current = dict(
+            Player.objects.select_for_update().filter(id__in=player_ids.tolist()).order_by('id')
+            .values_list('id', Coalesce('rating', DEFAULT_RATING))
+        )
+        ratings = np.array([current[pid] for pid in player_ids.tolist()], dtype=np.float64)
+
+        white, black = np.split(inverse, 2)
+        apply_period(ratings, white, black, white_points, k)
+        update_ratings(dict(zip(player_ids.tolist(), ratings.astype(int).tolist())))
+    return len(player_ids)
+
+
+def rerate_players(initial_rating=DEFAULT_RATING, k=K_FACTOR, progress=None):
+    """
+    Recompute the ratings of every player who played a rated game by replaying history.
+
+    Every player who played a game of a closed round starts from `initial_rating`. The closed rounds
+    are replayed in the order they closed, each as one vectorized rating period. All finished games
+    are loaded with one streaming query, and the ratings are written back in one transaction.
+
+    Args:
+        initial_rating (int): The rating every replayed player starts from.
+        k (float): The K-factor.
+        progress (callable, optional): Called as `progress(done, total)` every 1000 rounds.
+
+    Returns:
+        dict: Summary with the number of rounds, games and players replayed.
+
+    Raises:
+        ValueError: If tournaments are archived. Their games would be left out of the history, and
+            every player's rating rewritten without them.
+    """
+    archived = list(TournamentArchive.objects.order_by('tournament_id').values_list('tournament_id', flat=True)[:11])
+    if archived:
+        listed = ', '.join(map(str, archived[:10])) + (', ...' if len(archived) > 10 else '')
+        raise ValueError(f"Tournaments {listed} are archived: restore them before replaying the rating history.")
+    rows = (
+        _finished_games(Match.objects.filter(round__closed_at__isnull=False))
+        .order_by('round__closed_at', 'round_id')
+        .values_list('round_id', 'white__player_id', 'black__player_id', WHITE_POINTS)
+        .iterator(chunk_size=20000)
+    )
+    columns = [np.array(column) for column in zip(*rows)]
+    if not columns:
+        return {'rounds': 0, 'games': 0, 'players': 0}
+
+    round_ids, white_players, black_players, white_points = columns
+    player_ids, inverse = np.unique(np.concatenate((white_players, black_players)), return_inverse=True)
+    white, black = np.split(inverse, 2)
+    ratings = np.full(len(player_ids), float(initial_rating))
+
+    starts = np.flatnonzero(np.diff(round_ids)) + 1
+    bounds = np.concatenate(([0], starts, [len(round_ids)]))
+    total = len(bounds) - 1
+    for period, (lo, hi) in enumerate(zip(bounds[:-1], bounds[1:]), start=1):
+        apply_period(ratings, white[lo:hi], black[lo:hi], white_points[lo:hi], k)
+        if progress is not None and period % 1000 == 0:
+            progress(period, total)
+
+    with transaction.atomic():
+        update_ratings(dict(zip(player_ids.tolist(), ratings.astype(int).tolist())))
+        Round.objects.filter(closed_at__isnull=False, rated_at__isnull=True).update(rated_at=timezone.now())
+    return {'rounds': total, 'games': len(round_ids), 'players': len(player_ids)}
@@ -2,7 +2,9 @@ from rest_framework import serializers
 from rest_framework.response import Response
 from django.core.exceptions import ValidationError
 
-from .models import Tournament, Round, Participant, Match, Player
+from .models import Tournament, Round, Participant, Match, Player, StandingSnapshot, ResultEvent
+from .services import RESULT_POINTS
+from .tiebreaks import parse_chain
 from users.serializers import PlayerSerializer
 
 class TournamentSerializer(serializers.ModelSerializer):
@@ -18,6 +20,29 @@ class TournamentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Tournament
         fields = '__all__'
+        read_only_fields = ['registration_closed_at', 'version', 'updated_at']
+
+    def validate_tiebreaks(self, value):
+        """
+        Validate the tiebreak chain, e.g. 'buchholz,sonneborn_berger,progressive'.
+        """
+        try:
+            return ','.join(parse_chain(value))
+        except ValueError as error:
+            raise serializers.ValidationError(str(error))
+
+    def validate(self, attrs):
+        """
+        Validate the number of rounds against the pairing system: at most `Tournament.MAX_ROUNDS`,
+        except in round-robins, whose schedule sets it.
+        """
+        pairing_system = attrs.get('pairing_system', getattr(self.instance, 'pairing_system', Tournament.SWISS))
+        num_of_rounds = attrs.get('num_of_rounds', getattr(self.instance, 'num_of_rounds', 1))
+        if pairing_system != Tournament.ROUND_ROBIN and num_of_rounds > Tournament.MAX_ROUNDS:
+            raise serializers.ValidationError(
+                {'num_of_rounds': f"Ensure this value is less than or equal to {Tournament.MAX_ROUNDS}."}
+            )
+        return attrs
 
     def create(self, validated_data):
         """
@@ -39,7 +64,8 @@ class TournamentSerializer(serializers.ModelSerializer):
     def update(self, instance, validated_data):
         """
         Updates a Tournament instance. Raises a validation error if 'num_of_rounds'
-        is attempted to be updated and round objects have been created.
+        is attempted to be updated and round objects have been created, or if the pairing system
+        or the number of round-robin cycles is changed once matches exist.
 
         Args:
             instance (Tournament): The Tournament instance to be updated.
@@ -49,11 +75,12 @@ class TournamentSerializer(serializers.ModelSerializer):
             Tournament: The updated Tournament instance.
 
         Raises:
-            ValidationError: If 'num_of_rounds' is attempted to be updated and rounds exist.
+            ValidationError: If 'num_of_rounds' is attempted to be updated and rounds exist, or
+                'pairing_system' or 'cycles' once matches exist.
         """
-        if 'num_of_rounds' in validated_data:
+        if validated_data.get('num_of_rounds', instance.num_of_rounds) != instance.num_of_rounds:
             if Round.objects.filter(tournament=instance).exists():
-                raise ValidationError("Cannot update 'num_of_rounds' once rounds have been created.")
+                raise serializers.ValidationError("Cannot update 'num_of_rounds' once rounds have been created.")
             else:
                 # If the Round objects have not been created yet:
                 instance.num_of_rounds = validated_data['num_of_rounds']
@@ -61,6 +88,12 @@ class TournamentSerializer(serializers.ModelSerializer):
         instance.name = validated_data.get('name', instance.name)
         instance.start_date = validated_data.get('start_date', instance.start_date)
         instance.end_date = validated_data.get('end_date', instance.end_date)
+        instance.tiebreaks = validated_data.get('tiebreaks', instance.tiebreaks)
+        for field in ('pairing_system', 'cycles'):
+            if field in validated_data and validated_data[field] != getattr(instance, field):
+                if Match.objects.filter(tournament=instance).exists():
+                    raise serializers.ValidationError(f"Cannot update '{field}' once matches have been created.")
+                setattr(instance, field, validated_data[field])
         instance.save()
 
         return instance
@@ -84,7 +117,7 @@ class TournamentParticipantSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Participant
-        fields = ['id', 'player', 'score', 'wins', 'draws', 'losses']
+        fields = ['id', 'player', 'seed', 'score', 'wins', 'draws', 'losses', 'buchholz', 'sonneborn_berger', 'progressive']
 
 
 
@@ -183,4 +216,81 @@ class ParticipantSerializer(serializers.ModelSerializer):
         instance.losses = validated_data.get('losses', instance.losses)
         instance.save()
 
-        return instance
\ No newline at end of file
+        return instance
+
+
+class StandingSnapshotSerializer(serializers.ModelSerializer):
+    """
+    Serializer for one row of a historical leaderboard.
+
+    Attributes:
+        participant_id (IntegerField): The ID of the participant.
+        player_id (IntegerField): The ID of the participant's player.
+        username (CharField): The username of the participant's player.
+
+    Meta:
+        model (Model): The model class that is being serialized.
+        fields (list): The list of fields to be included in the serialized representation.
+    """
+    participant_id = serializers.IntegerField(read_only=True)
+    player_id = serializers.IntegerField(source='participant.player_id', read_only=True)
+    username = serializers.CharField(source='participant.player.user.username', read_only=True)
+
+    class Meta:
+        model = StandingSnapshot
+        fields = ['round_number', 'rank', 'participant_id', 'player_id', 'username', 'score',
+                  'wins', 'draws', 'losses', 'buchholz', 'sonneborn_berger', 'progressive']
+
+
+class MatchSerializer(serializers.ModelSerializer):
+    """
+    Serializer for a Match and its result.
+
+    Attributes:
+        round_number (IntegerField): The number of the round the match belongs to.
+        result (SerializerMethodField): The result in '1-0', '0-1' or '1/2-1/2' notation, None while pending.
+
+    Meta:
+        model (Model): The model class that is being serialized.
+        fields (list): The list of fields to be included in the serialized representation.
+    """
+    round_number = serializers.IntegerField(source='round.round_number', read_only=True)
+    result = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Match
+        fields = ['id', 'tournament', 'round_number', 'white', 'black', 'winner', 'draw', 'result', 'played_at']
+
+    def get_result(self, match):
+        if match.draw:
+            return '1/2-1/2'
+        if match.winner_id is None:
+            return None
+        return '1-0' if match.winner_id == match.white_id else '0-1'
+
+
+class MatchResultSerializer(serializers.Serializer):
+    """
+    Serializer validating a submitted match result.
+
+    Fields:
+        result (str): '1-0' (white wins), '0-1' (black wins) or '1/2-1/2' (draw).
+        forfeit (bool): Whether the game was won by forfeit, logged as a `forfeit` event.
+    """
+    result = serializers.ChoiceField(choices=list(RESULT_POINTS))
+    forfeit = serializers.BooleanField(default=False)
+
+
+class ResultEventSerializer(serializers.ModelSerializer):
+    """
+    Serializer for an entry of a tournament's result log.
+
+    Meta:
+        model (Model): The model class that is being serialized.
+        fields (list): The list of fields to be included in the serialized representation.
+    """
+
+    class Meta:
+        model = ResultEvent
+        fields = ['id', 'match_id', 'round_number', 'white_id', 'black_id', 'white_points', 'kind', 'created_at',
+                  'created_by_id']
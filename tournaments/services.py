@@ -0,0 +1,1055 @@
+"""
+Server-side services that run tournaments on top of the models.
+
+The runner loads the working set of a tournament (participants, their scores and pairing history)
+once, keeps it in memory between rounds, and writes each round back in a single transaction: one
+bulk insert of the round's matches, one bulk update of the participants' standings, the
+round's standings snapshot and the rating update of its players. Between calls, each process keeps
+the runners of the tournaments it paired (`state.py`), so the next round of an event starts from
+warm state checked against the tournament's version instead of a full reload.
+
+Classes:
+    TournamentRunner: Pairs, plays and records the remaining rounds of a tournament.
+
+Functions:
+    close_registration(tournament_id): Assigns rating seeds to the participants of a tournament.
+    schedule_round_robin(tournament_id): Pairs every round of a round-robin in one bulk insert.
+    update_standings(rows): Writes standings and tiebreaks of many participants in one statement.
+    run_tournament(tournament_id, seed=None, progress=None): Runs every remaining round of a tournament.
+    pair_next_round(tournament_id, seed=None): Pairs and plays the next round, safe under concurrency.
+    pair_rounds(tournament_ids, workers=8, seed=None): Pairs the next round of many tournaments in parallel.
+    export_standings(tournament_id): Renders the current standings as CSV.
+    recompute_tiebreaks(tournament_id): Rebuilds standings and tiebreaks of a tournament in one pass.
+    replay_tournament(tournament_id, until=None, dry_run=False): Rebuilds standings from the result log.
+    record_result(match_id, white_points, forfeit, user): Sets a match result, logs it and updates tiebreaks.
+    reconcile_standings(tournament_id, dry_run=False): Repairs drifted scores and W/D/L in one statement.
+    ingest_pgn(tournament_id, path, workers=None): Stores the moves of a PGN file with the matching matches.
+    delete_statements(models=None): DELETE statements emptying the tables of a tournament, in chunks.
+    delete_tournament(tournament_id, chunk_size, progress): Deletes a tournament with chunked set-based DELETEs.
+"""
+
+import csv
+import io
+import json
+import multiprocessing
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from collections import deque
+
+from django.db import connection, connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import state
+from .events import append_results, match_results, replay, results_since
+from .models import (
+    Tournament, Participant, Player, Round, Match, GameScore, Forecast, StandingSnapshot, TournamentArchive,
+    ResultEvent
+)
+from .pairing import OpponentHistory, berger_schedule, seeded_pairings, swiss_pairings
+from .pgn import PGN_CHUNK_SIZE, parse_range, split_ranges
+from .ratings import rate_round
+from .standings import game_points, games_up_to, rank_standings, write_snapshot
+from .tiebreaks import TiebreakEngine, batch_tiebreaks, leaderboard_ordering
+
+
+# Result codes: 1 if white wins, 0 if draw, -1 if black wins.
+RESULTS = (1, 0, -1)
+
+# Points scored by white for each result notation.
+RESULT_POINTS = {'1-0': 1.0, '0-1': 0.0, '1/2-1/2': 0.5}
+
+STANDING_FIELDS = ('score', 'wins', 'draws', 'losses', 'buchholz', 'sonneborn_berger', 'progressive')
+
+# Rows deleted per statement (and per transaction) by `delete_tournament`.
+DELETE_CHUNK_SIZE = 20000
+# Models holding the rows of a tournament, children before their parents.
+TOURNAMENT_MODELS = (
+    ResultEvent, GameScore, Match, StandingSnapshot, Round, Participant, Forecast, TournamentArchive
+)
+
+
+def close_registration(tournament_id):
+    """
+    Close the registration of a tournament and seed its participants by rating.
+
+    Participants without a seed are numbered after the already seeded ones, by rating (highest
+    first, unrated last), then by registration order, with a single UPDATE ... FROM (SELECT
+    row_number() OVER ...) statement. Seeds are assigned once: calling this again only seeds
+    participants that registered later.
+
+    Returns:
+        int: The number of participants seeded.
+    """
+    with transaction.atomic():
+        tournament = Tournament.objects.select_for_update().get(id=tournament_id)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                UPDATE {Participant._meta.db_table} AS p
+                SET seed = s.seed
+                FROM (
+                    SELECT p.id,
+                           (SELECT COALESCE(MAX(seed), 0) FROM {Participant._meta.db_table} WHERE tournament_id = %(tournament)s)
+                           + row_number() OVER (ORDER BY pl.rating DESC NULLS LAST, p.id) AS seed
+                    FROM {Participant._meta.db_table} AS p
+                    JOIN {Player._meta.db_table} AS pl ON pl.id = p.player_id
+                    WHERE p.tournament_id = %(tournament)s AND p.seed IS NULL
+                ) AS s
+                WHERE p.id = s.id
+                """,
+                {'tournament': tournament_id},
+            )
+            seeded = cursor.rowcount
+        if tournament.registration_closed_at is None:
+            tournament.registration_closed_at = timezone.now()
+            tournament.save(update_fields=['registration_closed_at'])
+        Tournament.bump_version(tournament_id)
+    return seeded
+
+
+def schedule_round_robin(tournament_id):
+    """
+    Pair every round of a round-robin tournament up front, from the Berger tables.
+
+    Participants are numbered by seed (registration is closed first if needed). The tournament's
+    `num_of_rounds` becomes the length of the schedule, missing Round rows are created, and all
+    games are written with a single INSERT ... SELECT FROM unnest() statement, without results.
+    Byes are not stored: the participant missing from a round gets its bye when the round is played.
+
+    Returns:
+        dict: The tournament, the number of rounds and the number of matches created.
+
+    Raises:
+        ValueError: If the tournament is not a round-robin, has fewer than two participants or
+            already has matches.
+    """
+    with transaction.atomic():
+        tournament = Tournament.objects.select_for_update().get(id=tournament_id)
+        if not tournament.is_round_robin:
+            raise ValueError("Only round-robin tournaments are scheduled up front.")
+        if Match.objects.filter(tournament_id=tournament_id).exists():
+            raise ValueError("The tournament already has matches.")
+        if tournament.registration_closed_at is None or \
+                Participant.objects.filter(tournament_id=tournament_id, seed__isnull=True).exists():
+            close_registration(tournament_id)
+        participant_ids = list(
+            Participant.objects.filter(tournament_id=tournament_id).order_by('seed', 'id').values_list('id', flat=True)
+        )
+        if len(participant_ids) < 2:
+            raise ValueError("A round-robin needs at least two participants.")
+
+        schedule = berger_schedule(participant_ids, tournament.cycles)
+        Round.objects.filter(tournament_id=tournament_id, round_number__gt=len(schedule)).delete()
+        Round.objects.bulk_create(
+            [Round(tournament_id=tournament_id, round_number=number) for number in range(1, len(schedule) + 1)],
+            ignore_conflicts=True,
+        )
+        round_ids = dict(Round.objects.filter(tournament_id=tournament_id).values_list('round_number', 'id'))
+        Tournament.objects.filter(id=tournament_id).update(num_of_rounds=len(schedule))
+
+        games = [
+            (round_ids[number], white_id, black_id)
+            for number, (pairs, _) in enumerate(schedule, start=1)
+            for white_id, black_id in pairs
+        ]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {Match._meta.db_table} (tournament_id, round_id, white_id, black_id, draw, played_at)
+                SELECT %s, round_id, white_id, black_id, false, %s
+                FROM unnest(%s::bigint[], %s::bigint[], %s::bigint[]) AS g(round_id, white_id, black_id)
+                """,
+                [tournament_id, timezone.now(), *(list(column) for column in zip(*games))],
+            )
+        Tournament.bump_version(tournament_id)
+    return {'tournament': tournament_id, 'rounds': len(schedule), 'matches_created': len(games)}
+
+
+def _write_results(matches):
+    """Write winner, draw and played_at of many existing matches with one UPDATE ... FROM (VALUES ...)."""
+    if not matches:
+        return
+    placeholders = ", ".join(["(%s, %s, %s, %s)"] * len(matches))
+    params = [value for match in matches for value in (match.id, match.winner_id, match.draw, match.played_at)]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            UPDATE {Match._meta.db_table} AS m
+            SET winner_id = v.winner_id::bigint, draw = v.draw, played_at = v.played_at::timestamptz
+            FROM (VALUES {placeholders}) AS v(id, winner_id, draw, played_at)
+            WHERE m.id = v.id
+            """,
+            params,
+        )
+
+
+def update_standings(rows):
+    """
+    Write the standings of many participants with a single UPDATE ... FROM (VALUES ...) statement.
+
+    `QuerySet.bulk_update` builds one CASE expression per field and row, which is far slower
+    to compile than the statement itself for large tournaments.
+
+    Args:
+        rows (iterable): Dicts with participant_id and every field of STANDING_FIELDS.
+    """
+    rows = list(rows)
+    if not rows:
+        return
+    placeholders = ", ".join(["(%s, %s, %s, %s, %s, %s, %s, %s)"] * len(rows))
+    params = []
+    for row in rows:
+        params.append(row['participant_id'])
+        params.extend(row[field] for field in STANDING_FIELDS)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            UPDATE {Participant._meta.db_table} AS p
+            SET score = v.score::double precision, wins = v.wins, draws = v.draws, losses = v.losses,
+                buchholz = v.buchholz::double precision,
+                sonneborn_berger = v.sonneborn_berger::double precision,
+                progressive = v.progressive::double precision
+            FROM (VALUES {placeholders}) AS v(id, {', '.join(STANDING_FIELDS)})
+            WHERE p.id = v.id
+            """,
+            params,
+        )
+
+
+class TournamentRunner:
+    """
+    Runs the remaining rounds of a tournament with the working set held in memory.
+
+    Swiss rounds are paired one at a time from the current standings. Round-robin tournaments are
+    scheduled up front (`schedule_round_robin`), and playing a round fills in the results of its
+    scheduled games.
+
+    Attributes:
+        tournament (Tournament): The tournament being run.
+        participant_ids (list): Ids of the tournament's participants, ordered by seed.
+        seeds (dict): Maps a participant id to its seed, assigned when registration closed.
+        engine (TiebreakEngine): Scores, W/D/L and tiebreaks, updated incrementally per game.
+        history (OpponentHistory): Who has already played whom, for rematch checks without queries.
+        color_balance (dict): Maps a participant id to (games as white - games as black).
+        had_bye (set): Participant ids that already received a bye.
+        scheduled (set): Participant ids that appear in the tournament's matches.
+        results (dict): Maps a match id to (white_id, black_id, white_points, round_number); the
+            points are None until the game has a result.
+        version (int): The tournament version the state matches.
+        stamp (tuple): Counts, largest ids and checksums of the participants, matches and result
+            events the state matches (see `state.read_stamp`).
+    """
+
+    def __init__(self, tournament, rng=None):
+        self.tournament = tournament
+        self.rng = rng or random.Random()
+        self.chain = tournament.tiebreak_chain()
+        self.load()
+
+    def load(self):
+        """Load participants and replay the already played rounds into memory."""
+        if self.tournament.registration_closed_at is None or \
+                Participant.objects.filter(tournament=self.tournament, seed__isnull=True).exists():
+            close_registration(self.tournament.id)
+        # Read before the rows: whatever changes while they load makes the stamp differ next time.
+        self.version, self.stamp = state.read_stamp(self.tournament.id)
+        self.seeds = dict(Participant.objects.filter(tournament=self.tournament).values_list('id', 'seed'))
+        self.participant_ids = sorted(self.seeds, key=self.seeds.get)
+        self.history = OpponentHistory(self.participant_ids)
+        self.color_balance = dict.fromkeys(self.participant_ids, 0)
+        self.had_bye = set()
+        self.scheduled = set()
+        self.games_played = 0
+
+        self.results = {}
+
+        matches = (
+            Match.objects.filter(tournament=self.tournament)
+            .order_by('round__round_number', 'id')
+            .values_list('id', 'white_id', 'black_id', 'winner_id', 'draw', 'round__round_number')
+        )
+        for match_id, white_id, black_id, winner_id, draw, round_number in matches:
+            self._remember(white_id, black_id)
+            self.scheduled.update((white_id, black_id))
+            self.games_played += 1
+            self.results[match_id] = (white_id, black_id, game_points(white_id, black_id, winner_id, draw),
+                                      round_number)
+        self.scheduled.discard(None)
+        self.engine = TiebreakEngine.from_games(self.participant_ids, self._finished_games())
+
+    def _finished_games(self):
+        return [game for game in self.results.values() if game[2] is not None]
+
+    def refresh(self, tournament):
+        """
+        Bring the state up to date with `tournament`, as just read from the database.
+
+        Nothing is read if the version is unchanged. Otherwise, if the only changes are new result
+        events, they are applied to `results` and the standings are recomputed in memory; anything
+        else reloads the state.
+
+        Returns:
+            str: 'warm' if the state was current, 'delta' if results were applied, 'reload' otherwise.
+        """
+        self.tournament = tournament
+        self.chain = tournament.tiebreak_chain()
+        if tournament.version == self.version:
+            return 'warm'
+        version, stamp = state.read_stamp(tournament.id)
+        # Same participants and seeds, same number of matches: only results may have changed.
+        if stamp[:5] == self.stamp[:5]:
+            events = results_since(tournament.id, self.stamp[7])
+            # Events are never deleted, so a count that does not add up means an event committed
+            # out of id order: the state cannot tell which one it missed.
+            if self.stamp[6] + len(events) == stamp[6] and all(match_id in self.results for match_id, _ in events):
+                results = dict(self.results)
+                for match_id, white_points in events:
+                    white_id, black_id, _, round_number = results[match_id]
+                    results[match_id] = (white_id, black_id, white_points, round_number)
+                # A game edited without an event (or a pairing edited) leaves the checksums apart.
+                if state.game_checksum(results) == stamp[5]:
+                    self.results = results
+                    if events:
+                        self.engine = TiebreakEngine.from_games(self.participant_ids, self._finished_games())
+                    self.version, self.stamp = version, stamp
+                    return 'delta'
+        self.load()
+        return 'reload'
+
+    def _remember(self, white_id, black_id):
+        if black_id is None:
+            self.had_bye.add(white_id)
+            return
+        self.history.add(white_id, black_id)
+        self.color_balance[white_id] += 1
+        self.color_balance[black_id] -= 1
+
+    def ranking(self):
+        """Participant ids ordered by current score (best first), ties broken by seed."""
+        score, seeds = self.engine.score, self.seeds
+        return sorted(self.participant_ids, key=lambda pid: (-score[pid], seeds[pid]))
+
+    def rounds_to_play(self):
+        """
+        Rounds of the tournament left to play, in order.
+
+        For a Swiss tournament these are the rounds without matches, and missing Round rows are
+        created. A round-robin is scheduled first if it has no matches yet, and its rounds left are
+        the ones not closed. Arenas have no rounds to play: their games are paired from the lobby
+        (see `arena.py`).
+        """
+        if self.tournament.is_arena:
+            return []
+        if self.tournament.is_round_robin:
+            if not self.games_played:
+                try:
+                    schedule_round_robin(self.tournament.id)
+                except ValueError:
+                    pass  # Scheduled concurrently by another runner.
+                self.tournament.refresh_from_db(fields=['num_of_rounds', 'registration_closed_at'])
+                self.load()
+            return list(Round.objects.filter(tournament=self.tournament, closed_at__isnull=True).order_by('round_number'))
+
+        existing = {r.round_number: r for r in Round.objects.filter(tournament=self.tournament)}
+        missing = [
+            Round(tournament=self.tournament, round_number=number)
+            for number in range(1, self.tournament.num_of_rounds + 1)
+            if number not in existing
+        ]
+        if missing:
+            # Concurrent runners may create the same rounds; the unique constraint keeps one of each.
+            Round.objects.bulk_create(missing, ignore_conflicts=True)
+            existing = {r.round_number: r for r in Round.objects.filter(tournament=self.tournament)}
+
+        played = set(Match.objects.filter(tournament=self.tournament).values_list('round_id', flat=True).distinct())
+        return [existing[number] for number in sorted(existing) if existing[number].id not in played]
+
+    def play_round(self, current_round):
+        """
+        Pair one round, simulate its results and write it to the database.
+
+        The round row is locked with SELECT ... FOR UPDATE for the whole transaction, so concurrent
+        runners of the same tournament serialize on it. If another runner has paired the round
+        (or closed the round, in a round-robin) in the meantime, nothing is written.
+
+        Returns:
+            list: The created or completed Match instances, or None if the round was already played.
+        """
+        with transaction.atomic():
+            locked = Round.objects.select_for_update().filter(pk=current_round.pk).first()
+            if self.tournament.is_round_robin:
+                if locked is None or locked.closed_at is not None:
+                    return None
+            elif Match.objects.filter(round_id=current_round.pk).exists():
+                return None
+            return self._play_locked_round(current_round)
+
+    def _simulate(self, white_id, black_id):
+        """Draw a random result: the winner id (None for a draw) and whether it is a draw."""
+        result = 1 if black_id is None else self.rng.choice(RESULTS)
+        self.engine.add_result(white_id, black_id, (result + 1) / 2)
+        return None if result == 0 else (white_id if result == 1 else black_id), result == 0
+
+    def _pair_round(self, current_round, now):
+        """Pair a Swiss round, simulate its games and insert its matches."""
+        if self.games_played:
+            pairs, bye = swiss_pairings(self.ranking(), self.history, self.color_balance, self.had_bye)
+        else:
+            pairs, bye = seeded_pairings(self.participant_ids)
+        if bye is not None:
+            pairs.append((bye, None))
+
+        matches = []
+        for white_id, black_id in pairs:
+            winner_id, draw = self._simulate(white_id, black_id)
+            matches.append(Match(
+                tournament=self.tournament,
+                round=current_round,
+                white_id=white_id,
+                black_id=black_id,
+                winner_id=winner_id,
+                draw=draw,
+                played_at=now,
+            ))
+            self._remember(white_id, black_id)
+            self.games_played += 1
+        Match.objects.bulk_create(matches)
+        return matches
+
+    def _play_scheduled_round(self, current_round, now):
+        """
+        Simulate the games of a scheduled round-robin round that have no result yet, keeping results
+        recorded beforehand, and give the bye to the scheduled participant missing from the round.
+        """
+        games = list(Match.objects.filter(round=current_round).order_by('id'))
+        present = {pid for match in games for pid in (match.white_id, match.black_id)}
+        played = []
+        for match in games:
+            if game_points(match.white_id, match.black_id, match.winner_id, match.draw) is not None:
+                continue
+            match.winner_id, match.draw = self._simulate(match.white_id, match.black_id)
+            match.played_at = now
+            played.append(match)
+        _write_results(played)
+
+        byes = []
+        for participant_id in sorted(self.scheduled - present, key=self.seeds.get):
+            self._simulate(participant_id, None)
+            byes.append(Match(tournament=self.tournament, round=current_round, white_id=participant_id,
+                              winner_id=participant_id, played_at=now))
+            self._remember(participant_id, None)
+            self.games_played += 1
+        Match.objects.bulk_create(byes)
+        return played + byes
+
+    def _play_locked_round(self, current_round):
+        now = timezone.now()
+        if self.tournament.is_round_robin:
+            matches = self._play_scheduled_round(current_round, now)
+        else:
+            matches = self._pair_round(current_round, now)
+
+        rows = match_results(matches, current_round.round_number)
+        append_results(self.tournament.id, rows)
+        for match_id, _, white_id, black_id, points in rows:
+            self.results[match_id] = (white_id, black_id, points, current_round.round_number)
+        if any(points is not None and number > current_round.round_number for _, _, points, number in self.results.values()):
+            # Results recorded ahead of this round come after it in the progressive score.
+            self.engine = TiebreakEngine.from_games(self.participant_ids, self._finished_games())
+        rows = self.engine.rows()
+        update_standings(rows)
+        write_snapshot(self.tournament.id, current_round.round_number, rank_standings(rows, self.chain, self.seeds))
+        current_round.closed_at = now
+        current_round.save(update_fields=['closed_at'])
+        rate_round(current_round)
+        Tournament.bump_version(self.tournament.id)
+        # The tournament row stays locked by the bump until commit, so this is the committed version.
+        self.version, self.stamp = state.read_stamp(self.tournament.id)
+        return matches
+
+    def run(self, progress=None):
+        """
+        Play every remaining round in order.
+
+        Args:
+            progress (callable, optional): Called as `progress(done, total)` after each round.
+
+        Returns:
+            dict: Summary with the number of rounds played and matches created.
+        """
+        rounds_played = 0
+        matches_created = 0
+        if len(self.participant_ids) >= 2:
+            rounds = self.rounds_to_play()
+            for current_round in rounds:
+                matches = self.play_round(current_round)
+                if matches is None:
+                    # Another runner paired this round; continue from the state it left behind.
+                    self.load()
+                    continue
+                matches_created += len(matches)
+                rounds_played += 1
+                if progress is not None:
+                    progress(rounds_played, len(rounds))
+        return {
+            'tournament': self.tournament.id,
+            'rounds_played': rounds_played,
+            'matches_created': matches_created,
+        }
+
+
+def _warm_runner(tournament_id, seed=None):
+    """The runner of a tournament: the warm one of this process, brought up to date, or a new one."""
+    tournament = Tournament.objects.get(id=tournament_id)
+    runner = state.take(tournament_id)
+    if runner is None:
+        return TournamentRunner(tournament, rng=random.Random(seed))
+    runner.rng = random.Random(seed)
+    runner.refresh(tournament)
+    return runner
+
+
+def _keep_on_commit(runner):
+    """
+    Put a runner back into the cache once the caller's transaction commits.
+
+    Outside a transaction this happens at once. Inside one (the idempotent views wrap the pairing
+    in `transaction.atomic`), a rollback discards the callback and the runner, taken out of the
+    cache by `_warm_runner`, is dropped instead of staying ahead of the database.
+    """
+    transaction.on_commit(lambda: state.keep(runner))
+
+
+def run_tournament(tournament_id, seed=None, progress=None):
+    """
+    Pair, play and record all remaining rounds of a tournament on the server.
+
+    Args:
+        tournament_id (int): The ID of the tournament to run.
+        seed (int, optional): Seed for the random results, for reproducible runs.
+        progress (callable, optional): Called as `progress(done, total)` after each round.
+
+    Returns:
+        dict: Summary with the number of rounds played and matches created.
+    """
+    runner = _warm_runner(tournament_id, seed)
+    summary = runner.run(progress=progress)
+    _keep_on_commit(runner)
+    return summary
+
+
+def pair_next_round(tournament_id, seed=None):
+    """
+    Pair, play and record only the next unpaired round of a tournament.
+
+    Safe to call concurrently: the round row is locked while it is paired, and a caller that
+    finds the round already paired by someone else returns without writing anything. Consecutive
+    rounds paired by the same process start from its warm runner (`state.py`).
+
+    Returns:
+        dict: The tournament, the round number and the number of matches created, or None if
+            there was no round left or it was paired concurrently.
+    """
+    runner = _warm_runner(tournament_id, seed)
+    rounds = runner.rounds_to_play() if len(runner.participant_ids) >= 2 else []
+    matches = runner.play_round(rounds[0]) if rounds else None
+    # A runner whose round failed is dropped: its memory may be ahead of the rolled back database.
+    _keep_on_commit(runner)
+    if matches is None:
+        return None
+    return {'tournament': tournament_id, 'round': rounds[0].round_number, 'matches_created': len(matches)}
+
+
+def _pair_in_thread(tournament_id, seed):
+    try:
+        return pair_next_round(tournament_id, seed=seed)
+    finally:
+        # Each worker thread has its own database connection.
+        connections.close_all()
+
+
+def pair_rounds(tournament_ids, workers=8, seed=None):
+    """
+    Pair the next round of many tournaments in parallel on a pool of threads.
+
+    Tournaments are independent, so they are paired concurrently, each in its own transaction and
+    on its own database connection. Duplicate ids are safe: the round lock lets only one of them
+    pair a given round.
+
+    Args:
+        tournament_ids (iterable): The tournaments to pair.
+        workers (int): The number of threads, i.e. of concurrent database connections.
+        seed (int, optional): Seed for the random results.
+
+    Returns:
+        list: The summaries of the rounds that were paired, in the order of `tournament_ids`.
+    """
+    tournament_ids = list(tournament_ids)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(_pair_in_thread, tournament_ids, [seed] * len(tournament_ids)))
+    return [result for result in results if result is not None]
+
+
+def export_standings(tournament_id):
+    """
+    Render the current standings of a tournament as CSV.
+
+    Returns:
+        str: CSV with one row per participant, best first.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    chain = Tournament.objects.get(id=tournament_id).tiebreak_chain()
+    writer.writerow(['rank', 'participant_id', 'player_id', 'username', 'score', 'wins', 'draws', 'losses', *chain])
+    rows = (
+        Participant.objects.filter(tournament_id=tournament_id)
+        .order_by(*leaderboard_ordering(chain))
+        .values_list('id', 'player_id', 'player__user__username', 'score', 'wins', 'draws', 'losses', *chain)
+    )
+    for rank, row in enumerate(rows.iterator(chunk_size=2000), start=1):
+        writer.writerow([rank, *row])
+    return buffer.getvalue()
+
+
+def recompute_tiebreaks(tournament_id):
+    """
+    Recompute score, W/D/L and tiebreaks of every participant of a tournament from its matches.
+
+    The whole tournament is recomputed in one vectorized pass and written with a single UPDATE.
+
+    Returns:
+        int: The number of participants written.
+    """
+    participant_ids = list(Participant.objects.filter(tournament_id=tournament_id).values_list('id', flat=True))
+    rows = batch_tiebreaks(participant_ids, games_up_to(tournament_id))
+    with transaction.atomic():
+        update_standings(rows)
+        Tournament.bump_version(tournament_id)
+    return len(rows)
+
+
+def replay_tournament(tournament_id, until=None, dry_run=False):
+    """
+    Rebuild score, W/D/L and tiebreaks of every participant of a tournament from its result log.
+
+    The log is replayed in one vectorized pass (`events.replay`) and the projections are written
+    with a single UPDATE. With `until`, they are rebuilt as they were after that event.
+
+    Returns:
+        dict: The number of games replayed, of participants, and of participants whose stored
+            standings differed from the replay.
+    """
+    rows, games = replay(tournament_id, until)
+    stored = {
+        row[0]: row[1:]
+        for row in Participant.objects.filter(tournament_id=tournament_id).values_list('id', *STANDING_FIELDS)
+    }
+    changed = [
+        row for row in rows
+        if any(abs(row[field] - value) > 1e-9 for field, value in zip(STANDING_FIELDS, stored[row['participant_id']]))
+    ]
+    if changed and not dry_run:
+        with transaction.atomic():
+            update_standings(changed)
+            Tournament.bump_version(tournament_id)
+    return {'tournament': tournament_id, 'games': games, 'participants': len(rows), 'changed': len(changed)}
+
+
+def _participant_games(tournament_id, participant_ids, exclude_match_id):
+    """
+    Finished games of the given participants as
+    {participant_id: [(opponent_id, points, round_number, match_id)]}.
+
+    Byes appear with opponent None.
+    """
+    games = {pid: [] for pid in participant_ids}
+    rows = (
+        Match.objects.filter(tournament_id=tournament_id)
+        .filter(Q(white_id__in=participant_ids) | Q(black_id__in=participant_ids))
+        .exclude(pk=exclude_match_id)
+        .values_list('id', 'white_id', 'black_id', 'winner_id', 'draw', 'round__round_number')
+    )
+    for match_id, white_id, black_id, winner_id, draw, round_number in rows:
+        points = game_points(white_id, black_id, winner_id, draw)
+        if points is None:
+            continue
+        if white_id in games:
+            games[white_id].append((black_id, points, round_number, match_id))
+        if black_id in games:
+            games[black_id].append((white_id, 1 - points, round_number, match_id))
+    return games
+
+
+def record_result(match_id, white_points, forfeit=False, user=None):
+    """
+    Set or correct the result of a match and update standings and tiebreaks incrementally.
+
+    The result is appended to the tournament's result log (`events.py`) as a `set`, `corrected` or
+    `forfeit` event. Only the two players and their opponents are touched: the players' Buchholz,
+    Sonneborn-Berger and progressive scores are rebuilt from their own games, and each opponent's
+    sums are shifted by the change of the player's score. Recording the same result twice is a
+    no-op, unless it is now a forfeit, which is only logged.
+
+    Args:
+        match_id (int): The ID of the match.
+        white_points (float): Points scored by white: 1, 0.5 or 0.
+        forfeit (bool): Whether the game was won by forfeit.
+        user (User, optional): Who recorded the result, for the log.
+
+    Returns:
+        Match: The updated match.
+
+    Raises:
+        ValueError: If the match is a bye or the points are not 1, 0.5 or 0.
+    """
+    if white_points not in (0, 0.5, 1):
+        raise ValueError("A result must give white 1, 0.5 or 0 points.")
+
+    with transaction.atomic():
+        match = Match.objects.select_for_update().select_related('round').get(pk=match_id)
+        white_id, black_id = match.white_id, match.black_id
+        if black_id is None:
+            raise ValueError("A bye has no result to record.")
+
+        old_points = game_points(white_id, black_id, match.winner_id, match.draw)
+        kind = ResultEvent.FORFEIT if forfeit else ResultEvent.SET if old_points is None else ResultEvent.CORRECTED
+        if old_points == white_points:
+            if forfeit:
+                append_results(match.tournament_id, [(match.pk, match.round.round_number, white_id, black_id,
+                                                      white_points)], kind, user)
+            return match
+
+        players = {
+            p.id: p for p in Participant.objects.select_for_update().filter(id__in=(white_id, black_id)).order_by('id')
+        }
+        match.draw = white_points == 0.5
+        match.winner_id = None if match.draw else (white_id if white_points == 1 else black_id)
+        match.save(update_fields=['draw', 'winner'])
+
+        games = _participant_games(match.tournament_id, (white_id, black_id), match.pk)
+        round_number = match.round.round_number
+        games[white_id].append((black_id, white_points, round_number, match.pk))
+        games[black_id].append((white_id, 1 - white_points, round_number, match.pk))
+
+        new_score = {pid: sum(game[1] for game in games[pid]) for pid in players}
+        opponent_ids = {game[0] for pid in players for game in games[pid] if game[0] is not None} - set(players)
+        score = dict(Participant.objects.filter(id__in=opponent_ids).values_list('id', 'score'))
+        score.update(new_score)
+
+        rows, deltas = [], {}
+        for pid, player in players.items():
+            row = {'participant_id': pid, 'score': new_score[pid], 'buchholz': 0.0, 'sonneborn_berger': 0.0,
+                   'progressive': 0.0, 'wins': 0, 'draws': 0, 'losses': 0}
+            cumulative = 0.0
+            for opponent, points, _, _ in sorted(games[pid], key=lambda game: (game[2], game[3])):
+                row['wins' if points == 1 else 'draws' if points == 0.5 else 'losses'] += 1
+                cumulative += points
+                row['progressive'] += cumulative
+                if opponent is None:
+                    continue
+                row['buchholz'] += score[opponent]
+                row['sonneborn_berger'] += points * score[opponent]
+                if opponent not in players:
+                    change = new_score[pid] - player.score
+                    buchholz, sonneborn_berger = deltas.get(opponent, (0.0, 0.0))
+                    deltas[opponent] = (buchholz + change, sonneborn_berger + (1 - points) * change)
+            rows.append(row)
+
+        update_standings(rows)
+        _shift_tiebreaks(deltas)
+        append_results(match.tournament_id, [(match.pk, round_number, white_id, black_id, white_points)], kind, user)
+        Tournament.bump_version(match.tournament_id)
+    return match
+
+
+def _shift_tiebreaks(deltas):
+    """Add (buchholz, sonneborn_berger) deltas to many participants in one statement."""
+    deltas = {pid: delta for pid, delta in deltas.items() if delta != (0.0, 0.0)}
+    if not deltas:
+        return
+    placeholders = ", ".join(["(%s, %s, %s)"] * len(deltas))
+    params = [value for pid, (buchholz, sonneborn_berger) in deltas.items() for value in (pid, buchholz, sonneborn_berger)]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            UPDATE {Participant._meta.db_table} AS p
+            SET buchholz = p.buchholz + v.buchholz::double precision,
+                sonneborn_berger = p.sonneborn_berger + v.sonneborn_berger::double precision
+            FROM (VALUES {placeholders}) AS v(id, buchholz, sonneborn_berger)
+            WHERE p.id = v.id
+            """,
+            params,
+        )
+
+
+def reconcile_standings(tournament_id, dry_run=False):
+    """
+    Recompute score and W/D/L of every participant of a tournament from its matches.
+
+    The games of both colors are aggregated per participant by PostgreSQL and written back with one
+    UPDATE ... FROM (SELECT ... GROUP BY) statement. Only rows whose stored values differ are
+    updated, and the aggregate carries the stored values along so they can be reported.
+
+    Args:
+        tournament_id (int): The ID of the tournament.
+        dry_run (bool): Report the drifted rows but roll the update back.
+
+    Returns:
+        list: One dict per drifted participant with participant_id, `old` and `new`, each a
+            (score, wins, draws, losses) tuple.
+    """
+    participants, matches = Participant._meta.db_table, Match._meta.db_table
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            WITH games AS (
+                SELECT white_id AS participant_id,
+                       CASE WHEN black_id IS NULL OR winner_id = white_id THEN 1.0
+                            WHEN draw THEN 0.5 ELSE 0.0 END AS points
+                FROM {matches}
+                WHERE tournament_id = %(tournament)s AND (black_id IS NULL OR draw OR winner_id IS NOT NULL)
+                UNION ALL
+                SELECT black_id,
+                       CASE WHEN winner_id = black_id THEN 1.0 WHEN draw THEN 0.5 ELSE 0.0 END
+                FROM {matches}
+                WHERE tournament_id = %(tournament)s AND black_id IS NOT NULL AND (draw OR winner_id IS NOT NULL)
+            ),
+            totals AS (
+                SELECT participant_id,
+                       SUM(points)::double precision AS score,
+                       COUNT(*) FILTER (WHERE points = 1.0) AS wins,
+                       COUNT(*) FILTER (WHERE points = 0.5) AS draws,
+                       COUNT(*) FILTER (WHERE points = 0.0) AS losses
+                FROM games
+                GROUP BY participant_id
+            ),
+            drift AS (
+                SELECT p.id, p.score AS old_score, p.wins AS old_wins, p.draws AS old_draws, p.losses AS old_losses,
+                       COALESCE(t.score, 0) AS score, COALESCE(t.wins, 0) AS wins,
+                       COALESCE(t.draws, 0) AS draws, COALESCE(t.losses, 0) AS losses
+                FROM {participants} AS p
+                LEFT JOIN totals AS t ON t.participant_id = p.id
+                WHERE p.tournament_id = %(tournament)s
+            )
+            UPDATE {participants} AS p
+            SET score = d.score, wins = d.wins, draws = d.draws, losses = d.losses
+            FROM drift AS d
+            WHERE p.id = d.id
+              AND (d.old_score, d.old_wins, d.old_draws, d.old_losses) IS DISTINCT FROM (d.score, d.wins, d.draws, d.losses)
+            RETURNING p.id, d.old_score, d.old_wins, d.old_draws, d.old_losses, d.score, d.wins, d.draws, d.losses
+            """,
+            {'tournament': tournament_id},
+        )
+        drifted = [
+            {'participant_id': row[0], 'old': tuple(row[1:5]), 'new': tuple(row[5:9])}
+            for row in cursor.fetchall()
+        ]
+        if dry_run:
+            transaction.set_rollback(True)
+        elif drifted:
+            Tournament.bump_version(tournament_id)
+    return drifted
+
+
+def _name_key(name):
+    return ' '.join(name.casefold().replace(',', ', ').split())
+
+
+def _participant_keys(tournament_id):
+    """
+    Map player names, as they can appear in PGN tags, to participant ids.
+
+    Each participant is known by "last, first", "first last" and the username (`fide<id>` for
+    players imported from TRF). Names shared by two participants map to None.
+    """
+    keys = {}
+    rows = Participant.objects.filter(tournament_id=tournament_id).values_list(
+        'id', 'player__user__username', 'player__user__first_name', 'player__user__last_name'
+    )
+    for pid, username, first_name, last_name in rows.iterator(chunk_size=5000):
+        names = {_name_key(username)}
+        if first_name or last_name:
+            names |= {_name_key(f"{last_name}, {first_name}"), _name_key(f"{first_name} {last_name}")}
+        for name in names:
+            keys[name] = pid if keys.get(name, pid) == pid else None
+    return keys
+
+
+def _player_key(tags, color):
+    fide_id = tags.get(f'{color}FideId', '').strip()
+    return f"fide{fide_id}" if fide_id.isdigit() else _name_key(tags.get(color, ''))
+
+
+def _write_game_scores(rows):
+    """Insert or replace many game scores with one INSERT ... SELECT FROM unnest(...) statement."""
+    if not rows:
+        return
+    match_ids, ply_counts, moves, tags = zip(*rows)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {GameScore._meta.db_table} (match_id, ply_count, moves, tags)
+            SELECT * FROM unnest(%s::bigint[], %s::integer[], %s::bytea[], %s::text[]::jsonb[])
+            ON CONFLICT (match_id) DO UPDATE
+            SET ply_count = EXCLUDED.ply_count, moves = EXCLUDED.moves, tags = EXCLUDED.tags
+            """,
+            [list(match_ids), list(ply_counts), list(moves), list(tags)],
+        )
+
+
+def _parse_on_pool(pool, path, ranges, window):
+    """
+    Parse byte ranges on a process pool and yield their games in file order, with at most `window`
+    ranges in flight so that parsed games never pile up in memory faster than they are written.
+    """
+    pending = deque()
+    for start, end in ranges:
+        pending.append(pool.submit(parse_range, path, start, end))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def ingest_pgn(tournament_id, path, workers=None, chunk_size=PGN_CHUNK_SIZE, batch_size=5000, progress=None):
+    """
+    Store the moves of every game of a PGN file with the match it was played in.
+
+    The file is memory-mapped and cut into ranges at game boundaries, which a pool of `workers`
+    processes (default: one per CPU) parse in parallel; `workers=0` parses in this process. A game is mapped to a match of
+    the tournament by its round (the `Round` tag, "3" or "3.12") and its players (the `WhiteFideId`
+    and `BlackFideId` tags, or the `White` and `Black` names). Game scores are written in batches of
+    `batch_size` rows; ingesting a file again replaces the stored moves.
+
+    Args:
+        progress (callable, optional): Called as `progress(done, total)` after each parsed range.
+
+    Returns:
+        dict: Summary with the number of games read, stored and unmatched, and the number of
+            stored games whose `Result` tag differs from the recorded result.
+    """
+    keys = _participant_keys(tournament_id)
+    matches = {}
+    rows = Match.objects.filter(tournament_id=tournament_id, black__isnull=False).values_list(
+        'id', 'round__round_number', 'white_id', 'black_id', 'winner_id', 'draw'
+    )
+    for match_id, number, white_id, black_id, winner_id, draw in rows.iterator(chunk_size=5000):
+        matches[(number, white_id)] = (match_id, black_id, game_points(white_id, black_id, winner_id, draw))
+
+    ranges = split_ranges(path, chunk_size)
+    if workers == 0 or len(ranges) < 2:
+        pool = None
+        chunks = (parse_range(path, start, end) for start, end in ranges)
+    else:
+        workers = workers or os.cpu_count()
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        chunks = _parse_on_pool(pool, path, ranges, window=2 * workers)
+
+    summary = {'games': 0, 'stored': 0, 'unmatched': 0, 'result_mismatches': 0}
+    batch = {}
+    try:
+        for done, games in enumerate(chunks, start=1):
+            for tags, moves, ply_count in games:
+                summary['games'] += 1
+                try:
+                    number = int(tags.get('Round', '').split('.')[0])
+                except ValueError:
+                    number = None
+                white_id, black_id = keys.get(_player_key(tags, 'White')), keys.get(_player_key(tags, 'Black'))
+                match = matches.get((number, white_id))
+                if match is None or white_id is None or match[1] != black_id:
+                    summary['unmatched'] += 1
+                    continue
+                match_id, _, points = match
+                if tags.get('Result', '*') != '*' and RESULT_POINTS.get(tags['Result']) != points:
+                    summary['result_mismatches'] += 1
+                batch[match_id] = (match_id, ply_count, moves, json.dumps(tags))
+                if len(batch) >= batch_size:
+                    _write_game_scores(list(batch.values()))
+                    summary['stored'] += len(batch)
+                    batch = {}
+            if progress is not None:
+                progress(done, len(ranges))
+        _write_game_scores(list(batch.values()))
+        summary['stored'] += len(batch)
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+    return summary
+
+
+def delete_statements(models=None):
+    """
+    (model, DELETE statement) pairs emptying the tables of a tournament, children before their parents.
+
+    Each statement deletes at most `%(limit)s` rows (all of them with a NULL limit) of the
+    tournament `%(tournament)s`, found through the tournament_id indexes.
+
+    Args:
+        models (iterable, optional): Only these of `TOURNAMENT_MODELS`.
+    """
+    statements = []
+    for model in TOURNAMENT_MODELS:
+        if models is not None and model not in models:
+            continue
+        table, pk = model._meta.db_table, model._meta.pk.column
+        if model is GameScore:
+            rows = (f"SELECT g.match_id FROM {table} AS g JOIN {Match._meta.db_table} AS m ON m.id = g.match_id "
+                    f"WHERE m.tournament_id = %(tournament)s LIMIT %(limit)s")
+        else:
+            rows = f"SELECT {pk} FROM {table} WHERE tournament_id = %(tournament)s LIMIT %(limit)s"
+        statements.append((model, f"DELETE FROM {table} WHERE {pk} IN ({rows})"))
+    return statements
+
+
+def delete_tournament(tournament_id, chunk_size=DELETE_CHUNK_SIZE, progress=None):
+    """
+    Delete a tournament with its participants, rounds, matches, game scores, standings snapshots,
+    forecast and archive, without Django's cascade collector.
+
+    `Tournament.delete()` loads every related row into memory to emulate `on_delete=CASCADE` and
+    deletes them all in one transaction. Here each table is emptied, children first, by set-based
+    DELETE statements of at most `chunk_size` rows, each in its own short transaction, so memory
+    stays flat and no lock is held for long. Readers see the tournament shrink meanwhile. The
+    tournament row goes last, in a transaction that locks it and sweeps any row added since, so a
+    delete racing a pairing leaves nothing behind.
+
+    Args:
+        progress (callable, optional): Called as `progress(done, total)` after each chunk, in rows.
+
+    Returns:
+        dict: The number of rows deleted per table.
+    """
+    statements = delete_statements()
+    total = sum(
+        (GameScore.objects.filter(match__tournament_id=tournament_id) if model is GameScore
+         else model.objects.filter(tournament_id=tournament_id)).count()
+        for model, _ in statements
+    )
+    deleted = {model._meta.db_table: 0 for model, _ in statements}
+    done = 0
+    with connection.cursor() as cursor:
+        for model, sql in statements:
+            table = model._meta.db_table
+            while True:
+                with transaction.atomic():
+                    cursor.execute(sql, {'tournament': tournament_id, 'limit': chunk_size})
+                    count = cursor.rowcount
+                deleted[table] += count
+                done += count
+                if progress is not None and count:
+                    progress(done, max(total, done))
+                if count < chunk_size:
+                    break
+
+        with transaction.atomic():
+            cursor.execute(f"SELECT id FROM {Tournament._meta.db_table} WHERE id = %s FOR UPDATE", [tournament_id])
+            if cursor.fetchone() is not None:
+                for model, sql in statements:
+                    cursor.execute(sql, {'tournament': tournament_id, 'limit': None})
+                    deleted[model._meta.db_table] += cursor.rowcount
+            cursor.execute(f"DELETE FROM {Tournament._meta.db_table} WHERE id = %s", [tournament_id])
+            deleted[Tournament._meta.db_table] = cursor.rowcount
+    return deleted
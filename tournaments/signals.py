@@ -0,0 +1,29 @@
+"""
+Keep tournament versions in step with edits of the players shown in their participant lists.
+
+Participant lists embed each player's profile, so saving a player or their user account changes
+the payload of every tournament the player takes part in. Bulk writes that bypass `save()` (such
+as `ratings.update_ratings`) bump the versions themselves.
+"""
+
+from django.contrib.auth.models import User
+from django.db.models.signals import post_save, pre_delete
+from django.dispatch import receiver
+
+from users.models import Player
+from .models import Tournament
+
+
+@receiver(post_save, sender=Player)
+@receiver(pre_delete, sender=Player)
+def player_changed(sender, instance, created=False, **kwargs):
+    if created:
+        return
+    Tournament.bump_player_versions([instance.pk])
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, created, update_fields=None, **kwargs):
+    if created or (update_fields is not None and set(update_fields) <= {'last_login', 'password'}):
+        return
+    Tournament.bump_player_versions(Player.objects.filter(user_id=instance.pk).values('id'))
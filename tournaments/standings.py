@@ -0,0 +1,130 @@
+"""
+Per-round standings snapshots.
+
+When a round closes, the standings of every participant (rank, score, W/D/L and tiebreaks) are
+computed once and stored as `StandingSnapshot` rows. Historical leaderboards are then served by a
+single range scan over the (tournament, round_number, rank) index, instead of replaying every
+`Match` up to the requested round.
+
+Functions:
+    rank_standings(rows, chain, seeds): Orders standings rows by score, a tiebreak chain and seed and ranks them.
+    compute_standings(participant_ids, games, chain, seeds): Ranks participants from a list of finished games.
+    games_up_to(tournament_id, round_number): Loads finished games of the first rounds in one query.
+    write_snapshot(tournament_id, round_number, standings): Stores standings with one bulk insert.
+    close_round(round_obj): Stores the snapshot of a round, marks it closed and rates its games.
+"""
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Match, Participant, StandingSnapshot, Tournament
+from .ratings import rate_round
+from .tiebreaks import batch_tiebreaks, standings_key
+
+
+def game_points(white_id, black_id, winner_id, draw):
+    """Points scored by white in a finished game, or None if the game has no result yet."""
+    if black_id is None:
+        return 1.0
+    if draw:
+        return 0.5
+    if winner_id is None:
+        return None
+    return 1.0 if winner_id == white_id else 0.0
+
+
+def rank_standings(rows, chain, seeds=None):
+    """Sort standings rows by score, the tiebreak chain and seed, best first, and number their ranks."""
+    ordered = sorted(rows, key=standings_key(chain, seeds))
+    for rank, row in enumerate(ordered, start=1):
+        row['rank'] = rank
+    return ordered
+
+
+def compute_standings(participant_ids, games, chain, seeds=None):
+    """
+    Rank participants from their finished games.
+
+    Args:
+        participant_ids (iterable): Ids of every participant of the tournament.
+        games (iterable): (white_id, black_id, white_points, round_number) tuples of finished games;
+            black_id is None for a bye.
+        chain (list): Tiebreak names applied after score.
+        seeds (dict, optional): Maps a participant id to its seed, the last tiebreak.
+
+    Returns:
+        list: Dicts with participant_id, rank, score, W/D/L and tiebreaks, best first.
+    """
+    return rank_standings(batch_tiebreaks(participant_ids, games), chain, seeds)
+
+
+def games_up_to(tournament_id, round_number=None):
+    """
+    Finished games of rounds 1..round_number (all rounds if None) as
+    (white_id, black_id, white_points, round_number) tuples, in round then match id order.
+    """
+    rows = Match.objects.filter(tournament_id=tournament_id)
+    if round_number is not None:
+        rows = rows.filter(round__round_number__lte=round_number)
+    rows = (
+        rows.filter(Q(draw=True) | Q(winner__isnull=False) | Q(black__isnull=True))
+        .order_by('round__round_number', 'id')
+        .values_list('white_id', 'black_id', 'winner_id', 'draw', 'round__round_number')
+    )
+    return [
+        (white_id, black_id, game_points(white_id, black_id, winner_id, draw), number)
+        for white_id, black_id, winner_id, draw, number in rows.iterator(chunk_size=5000)
+    ]
+
+
+# Columns of a snapshot row besides tournament and round, with their PostgreSQL array types.
+SNAPSHOT_COLUMNS = (
+    ('participant_id', 'bigint'), ('rank', 'integer'), ('score', 'double precision'), ('wins', 'smallint'),
+    ('draws', 'smallint'), ('losses', 'smallint'), ('buchholz', 'double precision'),
+    ('sonneborn_berger', 'double precision'), ('progressive', 'double precision'),
+)
+
+
+def write_snapshot(tournament_id, round_number, standings):
+    """
+    Replace the snapshot of one round with `standings` using a single bulk insert.
+
+    The rows are sent as one array per column and expanded by `unnest()`: `bulk_create` spends far
+    more time compiling a statement with one placeholder per value than PostgreSQL spends running it.
+    """
+    StandingSnapshot.objects.filter(tournament_id=tournament_id, round_number=round_number).delete()
+    standings = list(standings)
+    if not standings:
+        return
+    columns = ', '.join(name for name, _ in SNAPSHOT_COLUMNS)
+    arrays = ', '.join(f'%s::{array_type}[]' for _, array_type in SNAPSHOT_COLUMNS)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {StandingSnapshot._meta.db_table} (tournament_id, round_number, {columns})
+            SELECT %s, %s, * FROM unnest({arrays})
+            """,
+            [tournament_id, round_number, *([row[name] for row in standings] for name, _ in SNAPSHOT_COLUMNS)],
+        )
+
+
+def close_round(round_obj):
+    """
+    Snapshot the standings after `round_obj` and mark the round closed.
+
+    The standings are computed from the finished games of all rounds up to and including this one.
+    Player ratings are updated from the round's games the first time the round closes.
+    """
+    tournament_id = round_obj.tournament_id
+    seeds = dict(Participant.objects.filter(tournament_id=tournament_id).values_list('id', 'seed'))
+    games = games_up_to(tournament_id, round_obj.round_number)
+    standings = compute_standings(seeds, games, round_obj.tournament.tiebreak_chain(), seeds)
+
+    with transaction.atomic():
+        write_snapshot(tournament_id, round_obj.round_number, standings)
+        round_obj.closed_at = timezone.now()
+        round_obj.save(update_fields=['closed_at'])
+        rate_round(round_obj)
+        Tournament.bump_version(tournament_id)
+    return standings
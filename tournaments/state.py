@@ -0,0 +1,119 @@
+"""
+Warm tournament state: the working sets of recently paired tournaments, kept in memory between rounds.
+
+Pairing a round needs the standings, the opponent history and the color history of a tournament.
+Loading them means reading every participant and match and replaying them, although between two
+rounds of an event almost nothing changes but the new results. This process keeps the runners
+(`services.TournamentRunner`) of the last `settings.TOURNAMENT_STATE_CACHE_SIZE` tournaments it
+paired, and the next round starts from the runner the previous one left behind.
+
+A warm runner is only used while it matches the database. It records the tournament's `version`
+and a `stamp` of its rows (see `read_stamp`), and:
+
+- An unchanged version means an unchanged tournament: the runner is used as it is, without a query.
+- Otherwise the stamp is read again. If only new result events appeared (results recorded or
+  corrected since) and the games then match the runner's, the events are applied to the runner as
+  deltas. Anything else (new participants, rounds paired by another process, matches or seeds
+  edited in place, events the runner cannot account for) reloads it.
+
+Runners are taken out of the cache while they pair, so two threads never share one, and they are
+only put back after their round committed: when the pairing runs inside an outer transaction,
+once that transaction commits (`transaction.on_commit`). A rollback drops the runner.
+
+Functions:
+    read_stamp(tournament_id): The version and stamp of a tournament, in one query.
+    game_checksum(results): The game checksum of a stamp, from a runner's results.
+    take(tournament_id): Removes the warm runner of a tournament from the cache and returns it, or None.
+    keep(runner): Puts a runner back into the cache, evicting the least recently used ones.
+    clear(): Empties the cache of this process.
+"""
+
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import connection
+
+from .models import Match, Participant, ResultEvent, Round, Tournament
+
+_runners = OrderedDict()
+_lock = threading.Lock()
+
+
+def read_stamp(tournament_id):
+    """
+    The version of a tournament and its stamp, or None if the tournament does not exist.
+
+    The stamp is (participants, last participant id, seed checksum, matches, last match id, game
+    checksum, events, last event id). The seed checksum sums id * seed over the participants and
+    the game checksum is `game_checksum` over the matches, so an edit in place that keeps the counts
+    still changes the stamp.
+
+    Invariant: every write to the participants, rounds or matches of a tournament bumps
+    `Tournament.version` in its transaction (`Tournament.bump_version`), as the ETags also require.
+    The stamp is only read once the version has changed: a write that does not bump it is never
+    seen by a warm runner. Results must also be written through the services, which append them to
+    the result log (`events.py`): a result changed without an event makes the game checksum differ
+    and reloads the runner.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT t.version, p.n, p.last, p.checksum, m.n, m.last, m.checksum, e.n, e.last
+            FROM {Tournament._meta.db_table} AS t,
+                 (SELECT count(*), coalesce(max(id), 0), coalesce(sum(id * coalesce(seed, 0)), 0)
+                  FROM {Participant._meta.db_table}
+                  WHERE tournament_id = %(tournament)s) AS p(n, last, checksum),
+                 (SELECT count(*), coalesce(max(m.id), 0),
+                         coalesce(sum(m.id * (3 * m.white_id + 5 * coalesce(m.black_id, 0) + 7 * r.round_number
+                                              + 11 * CASE WHEN m.black_id IS NULL THEN 3
+                                                          WHEN m.draw THEN 2
+                                                          WHEN m.winner_id IS NULL THEN 0
+                                                          WHEN m.winner_id = m.white_id THEN 3
+                                                          ELSE 1 END)), 0)
+                  FROM {Match._meta.db_table} AS m JOIN {Round._meta.db_table} AS r ON r.id = m.round_id
+                  WHERE m.tournament_id = %(tournament)s) AS m(n, last, checksum),
+                 (SELECT count(*), coalesce(max(id), 0) FROM {ResultEvent._meta.db_table}
+                  WHERE tournament_id = %(tournament)s) AS e(n, last)
+            WHERE t.id = %(tournament)s
+            """,
+            {'tournament': tournament_id},
+        )
+        row = cursor.fetchone()
+    return None if row is None else (row[0], tuple(int(value) for value in row[1:]))
+
+
+def game_checksum(results):
+    """
+    The game checksum of `read_stamp`, from {match_id: (white_id, black_id, white_points, round_number)}.
+
+    Each match adds its id times a weighted sum of its players, round and result (0 for none, then
+    1, 2 and 3 for white's 0, 0.5 and 1 point), so swapped players or results change the total.
+    """
+    codes = {None: 0, 0: 1, 0.5: 2, 1: 3}
+    return sum(
+        match_id * (3 * white_id + 5 * (black_id or 0) + 7 * round_number + 11 * codes[points])
+        for match_id, (white_id, black_id, points, round_number) in results.items()
+    )
+
+
+def take(tournament_id):
+    """Remove the warm runner of a tournament from the cache and return it, or None."""
+    with _lock:
+        return _runners.pop(tournament_id, None)
+
+
+def keep(runner):
+    """Put a runner into the cache, as the most recently used, evicting the least recently used ones."""
+    size = getattr(settings, 'TOURNAMENT_STATE_CACHE_SIZE', 32)
+    with _lock:
+        _runners[runner.tournament.id] = runner
+        _runners.move_to_end(runner.tournament.id)
+        while len(_runners) > size:
+            _runners.popitem(last=False)
+
+
+def clear():
+    """Forget every warm runner of this process."""
+    with _lock:
+        _runners.clear()
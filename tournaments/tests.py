@@ -1,9 +1,50 @@
+import gzip
+import json
+import os
+import random
+import tempfile
+from io import StringIO
+from datetime import timedelta
+
+from django.utils import timezone
+
 from rest_framework.test import APITestCase, APIClient
+from django.test import TransactionTestCase
 from rest_framework import status
 from django.urls import reverse
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.contrib.auth.models import User
-from .models import Tournament, Participant, Player, Round
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection, connections, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.db.models import Q
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from jobs.models import Job
+from jobs.queue import claim_next, run_job
+from .models import (
+    Tournament, Participant, Player, Round, Match, StandingSnapshot, IdempotencyKey, GameScore, Forecast,
+    TournamentArchive, ResultEvent
+)
 from .serializers import ParticipantSerializer, TournamentSerializer
+from .services import (
+    run_tournament, record_result, recompute_tiebreaks, reconcile_standings, close_registration,
+    pair_next_round, pair_rounds, ingest_pgn, delete_tournament, replay_tournament, TournamentRunner
+)
+from .standings import close_round, games_up_to
+from .tiebreaks import TiebreakEngine, batch_tiebreaks
+from .ratings import rate_round, rerate_players
+from .dump import dump_tournament
+from .trf import export_trf, import_trf, parse_trf
+from . import arena, state
+from .admin import EstimatedCountPaginator
+from .arena import ArenaLobby, MatchWriter
+from .archive import archive_tournament, archive_tournaments, restore_tournament
+from .forecast import compute_forecast, simulate
+from .pgn import decode_moves, encode_moves, parse_movetext, parse_range, split_ranges
+from .pairing import OpponentHistory, berger_schedule, seeded_pairings, swiss_pairings
 from rest_framework_simplejwt.tokens import RefreshToken
 
 
@@ -23,6 +64,15 @@ class BaseTestCase(APITestCase):
         refresh = RefreshToken.for_user(user)
         self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
 
+    def add_participants(self, count, tournament=None):
+        tournament = tournament or self.tournament
+        participants = []
+        for i in range(count):
+            username = f'{tournament.pk}-player{i}'
+            user = User.objects.create_user(username, f'{username}@example.com', 'password123')
+            participants.append(Participant.objects.create(player=Player.objects.create(user=user), tournament=tournament))
+        return participants
+
 
 class TournamentViewSetTests(BaseTestCase):
     def test_create_tournament(self):
@@ -125,4 +175,1471 @@ class ParticipantSerializerTests(BaseTestCase):
         self.assertEqual(updated_participant.score, 10)
         self.assertEqual(updated_participant.wins, 5)
         self.assertEqual(updated_participant.draws, 3)
-        self.assertEqual(updated_participant.losses, 2)
\ No newline at end of file
+        self.assertEqual(updated_participant.losses, 2)
+
+class SeedLoadtestCommandTests(APITestCase):
+    def test_seed_users_and_tournament(self):
+        call_command('seed_loadtest', users=5, password='secret123', stdout=StringIO())
+        self.assertEqual(Player.objects.filter(user__username__startswith='loadtest_').count(), 5)
+        tournament = Tournament.objects.get()
+        self.assertEqual(tournament.participants.count(), 5)
+        self.assertEqual(tournament.rounds.count(), 7)
+        self.assertTrue(User.objects.get(username='loadtest_3').check_password('secret123'))
+        self.assertTrue(User.objects.get(username='loadtest_admin').is_staff)
+
+        # Seeding again reuses the pool instead of duplicating users.
+        call_command('seed_loadtest', users=5, stdout=StringIO())
+        self.assertEqual(Player.objects.filter(user__username__startswith='loadtest_').count(), 5)
+
+
+class TournamentRunnerTests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.add_participants(8)
+        self.run_url = reverse('tournament-generate-pairings', kwargs={'pk': self.tournament.pk})
+
+    def test_run_all_rounds(self):
+        summary = run_tournament(self.tournament.id, seed=1)
+        self.assertEqual(summary['rounds_played'], 3)
+        # 9 participants: 4 games and 1 bye per round.
+        self.assertEqual(summary['matches_created'], 15)
+        self.assertEqual(Match.objects.filter(tournament=self.tournament, black__isnull=True).count(), 3)
+
+        participants = Participant.objects.filter(tournament=self.tournament)
+        self.assertEqual(sum(p.score for p in participants), 15)
+        for participant in participants:
+            self.assertEqual(participant.wins + participant.draws + participant.losses, 3)
+
+        pairs = [frozenset(pair) for pair in Match.objects.filter(black__isnull=False).values_list('white_id', 'black_id')]
+        self.assertEqual(len(pairs), len(set(pairs)))
+
+    def test_run_is_resumable(self):
+        run_tournament(self.tournament.id, seed=1)
+        summary = run_tournament(self.tournament.id, seed=1)
+        self.assertEqual(summary['rounds_played'], 0)
+        self.assertEqual(Match.objects.count(), 15)
+
+    def test_generate_pairings_endpoint(self):
+        self.authenticate(self.user)
+        response = self.client.post(self.run_url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.authenticate(self.admin_user)
+        response = self.client.post(self.run_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['rounds_played'], 3)
+
+
+class StandingSnapshotTests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.add_participants(8)
+
+    def test_snapshot_per_round(self):
+        run_tournament(self.tournament.id, seed=2)
+        self.assertEqual(StandingSnapshot.objects.filter(tournament=self.tournament).count(), 27)
+        self.assertFalse(Round.objects.filter(tournament=self.tournament, closed_at__isnull=True).exists())
+
+        final = list(StandingSnapshot.objects.filter(tournament=self.tournament, round_number=3).order_by('rank'))
+        participants = {p.id: p for p in Participant.objects.filter(tournament=self.tournament)}
+        for row in final:
+            self.assertEqual(row.score, participants[row.participant_id].score)
+            self.assertEqual(row.wins, participants[row.participant_id].wins)
+        self.assertEqual([row.score for row in final], sorted((row.score for row in final), reverse=True))
+
+    def test_close_round_matches_runner_snapshot(self):
+        run_tournament(self.tournament.id, seed=2)
+        expected = list(StandingSnapshot.objects.filter(tournament=self.tournament, round_number=2)
+                        .order_by('rank').values_list('participant_id', 'score', 'buchholz'))
+        close_round(Round.objects.get(tournament=self.tournament, round_number=2))
+        recomputed = list(StandingSnapshot.objects.filter(tournament=self.tournament, round_number=2)
+                          .order_by('rank').values_list('participant_id', 'score', 'buchholz'))
+        self.assertEqual(recomputed, expected)
+
+    def test_standings_endpoint(self):
+        url = reverse('tournament-standings', kwargs={'pk': self.tournament.pk})
+        self.authenticate(self.user)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+        run_tournament(self.tournament.id, seed=2)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 9)
+        self.assertEqual(response.data['results'][0]['round_number'], 3)
+        self.assertEqual(response.data['results'][0]['rank'], 1)
+
+        response = self.client.get(url, {'round': 1})
+        self.assertEqual(response.data['results'][0]['round_number'], 1)
+        self.assertEqual(response.data['results'][0]['score'], 1)
+
+
+class TiebreakTests(BaseTestCase):
+    FIELDS = ('score', 'wins', 'draws', 'losses', 'buchholz', 'sonneborn_berger', 'progressive')
+
+    def setUp(self):
+        super().setUp()
+        self.add_participants(8)
+        run_tournament(self.tournament.id, seed=3)
+
+    def standings(self):
+        return {
+            row[0]: row[1:]
+            for row in Participant.objects.filter(tournament=self.tournament).values_list('id', *self.FIELDS)
+        }
+
+    def test_engine_matches_batch(self):
+        ids = list(Participant.objects.filter(tournament=self.tournament).values_list('id', flat=True))
+        games = games_up_to(self.tournament.id)
+        engine = TiebreakEngine(ids)
+        for white_id, black_id, points, _ in sorted(games, key=lambda game: game[3]):
+            engine.add_result(white_id, black_id, points)
+        batch = {row['participant_id']: row for row in batch_tiebreaks(ids, games)}
+        for pid in ids:
+            for field in self.FIELDS:
+                self.assertAlmostEqual(engine.row(pid)[field], batch[pid][field])
+
+        stored = self.standings()
+        for pid in ids:
+            self.assertEqual(stored[pid], tuple(batch[pid][field] for field in self.FIELDS))
+
+    def test_record_result_matches_recompute(self):
+        for match in Match.objects.filter(tournament=self.tournament, black__isnull=False).order_by('id')[:4]:
+            current = 0.5 if match.draw else (1.0 if match.winner_id == match.white_id else 0.0)
+            record_result(match.id, {1.0: 0.5, 0.5: 0.0, 0.0: 1.0}[current])
+        incremental = self.standings()
+
+        recompute_tiebreaks(self.tournament.id)
+        recomputed = self.standings()
+        for pid, values in recomputed.items():
+            for expected, actual in zip(values, incremental[pid]):
+                self.assertAlmostEqual(actual, expected)
+
+    def test_progressive_is_the_same_incrementally_and_in_batch(self):
+        tournament = Tournament.objects.create(name='Progressive', num_of_rounds=3)
+        a, b, c, d = (participant.id for participant in self.add_participants(4, tournament))
+        rounds = [Round.objects.create(tournament=tournament, round_number=number) for number in (1, 2, 3)]
+        # b and d skip round 2; a and d play twice in round 1, as in an arena.
+        pairings = [(0, a, b), (0, c, d), (0, d, a), (1, a, c), (2, a, d), (2, b, c)]
+        matches = [Match.objects.create(tournament=tournament, round=rounds[index], white_id=white_id, black_id=black_id)
+                   for index, white_id, black_id in pairings]
+        ids = [a, b, c, d]
+        for match, points in zip([matches[i] for i in (4, 1, 5, 0, 3, 2)], (1, 0.5, 0, 1, 0.5, 1)):
+            record_result(match.id, points)
+            games = games_up_to(tournament.id)
+            engine = TiebreakEngine(ids)
+            for white_id, black_id, white_points, _ in games:
+                engine.add_result(white_id, black_id, white_points)
+            batch = {row['participant_id']: row for row in batch_tiebreaks(ids, games)}
+            stored = dict(Participant.objects.filter(tournament=tournament).values_list('id', 'progressive'))
+            for pid in ids:
+                self.assertAlmostEqual(stored[pid], batch[pid]['progressive'])
+                self.assertAlmostEqual(engine.progressive[pid], batch[pid]['progressive'])
+
+        # a scores 1, 0, 0.5 and 1 in its four games: 1, 1, 1.5 and 2.5 after each of them.
+        self.assertEqual(batch[a]['progressive'], 1 + 1 + 1.5 + 2.5)
+        # d draws and wins in round 1, skips round 2 and loses in round 3.
+        self.assertEqual(batch[d]['progressive'], 0.5 + 1.5 + 1.5)
+
+    def test_record_result_rejects_bye(self):
+        bye = Match.objects.filter(tournament=self.tournament, black__isnull=True).first()
+        with self.assertRaises(ValueError):
+            record_result(bye.id, 1.0)
+
+    def test_invalid_tiebreak_chain(self):
+        serializer = TournamentSerializer(data={
+            'name': 'Chain', 'num_of_rounds': 3, 'start_date': '2024-07-10', 'end_date': '2024-08-11',
+            'tiebreaks': 'buchholz,elo',
+        })
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('tiebreaks', serializer.errors)
+
+    def test_match_result_endpoint(self):
+        match = Match.objects.filter(tournament=self.tournament, black__isnull=False).first()
+        url = reverse('match-result', kwargs={'pk': match.pk})
+        self.authenticate(self.user)
+        self.assertEqual(self.client.post(url, {'result': '1/2-1/2'}).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.authenticate(self.admin_user)
+        self.assertEqual(self.client.post(url, {'result': '2-0'}).status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(url, {'result': '1/2-1/2'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['result'], '1/2-1/2')
+        match.refresh_from_db()
+        self.assertTrue(match.draw)
+
+    def test_participants_ordered_by_rank(self):
+        self.authenticate(self.user)
+        response = self.client.get(self.tournament_participant_url, {'ordering': 'rank'})
+        scores = [row['score'] for row in response.data['results']]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+
+class RatingTests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.add_participants(8)
+
+    def ratings(self):
+        return dict(Player.objects.filter(participant__tournament=self.tournament).values_list('id', 'rating'))
+
+    def test_rounds_rated_once(self):
+        run_tournament(self.tournament.id, seed=4)
+        self.assertFalse(Round.objects.filter(tournament=self.tournament, rated_at__isnull=True).exists())
+        ratings = self.ratings()
+        self.assertNotEqual(set(ratings.values()), {800})
+        # Elo is zero-sum up to rounding.
+        self.assertLessEqual(abs(sum(ratings.values()) - 800 * len(ratings)), len(ratings))
+
+        self.assertEqual(rate_round(Round.objects.get(tournament=self.tournament, round_number=1)), 0)
+        self.assertEqual(self.ratings(), ratings)
+
+    def test_rerate_replays_history(self):
+        run_tournament(self.tournament.id, seed=4)
+        ratings = self.ratings()
+        Player.objects.update(rating=1500)
+        summary = rerate_players(initial_rating=800)
+        self.assertEqual(summary['rounds'], 3)
+        self.assertEqual(summary['games'], 12)
+        self.assertEqual(self.ratings(), ratings)
+
+
+class OpponentHistoryTests(APITestCase):
+    def test_played(self):
+        history = OpponentHistory([10, 20, 30, 40, 50, 60, 70, 80, 90], pairs=[(10, 90), (20, 30)])
+        self.assertTrue(history.played(10, 90))
+        self.assertTrue(history.played(90, 10))
+        self.assertFalse(history.played(10, 20))
+        history.add(10, 20)
+        self.assertEqual(history.opponents(10), {20, 90})
+        self.assertEqual(history.opponents(40), set())
+
+    def test_pairings_avoid_rematches(self):
+        history = OpponentHistory([1, 2, 3, 4], pairs=[(1, 2), (3, 4)])
+        pairs, bye = swiss_pairings([1, 2, 3, 4], history)
+        self.assertIsNone(bye)
+        self.assertEqual({frozenset(pair) for pair in pairs}, {frozenset((1, 3)), frozenset((2, 4))})
+
+
+class ReconcileStandingsTests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.add_participants(8)
+        run_tournament(self.tournament.id, seed=5)
+
+    def test_nothing_drifted(self):
+        self.assertEqual(reconcile_standings(self.tournament.id), [])
+
+    def test_repairs_drift(self):
+        participant = Participant.objects.filter(tournament=self.tournament).order_by('id').first()
+        expected = (participant.score, participant.wins, participant.draws, participant.losses)
+        Participant.objects.filter(pk=participant.pk).update(score=99, wins=0)
+
+        drifted = reconcile_standings(self.tournament.id, dry_run=True)
+        self.assertEqual(drifted, [{'participant_id': participant.pk, 'old': (99, 0, *expected[2:]), 'new': expected}])
+        self.assertEqual(Participant.objects.get(pk=participant.pk).score, 99)
+
+        out = StringIO()
+        call_command('reconcile_standings', self.tournament.id, stdout=out)
+        self.assertIn('Repaired 1 drifted participants', out.getvalue())
+        participant.refresh_from_db()
+        self.assertEqual((participant.score, participant.wins, participant.draws, participant.losses), expected)
+
+
+class SeedingTests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.participants = self.add_participants(7)
+        for i, participant in enumerate(self.participants):
+            Player.objects.filter(pk=participant.player_id).update(rating=1000 + 100 * i)
+        self.player.rating = None
+        self.player.save()
+
+    def seeding(self):
+        return list(Participant.objects.filter(tournament=self.tournament).order_by('seed').values_list('id', flat=True))
+
+    def test_seeds_by_rating(self):
+        self.assertEqual(close_registration(self.tournament.id), 8)
+        expected = [p.id for p in reversed(self.participants)] + [self.participant.id]
+        self.assertEqual(self.seeding(), expected)
+
+        self.assertEqual(close_registration(self.tournament.id), 0)
+        self.tournament.refresh_from_db()
+        self.assertIsNotNone(self.tournament.registration_closed_at)
+
+    def test_late_registration_seeded_last(self):
+        close_registration(self.tournament.id)
+        user = User.objects.create_user('late', 'late@example.com', 'password123')
+        late = Participant.objects.create(player=Player.objects.create(user=user, rating=2900), tournament=self.tournament)
+        self.assertEqual(close_registration(self.tournament.id), 1)
+        late.refresh_from_db()
+        self.assertEqual(late.seed, 9)
+
+    def test_seeded_pairings(self):
+        pairs, bye = seeded_pairings([1, 2, 3, 4, 5, 6, 7])
+        self.assertEqual(bye, 7)
+        self.assertEqual(pairs, [(1, 4), (5, 2), (3, 6)])
+
+    def test_first_round_top_half_against_bottom_half(self):
+        run_tournament(self.tournament.id, seed=6)
+        seeding = self.seeding()
+        first_round = Match.objects.filter(tournament=self.tournament, round__round_number=1, black__isnull=False)
+        expected = {frozenset(pair) for pair in zip(seeding[:4], seeding[4:])}
+        self.assertEqual({frozenset((m.white_id, m.black_id)) for m in first_round}, expected)
+
+    def test_close_registration_endpoint(self):
+        url = reverse('tournament-close-registration', kwargs={'pk': self.tournament.pk})
+        self.authenticate(self.admin_user)
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['seeded'], 8)
+
+
+class ConcurrentPairingTests(TransactionTestCase):
+    """Fires concurrent pairing requests at committed data; each round must be paired exactly once."""
+
+    def setUp(self):
+        self.tournaments = []
+        for t in range(3):
+            tournament = Tournament.objects.create(name=f'Weekend {t}', num_of_rounds=3, start_date="2024-07-10", end_date="2024-07-11")
+            for i in range(6):
+                user = User.objects.create_user(f'weekend{t}-{i}', password='password123')
+                Participant.objects.create(player=Player.objects.create(user=user, rating=1200 + i), tournament=tournament)
+            self.tournaments.append(tournament)
+
+    def assert_rounds_paired_once(self, tournament, rounds):
+        for number in range(1, rounds + 1):
+            matches = Match.objects.filter(tournament=tournament, round__round_number=number)
+            self.assertEqual(matches.count(), 3)
+            players = [pid for pair in matches.values_list('white_id', 'black_id') for pid in pair]
+            self.assertEqual(len(set(players)), 6)
+        self.assertEqual(Match.objects.filter(tournament=tournament).count(), 3 * rounds)
+        self.assertEqual(Round.objects.filter(tournament=tournament).count(), 3)
+
+    def test_concurrent_requests_pair_each_round_once(self):
+        ids = [t.id for t in self.tournaments] * 4
+        paired = pair_rounds(ids, workers=8, seed=1)
+        for tournament in self.tournaments:
+            rounds = sorted(summary['round'] for summary in paired if summary['tournament'] == tournament.id)
+            self.assertEqual(rounds, list(range(1, len(rounds) + 1)))
+            self.assertGreaterEqual(len(rounds), 1)
+            self.assert_rounds_paired_once(tournament, len(rounds))
+
+    def test_concurrent_runs_of_one_tournament(self):
+        tournament = self.tournaments[0]
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            summaries = list(pool.map(self.run_in_thread, [tournament.id] * 4))
+        self.assertEqual(sum(summary['rounds_played'] for summary in summaries), 3)
+        self.assert_rounds_paired_once(tournament, 3)
+        self.assertIsNone(pair_next_round(tournament.id))
+
+    @staticmethod
+    def run_in_thread(tournament_id):
+        try:
+            return run_tournament(tournament_id)
+        finally:
+            connections.close_all()
+
+
+class IdempotencyKeyTests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.add_participants(3)
+        run_tournament(self.tournament.id, seed=7)
+        self.match = Match.objects.filter(tournament=self.tournament, black__isnull=False).first()
+        self.url = reverse('match-result', kwargs={'pk': self.match.pk})
+        self.authenticate(self.admin_user)
+
+    def post(self, result, key):
+        return self.client.post(self.url, {'result': result}, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_replays_stored_response(self):
+        first = self.post('1/2-1/2', 'retry-1')
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        Participant.objects.filter(tournament=self.tournament).update(score=42)
+
+        # The user lookup of the JWT, the expiry DELETE and the key lookup (plus a savepoint).
+        with self.assertNumQueries(5):
+            retry = self.post('1/2-1/2', 'retry-1')
+        self.assertEqual(retry.status_code, status.HTTP_200_OK)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(set(Participant.objects.filter(tournament=self.tournament).values_list('score', flat=True)), {42})
+
+    def test_key_reused_for_other_request(self):
+        self.post('1-0', 'reused')
+        self.assertEqual(self.post('0-1', 'reused').status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+    def test_expired_keys(self):
+        self.post('1-0', 'old')
+        IdempotencyKey.objects.update(created_at=timezone.now() - timedelta(days=2))
+        response = self.post('1-0', 'old')
+        self.assertNotIn('Idempotent-Replayed', response)
+        self.assertEqual(IdempotencyKey.objects.count(), 1)
+
+        IdempotencyKey.objects.update(created_at=timezone.now() - timedelta(days=2))
+        out = StringIO()
+        call_command('purge_idempotency_keys', stdout=out)
+        self.assertIn('Deleted 1', out.getvalue())
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+    def test_pair_round_retry_does_not_pair_again(self):
+        tournament = Tournament.objects.create(name='Retry', num_of_rounds=3, start_date="2024-07-10", end_date="2024-08-11")
+        self.add_participants(4, tournament=tournament)
+        url = reverse('tournament-pair-round', kwargs={'pk': tournament.pk})
+        first = self.client.post(url, HTTP_IDEMPOTENCY_KEY='pair-1')
+        retry = self.client.post(url, HTTP_IDEMPOTENCY_KEY='pair-1')
+        self.assertEqual(first.data, retry.data)
+        self.assertEqual(Match.objects.filter(tournament=tournament).count(), 2)
+
+    def test_replayed_job_keeps_its_location(self):
+        url = reverse('tournament-pair-round', kwargs={'pk': self.tournament.pk}) + '?async=true'
+        first = self.client.post(url, HTTP_IDEMPOTENCY_KEY='queue-1')
+        self.assertEqual(first.status_code, status.HTTP_202_ACCEPTED)
+        retry = self.client.post(url, HTTP_IDEMPOTENCY_KEY='queue-1')
+        self.assertEqual(retry.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(retry['Location'], first['Location'])
+        self.assertEqual(Job.objects.count(), 1)
+
+
+class ConditionalGetTests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.add_participants(3)
+        self.authenticate(self.user)
+
+    def version(self):
+        return Tournament.objects.values_list('version', flat=True).get(pk=self.tournament.pk)
+
+    def test_matching_etag_is_not_modified(self):
+        first = self.client.get(self.tournament_participant_url)
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        etag = first['ETag']
+
+        # The user lookup of the JWT and the version lookup; no participant query.
+        with self.assertNumQueries(2):
+            response = self.client.get(self.tournament_participant_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+
+    def test_writes_change_the_etag(self):
+        etag = self.client.get(self.tournament_participant_url)['ETag']
+        version = self.version()
+
+        run_tournament(self.tournament.id, seed=3)
+        self.assertGreater(self.version(), version)
+        response = self.client.get(self.tournament_participant_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+        etag, version = response['ETag'], self.version()
+        match = Match.objects.filter(tournament=self.tournament, black__isnull=False).first()
+        record_result(match.id, 1.0 if match.winner_id != match.white_id else 0.0)
+        self.assertGreater(self.version(), version)
+
+        version = self.version()
+        self.player.country = 'NO'
+        self.player.save()
+        self.assertGreater(self.version(), version)
+        self.assertEqual(self.client.get(self.tournament_participant_url, HTTP_IF_NONE_MATCH=etag).status_code,
+                         status.HTTP_200_OK)
+
+    def test_participant_and_tournament_edits_bump_version(self):
+        self.authenticate(self.admin_user)
+        version = self.version()
+        self.client.delete(self.participant_detail_url)
+        self.assertEqual(self.version(), version + 1)
+
+        url = reverse('tournament-detail', kwargs={'pk': self.tournament.pk})
+        response = self.client.patch(url, {'name': 'Renamed'}, format='json')
+        self.assertEqual(response.data['version'], version + 2)
+
+        # A stale instance never writes its version back.
+        stale = Tournament.objects.get(pk=self.tournament.pk)
+        Tournament.bump_version(self.tournament.pk)
+        stale.name = 'Stale'
+        stale.save()
+        self.assertEqual(self.version(), version + 3)
+
+    def test_tournament_retrieve(self):
+        self.authenticate(self.admin_user)
+        url = reverse('tournament-detail', kwargs={'pk': self.tournament.pk})
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='"other"').status_code, status.HTTP_200_OK)
+        missing = reverse('tournament-detail', kwargs={'pk': self.tournament.pk + 1000})
+        self.assertEqual(self.client.get(missing, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_404_NOT_FOUND)
+
+
+class TournamentDumpTests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.add_participants(4)
+        run_tournament(self.tournament.id, seed=5)
+        self.url = reverse('tournament-dump', kwargs={'pk': self.tournament.pk})
+        self.authenticate(self.user)
+
+    def lines(self, content):
+        return [json.loads(line) for line in content.decode().splitlines()]
+
+    def test_dump_streams_every_row(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = self.lines(b''.join(response.streaming_content))
+
+        self.assertEqual(lines[0]['type'], 'tournament')
+        self.assertEqual(lines[0]['version'], Tournament.objects.get(pk=self.tournament.pk).version)
+        counts = {}
+        for line in lines[1:]:
+            counts[line['type']] = counts.get(line['type'], 0) + 1
+        self.assertEqual(counts, {
+            'participant': Participant.objects.filter(tournament=self.tournament).count(),
+            'round': 3,
+            'match': Match.objects.filter(tournament=self.tournament).count(),
+        })
+        participant = next(line for line in lines if line['type'] == 'participant' and line['id'] == self.participant.pk)
+        self.assertEqual(participant['score'], Participant.objects.get(pk=self.participant.pk).score)
+
+    def test_gzip_and_conditional_get(self):
+        plain = b''.join(self.client.get(self.url).streaming_content)
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), plain)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag']).status_code,
+                         status.HTTP_304_NOT_MODIFIED)
+
+    def test_small_chunks_and_missing_tournament(self):
+        chunks = list(dump_tournament(self.tournament.pk, chunk_size=2))
+        self.assertEqual(b''.join(chunks), b''.join(self.client.get(self.url).streaming_content))
+        self.assertEqual(list(dump_tournament(self.tournament.pk + 1000)), [])
+        missing = reverse('tournament-dump', kwargs={'pk': self.tournament.pk + 1000})
+        self.assertEqual(self.client.get(missing).status_code, status.HTTP_404_NOT_FOUND)
+
+
+TRF_SAMPLE = """012 Oslo Open
+042 2024/07/10
+052 2024/07/12
+XXR 3
+001    1 m GM Olsen, Ole                        2600 NOR     1503014 1990/01/01  2.5    1     3 w 1     2 b =  0000 - U
+001    2 w    Berg, Anna                        2400 SWE     1700000 1995/05/05  1.5    2  0000 - U     1 w =     3 b 0
+001    3 m    Novak, Jan                        2300 CZE             2000/02/02  1.0    3     1 b 0  0000 - H     2 w 1
+"""
+
+
+class TrfTests(BaseTestCase):
+    def test_parse(self):
+        data = parse_trf(StringIO(TRF_SAMPLE))
+        self.assertEqual((data['name'], data['num_of_rounds'], len(data['players'])), ('Oslo Open', 3, 3))
+        olsen = data['players'][0]
+        self.assertEqual((olsen['rank'], olsen['name'], olsen['rating'], olsen['federation'], olsen['fide_id']),
+                         (1, 'Olsen, Ole', 2600, 'NOR', '1503014'))
+        self.assertEqual(olsen['games'], [(1, 3, 'w', '1'), (2, 2, 'b', '='), (3, 0, '-', 'U')])
+        with self.assertRaises(ValueError):
+            parse_trf(["001    x m  Broken"])
+
+    def test_import(self):
+        summary = import_trf(StringIO(TRF_SAMPLE))
+        self.assertEqual(summary['participants'], 3)
+        self.assertEqual(summary['matches'], 5)  # 3 games and 2 full point byes
+        self.assertEqual(summary['skipped_byes'], 1)  # the half point bye
+        tournament = Tournament.objects.get(pk=summary['tournament'])
+        self.assertEqual((tournament.name, tournament.num_of_rounds), ('Oslo Open', 3))
+
+        participants = Participant.objects.filter(tournament=tournament).select_related('player__user').order_by('seed')
+        self.assertEqual([p.player.user.username for p in participants][:2], ['fide1503014', 'fide1700000'])
+        self.assertEqual([p.score for p in participants], [2.5, 1.5, 1.0])
+        self.assertEqual(participants[0].player.country, 'NO')
+        self.assertEqual(StandingSnapshot.objects.filter(tournament=tournament).count(), 9)
+        self.assertEqual(Round.objects.filter(tournament=tournament, closed_at__isnull=False).count(), 3)
+
+        # Players with a FIDE id are reused by the next import.
+        summary = import_trf(StringIO(TRF_SAMPLE))
+        self.assertEqual(summary['players_created'], 1)
+
+    def test_export_round_trip(self):
+        tournament_id = import_trf(StringIO(TRF_SAMPLE))['tournament']
+        lines = list(export_trf(tournament_id))
+        self.assertEqual(lines[:2], ['012 Oslo Open', '042 2024/07/10'])
+        players = parse_trf(lines)['players']
+        original = parse_trf(StringIO(TRF_SAMPLE))['players']
+        self.assertEqual([p['points'] for p in players], [p['points'] for p in original])
+        self.assertEqual([p['games'][:2] for p in players[:2]], [p['games'][:2] for p in original[:2]])
+
+    def test_import_endpoint(self):
+        self.authenticate(self.admin_user)
+        upload = SimpleUploadedFile('oslo.trf', TRF_SAMPLE.encode())
+        response = self.client.post(reverse('tournament-import-trf'), {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        url = reverse('tournament-export-trf', kwargs={'pk': response.data['tournament']})
+        content = b''.join(self.client.get(url).streaming_content).decode()
+        self.assertTrue(content.startswith('012 Oslo Open\n'))
+
+        bad = SimpleUploadedFile('bad.trf', TRF_SAMPLE.replace('3 w 1', '3 w Q').encode())
+        response = self.client.post(reverse('tournament-import-trf'), {'file': bad}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class PgnTests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.add_participants(3)
+        run_tournament(self.tournament.id, seed=11)
+        self.games = list(
+            Match.objects.filter(tournament=self.tournament, black__isnull=False)
+            .select_related('round', 'white__player__user', 'black__player__user', 'winner')
+            .order_by('id')
+        )
+        pgn = []
+        for match in self.games:
+            result = '1/2-1/2' if match.draw else '1-0' if match.winner_id == match.white_id else '0-1'
+            pgn.append(
+                f'[Event "Test"]\n[Round "{match.round.round_number}.1"]\n'
+                f'[White "{match.white.player.user.username}"]\n[Black "{match.black.player.user.username}"]\n'
+                f'[Result "{result}"]\n\n'
+                f'1. e4 {{best by test\n[%clk 0:03:00]}} e5 2. Nf3!? (2. f4 exf4) Nc6 $1 3. Bb5 a6 ; Ruy\n{result}\n'
+            )
+        pgn.append('[Event "Other"]\n[White "Nobody"]\n[Black "Else"]\n\n1. d4 d5 *\n')
+        self.file = tempfile.NamedTemporaryFile('w', suffix='.pgn', delete=False)
+        self.file.write('\n'.join(pgn))
+        self.file.close()
+        self.addCleanup(os.unlink, self.file.name)
+
+    def test_parse_movetext(self):
+        moves, result = parse_movetext('1. e4 {a (comment)} e5 2.Nf3 (2. f4 (2. d4) exf4) Nc6 $14 3... Bb5+! 1-0')
+        self.assertEqual((moves, result), (['e4', 'e5', 'Nf3', 'Nc6', 'Bb5+'], '1-0'))
+        self.assertEqual(decode_moves(encode_moves(moves)), moves)
+
+    def test_ranges_split_at_game_boundaries(self):
+        whole = parse_range(self.file.name, 0, os.path.getsize(self.file.name))
+        ranges = split_ranges(self.file.name, chunk_size=50)
+        self.assertEqual(ranges[0][0], 0)
+        self.assertEqual([games for start, end in ranges for games in parse_range(self.file.name, start, end)], whole)
+        self.assertEqual(len(whole), len(self.games) + 1)
+        self.assertEqual(whole[0][0]['Round'], '1.1')
+        self.assertEqual(decode_moves(whole[0][1]), ['e4', 'e5', 'Nf3', 'Nc6', 'Bb5', 'a6'])
+
+    def test_ingest(self):
+        summary = ingest_pgn(self.tournament.id, self.file.name, workers=0, chunk_size=100, batch_size=2)
+        self.assertEqual(summary, {'games': len(self.games) + 1, 'stored': len(self.games), 'unmatched': 1,
+                                   'result_mismatches': 0})
+        score = GameScore.objects.get(match=self.games[0])
+        self.assertEqual((score.ply_count, score.move_list()[:2]), (6, ['e4', 'e5']))
+
+        # Ingesting again on a process pool replaces the stored games.
+        summary = ingest_pgn(self.tournament.id, self.file.name, workers=2, chunk_size=100)
+        self.assertEqual(summary['stored'], len(self.games))
+        self.assertEqual(GameScore.objects.filter(match__tournament=self.tournament).count(), len(self.games))
+
+
+class ForecastTests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.add_participants(5)
+        Player.objects.filter(participant__tournament=self.tournament).update(rating=1500)
+        Player.objects.filter(pk=self.player.pk).update(rating=2400)
+        self.url = reverse('tournament-forecast', kwargs={'pk': self.tournament.pk})
+        self.authenticate(self.user)
+
+    def run_forecast_jobs(self):
+        jobs = 0
+        while (job := claim_next('worker-1')) is not None:
+            self.assertEqual(job.kind, 'forecast')
+            run_job(job)
+            jobs += 1
+        return jobs
+
+    def test_simulate(self):
+        win, top, expected = simulate(
+            np.array([2.5, 0.0, 1.0]), np.array([1500, 1500, 1500]), (np.array([1]), np.array([2])), 0, 2000,
+            np.random.default_rng(1),
+        )
+        # Nobody can catch up with the leader when only one game is left between the others.
+        self.assertEqual(win.tolist(), [1.0, 0.0, 0.0])
+        self.assertEqual(top.tolist(), [1.0, 1.0, 1.0])
+        self.assertAlmostEqual(expected[1] + expected[2], 2.0)
+        self.assertAlmostEqual(expected[1], 0.5, delta=0.05)
+
+    def test_stronger_player_is_favourite(self):
+        compute_forecast(self.tournament.id, seed=3)
+        data = Forecast.objects.get(tournament=self.tournament).data
+        self.assertEqual(data['rounds_left'], 3)
+        self.assertEqual(data['participants'][0]['participant_id'], self.participant.id)
+        self.assertGreater(data['participants'][0]['win'], 0.5)
+        self.assertAlmostEqual(sum(row['win'] for row in data['participants']), 1.0, places=2)
+
+    def test_forecast_is_computed_once_per_version(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['kind'], 'forecast')
+        # A second request does not queue another job for the same version.
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(self.run_forecast_jobs(), 1)
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.data['stale'])
+        # Served from the cache: the user lookup of the JWT and the version lookup.
+        with self.assertNumQueries(2):
+            self.assertFalse(self.client.get(self.url).data['stale'])
+
+        run_tournament(self.tournament.id, seed=5)
+        response = self.client.get(self.url)
+        self.assertTrue(response.data['stale'])
+        self.assertEqual(response.data['rounds_left'], 3)
+        self.assertEqual(self.run_forecast_jobs(), 1)
+
+        response = self.client.get(self.url)
+        self.assertFalse(response.data['stale'])
+        self.assertEqual(response.data['rounds_left'], 0)
+        version = Tournament.objects.values_list('version', flat=True).get(pk=self.tournament.pk)
+        self.assertEqual(response.data['version'], version)
+        # Nothing left to play: the leaders share the win probability, ties being broken at random.
+        best = max(row['score'] for row in response.data['participants'])
+        for row in response.data['participants']:
+            self.assertEqual(row['expected_score'], row['score'])
+            self.assertEqual(row['win'] > 0, row['score'] == best)
+
+    def test_missing_tournament(self):
+        self.assertEqual(self.client.get(reverse('tournament-forecast', kwargs={'pk': 0})).status_code,
+                         status.HTTP_404_NOT_FOUND)
+
+
+class RoundRobinTests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.tournament.pairing_system = Tournament.ROUND_ROBIN
+        self.tournament.cycles = 2
+        self.tournament.save()
+        self.add_participants(4)
+        self.schedule_url = reverse('tournament-schedule-round-robin', kwargs={'pk': self.tournament.pk})
+        self.authenticate(self.admin_user)
+
+    def test_berger_schedule(self):
+        schedule = berger_schedule([1, 2, 3, 4, 5, 6])
+        self.assertEqual(schedule[:2], [([(1, 6), (2, 5), (3, 4)], None), ([(6, 4), (5, 3), (1, 2)], None)])
+        self.assertEqual(schedule[4], ([(3, 6), (4, 2), (5, 1)], None))
+
+        schedule = berger_schedule([1, 2, 3, 4, 5], cycles=2)
+        self.assertEqual(len(schedule), 10)
+        self.assertEqual(schedule[0], ([(2, 5), (3, 4)], 1))
+        self.assertEqual(schedule[5], ([(5, 2), (4, 3)], 1))
+        self.assertEqual(sorted(bye for _, bye in schedule[:5]), [1, 2, 3, 4, 5])
+
+    def test_schedule_and_play(self):
+        response = self.client.post(self.schedule_url)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data, {'tournament': self.tournament.id, 'rounds': 10, 'matches_created': 20})
+        self.tournament.refresh_from_db()
+        self.assertEqual(self.tournament.num_of_rounds, 10)
+        self.assertEqual(Round.objects.filter(tournament=self.tournament).count(), 10)
+        self.assertFalse(Match.objects.filter(tournament=self.tournament).exclude(winner=None).exists())
+        self.assertEqual(self.client.post(self.schedule_url).status_code, status.HTTP_400_BAD_REQUEST)
+
+        # A result recorded ahead of the round is kept when the round is played.
+        recorded = Match.objects.filter(tournament=self.tournament, round__round_number=1).first()
+        record_result(recorded.id, 0.0)
+        self.assertEqual(pair_next_round(self.tournament.id, seed=1)['round'], 1)
+        recorded.refresh_from_db()
+        self.assertEqual(recorded.winner_id, recorded.black_id)
+
+        summary = run_tournament(self.tournament.id, seed=2)
+        self.assertEqual((summary['rounds_played'], summary['matches_created']), (9, 27))
+        self.assertFalse(Round.objects.filter(tournament=self.tournament, closed_at=None).exists())
+        games = Match.objects.filter(tournament=self.tournament)
+        self.assertFalse(games.filter(black__isnull=False, draw=False, winner=None).exists())
+        for participant in Participant.objects.filter(tournament=self.tournament):
+            self.assertEqual(games.filter(white=participant, black=None).count(), 2)
+            self.assertEqual(games.filter(Q(white=participant) | Q(black=participant), black__isnull=False).count(), 8)
+        self.assertEqual(reconcile_standings(self.tournament.id), [])
+
+    def test_pairing_system_and_cycles_are_fixed_once_scheduled(self):
+        self.client.post(self.schedule_url)
+        url = reverse('tournament-detail', kwargs={'pk': self.tournament.pk})
+        for data in ({'pairing_system': Tournament.SWISS}, {'cycles': 1}):
+            response = self.client.patch(url, data, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn("once matches have been created", str(response.data))
+
+    def test_round_robins_may_have_more_than_eleven_rounds(self):
+        self.add_participants(8, Tournament.objects.create(name='Filler'))
+        Participant.objects.filter(tournament__name='Filler').update(tournament=self.tournament)
+        Tournament.objects.filter(pk=self.tournament.pk).update(cycles=1)
+        self.assertEqual(self.client.post(self.schedule_url).data['rounds'], 13)
+        self.tournament.refresh_from_db()
+        self.tournament.full_clean()
+        url = reverse('tournament-detail', kwargs={'pk': self.tournament.pk})
+        data = TournamentSerializer(self.tournament).data
+        data['name'] = 'Renamed'
+        self.assertEqual(self.client.put(url, data, format='json').status_code, status.HTTP_200_OK)
+
+        # Swiss tournaments keep the limit.
+        swiss = Tournament(name='Long Swiss', num_of_rounds=12)
+        with self.assertRaises(DjangoValidationError):
+            swiss.full_clean()
+        serializer = TournamentSerializer(data={'name': 'Long Swiss', 'num_of_rounds': 12})
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('num_of_rounds', serializer.errors)
+        self.assertTrue(TournamentSerializer(data={'name': 'Long', 'num_of_rounds': 12,
+                                                   'pairing_system': Tournament.ROUND_ROBIN}).is_valid())
+
+    def test_schedule_requires_round_robin(self):
+        self.client.patch(reverse('tournament-detail', kwargs={'pk': self.tournament.pk}),
+                          {'pairing_system': Tournament.SWISS}, format='json')
+        self.assertEqual(self.client.post(self.schedule_url).status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ArenaTests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.tournament.pairing_system = Tournament.ARENA
+        self.tournament.save()
+        self.others = self.add_participants(3)
+        self.url = reverse('tournament-arena', kwargs={'pk': self.tournament.pk})
+        # Matches are written by explicit flushes, in the test's transaction.
+        arena._arenas.clear()
+        arena._writer = MatchWriter()
+        self.addCleanup(arena._arenas.clear)
+        self.addCleanup(setattr, arena, '_writer', None)
+
+    def test_lobby_pairs_by_score_without_rematches(self):
+        lobby = ArenaLobby()
+        for participant_id, score in ((1, 0), (2, 2), (3, 1), (4, 2), (5, 0)):
+            lobby.join(participant_id, score)
+        lobby.leave(5)
+        self.assertEqual(lobby.pair(), [(2, 4), (3, 1)])
+        self.assertEqual(len(lobby), 0)
+
+        # 2 and 4 just played each other: 4 waits for someone else.
+        for participant_id in (2, 4):
+            lobby.join(participant_id, 3)
+        self.assertEqual(lobby.pair(), [])
+        lobby.join(3, 1)
+        self.assertEqual(lobby.pair(), [(2, 3)])
+        self.assertIn(4, lobby)
+
+    def test_play_through_the_lobby(self):
+        self.authenticate(self.user)
+        self.assertEqual(self.client.post(self.url).data, {'status': 'waiting', 'match': None})
+        self.authenticate(self.others[0].player.user)
+        response = self.client.post(self.url)
+        self.assertEqual(response.data['status'], 'playing')
+        game = response.data['match']
+        self.assertEqual({game['white_id'], game['black_id']}, {self.participant.id, self.others[0].id})
+
+        # The match row is written in the background, in a batch.
+        self.assertFalse(Match.objects.filter(id=game['id']).exists())
+        self.assertEqual(arena._writer.flush(), 1)
+        match = Match.objects.get(id=game['id'])
+        self.assertEqual((match.round.round_number, match.winner_id), (1, None))
+
+        self.assertEqual(self.client.post(self.url, {'match': game['id'] + 1, 'result': '1-0'}).status_code,
+                         status.HTTP_400_BAD_REQUEST)
+        # White's win counts once black confirms it.
+        white, black = self.user, self.others[0].player.user
+        if game['white_id'] != self.participant.id:
+            white, black = black, white
+        self.authenticate(white)
+        response = self.client.post(self.url, {'match': game['id'], 'result': '1-0'})
+        self.assertEqual(response.data['claim'], {'participant_id': game['white_id'], 'white_points': 1, 'forfeit': False})
+        self.assertEqual(Participant.objects.get(id=game['white_id']).score, 0)
+        self.authenticate(black)
+        response = self.client.post(self.url, {'match': game['id'], 'result': '1-0'})
+        self.assertEqual(response.data, {'status': 'waiting', 'match': None})
+        self.assertEqual(Participant.objects.get(id=game['white_id']).score, 1)
+
+        # Both players are back in the lobby; a newcomer is paired with the leader.
+        self.authenticate(self.others[1].player.user)
+        game = self.client.post(self.url).data['match']
+        self.assertEqual({game['white_id'], game['black_id']}, {match.white_id, self.others[1].id})
+        self.authenticate(self.others[0].player.user if match.white_id == self.participant.id else self.user)
+        self.assertEqual(self.client.delete(self.url).data['status'], 'away')
+        self.assertEqual(run_tournament(self.tournament.id)['rounds_played'], 0)
+
+    def test_only_participants_of_arenas(self):
+        self.authenticate(self.admin_user)
+        self.assertEqual(self.client.post(self.url).status_code, status.HTTP_404_NOT_FOUND)
+        Tournament.objects.filter(pk=self.tournament.pk).update(pairing_system=Tournament.SWISS)
+        self.authenticate(self.user)
+        self.assertEqual(self.client.post(self.url).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_results_need_the_opponents_confirmation(self):
+        game = self.play(self.participant, self.others[0])
+        current = arena.get_arena(self.tournament.id)
+        white_id, black_id = game['white_id'], game['black_id']
+        self.assertIsNone(current.report(game['id'], white_id, 0.5))
+        # Black disagrees: its own claim replaces white's.
+        self.assertIsNone(current.report(game['id'], black_id, 0))
+        self.assertEqual(current.status(white_id)['claim']['participant_id'], black_id)
+        with self.assertRaises(ValueError):
+            current.report(game['id'], self.others[1].id, 1)
+        # White resigns: a loss counts at once.
+        self.assertEqual(current.report(game['id'], white_id, 0).winner_id, black_id)
+        self.assertEqual(current.status(white_id), {'status': 'waiting', 'match': None})
+
+    def test_staff_results_count_at_once(self):
+        game = self.play(self.participant, self.others[0])
+        User.objects.filter(pk=self.user.pk).update(is_staff=True)
+        self.authenticate(self.user)
+        own = 1 if game['white_id'] == self.participant.id else 0
+        response = self.client.post(self.url, {'match': game['id'], 'result': '1-0' if own else '0-1'})
+        self.assertEqual(response.data, {'status': 'waiting', 'match': None})
+        self.assertEqual(Participant.objects.get(id=self.participant.id).score, 1)
+
+    def test_failed_result_keeps_the_game(self):
+        game = self.play(self.participant, self.others[0])
+        current = arena.get_arena(self.tournament.id)
+        with self.assertRaises(ValueError):
+            current.finish(game['id'], 0.7)
+        self.assertEqual(current.status(self.participant.id), {'status': 'playing', 'match': game})
+        current.finish(game['id'], 1)
+        self.assertEqual(current.status(self.participant.id)['status'], 'waiting')
+
+    def play(self, *participants):
+        """Join the lobby as each participant in turn and return the last response's match."""
+        for participant in participants:
+            self.authenticate(participant.player.user)
+            game = self.client.post(self.url).data['match']
+        return game
+
+    def test_own_writes_keep_the_arena(self):
+        game = self.play(self.participant, self.others[0])
+        current = arena.get_arena(self.tournament.id)
+        self.assertEqual(arena._writer.flush(), 1)
+        current.finish(game['id'], 1)
+        self.assertIs(arena.get_arena(self.tournament.id), current)
+
+    def test_other_writes_rebuild_the_arena(self):
+        game = self.play(self.participant, self.others[0])
+        self.play(self.others[1])
+        stale = arena.get_arena(self.tournament.id)
+        arena._writer.flush()
+
+        # An admin records the result outside the arena: the game is over and the scores change.
+        record_result(game['id'], 0)
+        rebuilt = arena.get_arena(self.tournament.id)
+        self.assertIsNot(rebuilt, stale)
+        self.assertEqual(rebuilt.status(game['white_id'])['status'], 'away')
+        self.assertEqual(rebuilt.status(self.others[1].id)['status'], 'waiting')
+        self.authenticate(self.user)
+        self.assertEqual(self.client.post(self.url, {'match': game['id'], 'result': '1-0'}).status_code,
+                         status.HTTP_400_BAD_REQUEST)
+
+        self.assertEqual(rebuilt.join(game['black_id'])['status'], 'playing')
+        self.assertEqual(rebuilt.scores[game['black_id']], 1)
+        self.assertIs(arena.get_arena(self.tournament.id), rebuilt)
+
+    def test_games_in_progress_survive_a_rebuild(self):
+        game = self.play(self.participant, self.others[0])
+        arena._writer.flush()
+        # A new process: the arena is loaded from the unfinished matches.
+        arena._arenas.clear()
+        self.assertEqual(arena.get_arena(self.tournament.id).status(self.participant.id),
+                         {'status': 'playing', 'match': game})
+
+        for user in (self.user, self.others[0].player.user):
+            self.authenticate(user)
+            response = self.client.post(self.url, {'match': game['id'], 'result': '1/2-1/2'})
+        self.assertEqual(response.data, {'status': 'waiting', 'match': None})
+        self.assertEqual(Participant.objects.get(id=game['black_id']).score, 0.5)
+        # Both players are back in the lobby, and previous opponents are not paired again.
+        self.assertEqual(arena.get_arena(self.tournament.id).status(self.others[0].id)['status'], 'waiting')
+
+
+class AdminTests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.add_participants(5)
+        self.client.force_login(self.admin_user)
+
+    def changelist_queries(self, model, **params):
+        url = reverse(f'admin:tournaments_{model}_changelist')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(queries)
+
+    def test_changelists_do_not_query_per_row(self):
+        run_tournament(self.tournament.id, seed=1)
+        models = ('tournament', 'participant', 'round', 'match')
+        counts = {model: self.changelist_queries(model) for model in models}
+        second = Tournament.objects.create(name='Second', num_of_rounds=3)
+        self.add_participants(10, second)
+        run_tournament(second.id, seed=2)
+        self.assertEqual({model: self.changelist_queries(model) for model in models}, counts)
+        self.assertLessEqual(self.changelist_queries('match', tournament=second.id), counts['match'])
+        self.assertLessEqual(self.changelist_queries('participant', q='user'), counts['participant'])
+
+    def test_str(self):
+        run_tournament(self.tournament.id, seed=1)
+        match = Match.objects.filter(tournament=self.tournament, black__isnull=False).first()
+        self.assertEqual(str(self.participant), 'user - Test Tournament')
+        self.assertIn(' vs ', str(match))
+
+    def test_estimated_count_paginator(self):
+        paginator = EstimatedCountPaginator(Participant.objects.filter(tournament=self.tournament).order_by('id'), 2)
+        self.assertEqual((paginator.count, paginator.num_pages), (6, 3))
+
+    def version(self):
+        return Tournament.objects.get(id=self.tournament.id).version
+
+    def test_results_pairings_and_standings_are_read_only(self):
+        run_tournament(self.tournament.id, seed=1)
+        match = Match.objects.filter(tournament=self.tournament, black__isnull=False).first()
+        url = reverse('admin:tournaments_match_change', args=[match.id])
+        fields = self.client.get(url).context['adminform'].form.fields
+        self.assertEqual(set(fields) & {'tournament', 'round', 'white', 'black', 'winner', 'draw'}, set())
+        version = self.version()
+        winner = match.black_id if match.winner_id == match.white_id else match.white_id
+        response = self.client.post(url, {'duration': '00:30:00', 'winner': winner, 'draw': 'on'})
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+        self.assertEqual(Match.objects.values_list('winner_id', 'draw').get(id=match.id), (match.winner_id, match.draw))
+        self.assertEqual(self.version(), version + 1)
+
+        participant_fields = self.client.get(
+            reverse('admin:tournaments_participant_change', args=[self.participant.id])
+        ).context['adminform'].form.fields
+        self.assertEqual(set(participant_fields), {'player'})
+        self.assertEqual(self.client.get(reverse('admin:tournaments_round_add')).status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_games_cannot_be_deleted(self):
+        run_tournament(self.tournament.id, seed=1)
+        round_obj = Round.objects.get(tournament=self.tournament, round_number=3)
+        match = Match.objects.filter(tournament=self.tournament).first()
+        for url in (reverse('admin:tournaments_round_delete', args=[round_obj.id]),
+                    reverse('admin:tournaments_match_delete', args=[match.id])):
+            self.assertEqual(self.client.post(url, {'post': 'yes'}).status_code, status.HTTP_403_FORBIDDEN)
+        self.assertTrue(Round.objects.filter(id=round_obj.id).exists())
+        self.assertTrue(Match.objects.filter(id=match.id).exists())
+
+        # Deleting a participant who played would delete matches; one who did not is deleted.
+        late = Participant.objects.create(player=Player.objects.create(user=User.objects.create_user('late')),
+                                          tournament=self.tournament)
+        version = self.version()
+        self.client.post(reverse('admin:tournaments_participant_changelist'), {
+            'action': 'delete_selected', 'post': 'yes', '_selected_action': [self.participant.id, late.id],
+        })
+        self.assertEqual(Participant.objects.filter(id__in=[self.participant.id, late.id]).count(), 2)
+        url = reverse('admin:tournaments_participant_delete', args=[self.participant.id])
+        self.assertContains(self.client.get(url), "Cannot delete participant")
+        self.assertEqual(self.client.post(url, {'post': 'yes'}).status_code, status.HTTP_403_FORBIDDEN)
+        self.assertTrue(Participant.objects.filter(id=self.participant.id).exists())
+        self.client.post(reverse('admin:tournaments_participant_delete', args=[late.id]), {'post': 'yes'})
+        self.assertFalse(Participant.objects.filter(id=late.id).exists())
+        self.assertEqual(self.version(), version + 1)
+
+    def test_tournament_edits_bump_version_and_deletes_use_the_service(self):
+        version = self.version()
+        url = reverse('admin:tournaments_tournament_change', args=[self.tournament.id])
+        form = self.client.get(url).context['adminform'].form
+        data = {name: value for name, value in form.initial.items() if value is not None and name in form.fields}
+        data.update(name='Renamed', start_date='2024-07-10', end_date='2024-08-11')
+        response = self.client.post(url, data)
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+        self.assertEqual((Tournament.objects.get(id=self.tournament.id).name, self.version()), ('Renamed', version + 1))
+
+        run_tournament(self.tournament.id, seed=1)
+        delete_url = reverse('admin:tournaments_tournament_delete', args=[self.tournament.id])
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(delete_url)
+        self.assertFalse([q for q in queries.captured_queries if 'FROM "tournaments_match"' in q['sql']])
+        self.client.post(delete_url, {'post': 'yes'})
+        self.assertFalse(Tournament.objects.filter(id=self.tournament.id).exists())
+        self.assertFalse(ResultEvent.objects.filter(tournament_id=self.tournament.id).exists())
+
+
+class DeleteTournamentTests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.add_participants(7)
+        run_tournament(self.tournament.id, seed=1)
+        match = Match.objects.filter(tournament=self.tournament, black__isnull=False).first()
+        GameScore.objects.create(match=match, ply_count=2, moves=encode_moves(['e4', 'e5']))
+        Forecast.objects.create(tournament=self.tournament, version=1, data={})
+        self.other = Tournament.objects.create(name='Other', num_of_rounds=2)
+        self.add_participants(4, self.other)
+        run_tournament(self.other.id, seed=2)
+        self.url = reverse('tournament-detail', kwargs={'pk': self.tournament.pk})
+        self.authenticate(self.admin_user)
+
+    def assertDeleted(self, tournament_id):
+        self.assertFalse(Tournament.objects.filter(id=tournament_id).exists())
+        for model in (Participant, Round, Match, StandingSnapshot, Forecast, ResultEvent):
+            self.assertFalse(model.objects.filter(tournament_id=tournament_id).exists(), model.__name__)
+        self.assertFalse(GameScore.objects.exists())
+
+    def test_destroy(self):
+        matches = Match.objects.filter(tournament=self.other).count()
+        response = self.client.delete(self.url)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertDeleted(self.tournament.id)
+        self.assertEqual(Match.objects.filter(tournament=self.other).count(), matches)
+        self.assertEqual(Player.objects.count(), 12)
+
+    def test_small_chunks_report_progress(self):
+        total = 1 + sum(model.objects.filter(tournament=self.tournament).count()
+                        for model in (ResultEvent, Match, StandingSnapshot, Round, Participant, Forecast))
+        progress = []
+        deleted = delete_tournament(self.tournament.id, chunk_size=5, progress=lambda done, count: progress.append(done))
+        self.assertDeleted(self.tournament.id)
+        self.assertEqual(progress[-1], total)
+        self.assertEqual(deleted[Tournament._meta.db_table], 1)
+        self.assertEqual(deleted[GameScore._meta.db_table], 1)
+        self.assertEqual(delete_tournament(self.tournament.id)[Tournament._meta.db_table], 0)
+
+    def test_destroy_async(self):
+        response = self.client.delete(self.url + '?async=true')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        job = claim_next('worker-1')
+        self.assertEqual((job.id, job.kind), (response.data['id'], 'delete_tournament'))
+        run_job(job)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertDeleted(self.tournament.id)
+
+    def test_command(self):
+        out = StringIO()
+        call_command('delete_tournaments', str(self.tournament.id), '--chunk-size', '3', stdout=out)
+        self.assertIn(f"Tournament {self.tournament.id}: deleted", out.getvalue())
+        self.assertDeleted(self.tournament.id)
+
+
+class ArchiveTests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.add_participants(7)
+        run_tournament(self.tournament.id, seed=1)
+        self.match = Match.objects.filter(tournament=self.tournament, black__isnull=False).first()
+        GameScore.objects.create(match=self.match, ply_count=2, moves=encode_moves(['e4', 'e5']), tags={'Event': 'Test'})
+        self.authenticate(self.user)
+        self.urls = [
+            reverse('tournament-participants', kwargs={'pk': self.tournament.pk}),
+            reverse('tournament-participants', kwargs={'pk': self.tournament.pk}) + '?ordering=rank&size=3&page=2',
+            reverse('tournament-standings', kwargs={'pk': self.tournament.pk}),
+            reverse('tournament-standings', kwargs={'pk': self.tournament.pk}) + '?round=2',
+        ]
+        self.dump_url = reverse('tournament-dump', kwargs={'pk': self.tournament.pk})
+
+    def read(self):
+        responses = [self.client.get(url) for url in self.urls]
+        for response in responses:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        dump = b''.join(self.client.get(self.dump_url).streaming_content)
+        # The dump's header line carries the version; the rest must not change.
+        return [response.json() for response in responses], [response['ETag'] for response in responses], \
+            dump.partition(b'\n')[2]
+
+    def assertSameContent(self, read, before):
+        bodies, etags, dump = read
+        self.assertEqual((bodies, dump), (before[0], before[2]))
+        self.assertFalse(set(etags) & set(before[1]))
+
+    def rows(self):
+        return {
+            model.__name__: sorted(model.objects.filter(tournament=self.tournament).values_list('id', flat=True))
+            for model in (Participant, Round, Match)
+        }
+
+    def test_archive_serves_reads_and_restores(self):
+        before, rows = self.read(), self.rows()
+        snapshots = list(StandingSnapshot.objects.filter(tournament=self.tournament)
+                         .order_by('round_number', 'rank').values_list('participant_id', 'round_number', 'rank', 'score'))
+
+        summary = archive_tournament(self.tournament.id)
+        self.assertEqual((summary['participants'], summary['matches']), (8, 12))
+        for model in (Participant, Round, Match, StandingSnapshot):
+            self.assertFalse(model.objects.filter(tournament=self.tournament).exists())
+        self.assertFalse(GameScore.objects.exists())
+        archived = self.read()
+        self.assertSameContent(archived, before)
+        forecast = self.client.get(reverse('tournament-forecast', kwargs={'pk': self.tournament.pk}))
+        self.assertEqual(forecast.status_code, status.HTTP_200_OK)
+        self.assertFalse(forecast.json()['stale'])
+
+        self.authenticate(self.admin_user)
+        response = self.client.post(reverse('tournament-pair-round', kwargs={'pk': self.tournament.pk}))
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(self.client.get(reverse('tournament-detail', kwargs={'pk': self.tournament.pk})).status_code,
+                         status.HTTP_200_OK)
+        with self.assertRaises(ValueError):
+            archive_tournament(self.tournament.id)
+
+        restore_tournament(self.tournament.id)
+        self.assertFalse(TournamentArchive.objects.exists())
+        self.assertEqual(self.rows(), rows)
+        self.assertEqual(list(StandingSnapshot.objects.filter(tournament=self.tournament).order_by('round_number', 'rank')
+                              .values_list('participant_id', 'round_number', 'rank', 'score')), snapshots)
+        self.assertEqual(decode_moves(GameScore.objects.get(match=self.match).moves), ['e4', 'e5'])
+        self.authenticate(self.user)
+        self.assertSameContent(self.read(), before)
+        self.assertSameContent(self.read(), archived)
+
+    def test_restore_without_a_deleted_player(self):
+        archive_tournament(self.tournament.id)
+        Player.objects.get(user__username=f'{self.tournament.pk}-player0').delete()
+        with self.assertRaisesMessage(ValueError, "were deleted after the tournament was archived"):
+            restore_tournament(self.tournament.id)
+        self.assertTrue(TournamentArchive.objects.filter(tournament=self.tournament).exists())
+
+    def test_rerate_refuses_archived_tournaments(self):
+        ratings = dict(Player.objects.values_list('id', 'rating'))
+        archive_tournament(self.tournament.id)
+        with self.assertRaisesMessage(ValueError, f"Tournaments {self.tournament.id} are archived"):
+            rerate_players(initial_rating=800)
+        with self.assertRaises(CommandError):
+            call_command('rerate_players', stdout=StringIO())
+        self.assertEqual(dict(Player.objects.values_list('id', 'rating')), ratings)
+
+        restore_tournament(self.tournament.id)
+        self.assertEqual(rerate_players(initial_rating=800)['rounds'], 3)
+
+    def test_archive_tournaments_skips_unfinished_and_recent(self):
+        recent = Tournament.objects.create(name='Recent', num_of_rounds=2, end_date=timezone.now().date())
+        self.add_participants(4, recent)
+        run_tournament(recent.id, seed=2)
+        unfinished = Tournament.objects.create(name='Unfinished', num_of_rounds=3, end_date='2024-01-01')
+        self.add_participants(4, unfinished)
+        summary = archive_tournaments(timezone.now().date())
+        self.assertEqual((summary['archived'], summary['skipped']), (1, 1))
+        self.assertEqual(list(TournamentArchive.objects.values_list('tournament_id', flat=True)), [self.tournament.id])
+
+    def test_delete_archived(self):
+        archive_tournament(self.tournament.id)
+        self.authenticate(self.admin_user)
+        response = self.client.delete(reverse('tournament-detail', kwargs={'pk': self.tournament.pk}))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(TournamentArchive.objects.exists())
+
+    def test_command(self):
+        out = StringIO()
+        call_command('archive_tournaments', '--days', '30', stdout=out)
+        self.assertIn("Archived 1 tournaments", out.getvalue())
+        call_command('archive_tournaments', '--restore', str(self.tournament.id), stdout=out)
+        self.assertEqual(Participant.objects.filter(tournament=self.tournament).count(), 8)
+
+
+class ResultEventTests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.add_participants(7)
+        run_tournament(self.tournament.id, seed=1)
+        self.match = Match.objects.filter(tournament=self.tournament, black__isnull=False).order_by('id').first()
+        self.url = reverse('tournament-events', kwargs={'pk': self.tournament.pk})
+
+    def standings(self):
+        return list(Participant.objects.filter(tournament=self.tournament).order_by('id')
+                    .values_list('score', 'wins', 'draws', 'losses', 'buchholz', 'sonneborn_berger', 'progressive'))
+
+    def test_run_logs_every_result(self):
+        events = ResultEvent.objects.filter(tournament=self.tournament)
+        self.assertEqual(events.count(), 12)
+        self.assertEqual(set(events.values_list('kind', flat=True)), {ResultEvent.SET})
+        self.assertEqual(events.count(), events.values('match_id').distinct().count())
+
+    def test_record_result_kinds(self):
+        old = 1 - ResultEvent.objects.get(match_id=self.match.id).white_points
+        record_result(self.match.id, old, user=self.admin_user)
+        record_result(self.match.id, old)  # unchanged: nothing to log
+        record_result(self.match.id, old, forfeit=True)
+        kinds = list(ResultEvent.objects.filter(match_id=self.match.id).order_by('id').values_list('kind', 'created_by_id'))
+        self.assertEqual(kinds, [(ResultEvent.SET, None), (ResultEvent.CORRECTED, self.admin_user.id),
+                                 (ResultEvent.FORFEIT, None)])
+
+    def test_replay_rebuilds_projections(self):
+        record_result(self.match.id, 0.5)
+        expected = self.standings()
+        self.assertEqual(replay_tournament(self.tournament.id)['changed'], 0)
+
+        Participant.objects.filter(tournament=self.tournament).update(score=0, wins=0, buchholz=0)
+        summary = replay_tournament(self.tournament.id)
+        self.assertEqual((summary['games'], summary['participants'], summary['changed']), (12, 8, 8))
+        self.assertEqual(self.standings(), expected)
+
+    def test_replay_until(self):
+        expected = self.standings()
+        last = ResultEvent.objects.filter(tournament=self.tournament).latest('id').id
+        record_result(self.match.id, 0.5)
+        # The two players and, through their tiebreaks, their opponents.
+        self.assertGreater(replay_tournament(self.tournament.id, until=last, dry_run=True)['changed'], 2)
+        self.assertNotEqual(self.standings(), expected)
+        replay_tournament(self.tournament.id, until=last)
+        self.assertEqual(self.standings(), expected)
+
+    def test_events_are_append_only(self):
+        event = ResultEvent.objects.filter(tournament=self.tournament).first()
+        event.white_points = 0.5
+        with self.assertRaises(ValueError):
+            event.save()
+
+    def test_endpoint(self):
+        self.authenticate(self.user)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_403_FORBIDDEN)
+        self.authenticate(self.admin_user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 12)
+        record_result(self.match.id, 0.5)
+        response = self.client.get(self.url, {'match': self.match.id})
+        self.assertEqual([row['kind'] for row in response.data['results']],
+                         [ResultEvent.SET, ResultEvent.CORRECTED])
+
+        archive_tournament(self.tournament.id)
+        self.assertFalse(ResultEvent.objects.exists())
+        archived = self.client.get(self.url, {'match': self.match.id})
+        self.assertEqual(archived.data['results'], response.data['results'])
+        restore_tournament(self.tournament.id)
+        self.assertEqual(ResultEvent.objects.filter(tournament=self.tournament).count(), 13)
+        self.assertEqual(replay_tournament(self.tournament.id)['changed'], 0)
+
+    def test_trf_import_logs_results(self):
+        tournament_id = import_trf(StringIO(TRF_SAMPLE))['tournament']
+        self.assertEqual(ResultEvent.objects.filter(tournament_id=tournament_id).count(), 5)
+        self.assertEqual(replay_tournament(tournament_id, dry_run=True)['changed'], 0)
+
+    def test_command(self):
+        Participant.objects.filter(tournament=self.tournament).update(score=0)
+        out = StringIO()
+        call_command('replay_results', str(self.tournament.id), stdout=out)
+        self.assertIn("Rebuilt 8 differing participants", out.getvalue())
+
+
+class WarmStateTests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        state.clear()
+        self.add_participants(7)
+        self.tournament.num_of_rounds = 4
+        self.tournament.save()
+
+    def tearDown(self):
+        state.clear()
+
+    def pair(self, tournament_id, seed):
+        # The runner is put back when the round commits, and the test case never commits.
+        with self.captureOnCommitCallbacks(execute=True):
+            return pair_next_round(tournament_id, seed=seed)
+
+    def refresh(self):
+        runner = state.take(self.tournament.id)
+        mode = runner.refresh(Tournament.objects.get(id=self.tournament.id))
+        state.keep(runner)
+        return runner, mode
+
+    def games(self, tournament):
+        seeds = dict(Participant.objects.filter(tournament=tournament).values_list('id', 'seed'))
+        return [
+            (match.round.round_number, seeds[match.white_id], seeds.get(match.black_id), match.winner_id == match.white_id,
+             match.draw)
+            for match in Match.objects.filter(tournament=tournament).select_related('round').order_by('round__round_number', 'id')
+        ]
+
+    def test_consecutive_rounds_reuse_the_runner(self):
+        self.pair(self.tournament.id, 1)
+        runner = state.take(self.tournament.id)
+        state.keep(runner)
+        with CaptureQueriesContext(connection) as queries:
+            self.pair(self.tournament.id, 2)
+        self.assertIs(state.take(self.tournament.id), runner)
+        with CaptureQueriesContext(connection) as cold:
+            self.pair(self.tournament.id, 3)
+        # The warm round skips checking the seeds, reading the stamp, the participants and the matches.
+        self.assertEqual(len(cold), len(queries) + 4)
+
+    def test_warm_and_cold_rounds_agree(self):
+        cold = Tournament.objects.create(name='Cold', num_of_rounds=4)
+        self.add_participants(8, cold)
+        for number in range(4):
+            self.pair(self.tournament.id, number)
+            state.clear()
+            self.pair(cold.id, number)
+            state.clear()
+            if number == 1:
+                match = Match.objects.filter(tournament=self.tournament, black__isnull=False).order_by('id').first()
+                record_result(match.id, 0.5)
+                twin = Match.objects.filter(tournament=cold, black__isnull=False).order_by('id').first()
+                record_result(twin.id, 0.5)
+        warm_games = self.games(self.tournament)
+        state.clear()
+        self.assertEqual(warm_games, self.games(cold))
+        self.assertEqual(replay_tournament(self.tournament.id, dry_run=True)['changed'], 0)
+
+    def test_results_are_applied_as_deltas(self):
+        self.pair(self.tournament.id, 1)
+        self.assertEqual(self.refresh()[1], 'warm')
+        match = Match.objects.filter(tournament=self.tournament, black__isnull=False).order_by('id').first()
+        record_result(match.id, 0.5)
+        runner, mode = self.refresh()
+        self.assertEqual(mode, 'delta')
+        self.assertEqual(runner.version, Tournament.objects.get(id=self.tournament.id).version)
+        self.assertEqual(runner.engine.score,
+                         dict(Participant.objects.filter(tournament=self.tournament).values_list('id', 'score')))
+        self.assertEqual(self.refresh()[1], 'warm')
+
+    def test_other_changes_reload(self):
+        self.pair(self.tournament.id, 1)
+        # Another process pairs round 2.
+        TournamentRunner(Tournament.objects.get(id=self.tournament.id), rng=random.Random(2)).play_round(
+            Round.objects.get(tournament=self.tournament, round_number=2))
+        runner, mode = self.refresh()
+        self.assertEqual(mode, 'reload')
+        self.assertEqual(runner.games_played, 8)
+
+        Participant.objects.create(player=Player.objects.create(user=User.objects.create_user('late')),
+                                   tournament=self.tournament)
+        Tournament.bump_version(self.tournament.id)
+        runner, mode = self.refresh()
+        self.assertEqual(mode, 'reload')
+        self.assertEqual(len(runner.participant_ids), 9)
+
+        self.pair(self.tournament.id, 1)
+        pairs = [frozenset(pair) for pair in
+                 Match.objects.filter(tournament=self.tournament, black__isnull=False).values_list('white_id', 'black_id')]
+        self.assertEqual(len(pairs), len(set(pairs)))
+
+    def test_games_edited_without_an_event_reload(self):
+        self.pair(self.tournament.id, 1)
+        self.pair(self.tournament.id, 2)
+        match = Match.objects.filter(tournament=self.tournament, black__isnull=False).order_by('id').first()
+        # A result changed in place, with the version bumped but no event logged.
+        Match.objects.filter(id=match.id).update(winner=None, draw=not match.draw)
+        Tournament.bump_version(self.tournament.id)
+        runner, mode = self.refresh()
+        self.assertEqual(mode, 'reload')
+        self.assertEqual(runner.results[match.id][2], 0.5 if not match.draw else None)
+
+        # Colors swapped in place.
+        Match.objects.filter(id=match.id).update(white_id=match.black_id, black_id=match.white_id)
+        Tournament.bump_version(self.tournament.id)
+        runner, mode = self.refresh()
+        self.assertEqual(mode, 'reload')
+        self.assertEqual(runner.results[match.id][:2], (match.black_id, match.white_id))
+
+        # A seed edited in place.
+        Participant.objects.filter(id=self.participant.id).update(seed=99)
+        Tournament.bump_version(self.tournament.id)
+        runner, mode = self.refresh()
+        self.assertEqual((mode, runner.seeds[self.participant.id]), ('reload', 99))
+
+    @override_settings(TOURNAMENT_STATE_CACHE_SIZE=1)
+    def test_least_recently_used_runners_are_evicted(self):
+        other = Tournament.objects.create(name='Other', num_of_rounds=2)
+        self.add_participants(4, other)
+        self.pair(self.tournament.id, 1)
+        self.pair(other.id, 1)
+        self.assertIsNone(state.take(self.tournament.id))
+        self.assertIsNotNone(state.take(other.id))
+
+    def test_rolled_back_rounds_drop_the_runner(self):
+        self.pair(self.tournament.id, 1)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                pair_next_round(self.tournament.id, seed=2)
+                raise RuntimeError
+        self.assertEqual(callbacks, [])
+        self.assertIsNone(state.take(self.tournament.id))
+        self.assertFalse(Match.objects.filter(tournament=self.tournament, round__round_number=2).exists())
+        self.pair(self.tournament.id, 2)
+        self.assertEqual(state.take(self.tournament.id).games_played, 8)
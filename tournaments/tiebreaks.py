@@ -0,0 +1,229 @@
+"""
+Tiebreak engine: Buchholz, Sonneborn-Berger and progressive score.
+
+Tiebreaks depend on the scores of a participant's opponents, so a naive computation walks every
+opponent of every participant. Two strategies avoid that:
+
+- `TiebreakEngine` keeps the opponent-score sums of each participant and updates them incrementally:
+  when a participant scores, only their own opponents' sums change, which is O(games of that
+  participant) per result.
+- `batch_tiebreaks` recomputes a whole tournament at once with NumPy, as a handful of weighted
+  `bincount` passes over the game arrays.
+
+Definitions (byes count as a won game without an opponent):
+    buchholz: sum of the scores of all opponents.
+    sonneborn_berger: sum of the scores of beaten opponents plus half the scores of drawn ones.
+    progressive: sum of the participant's cumulative score after each of their games, in round
+        then match id order. Rounds the participant did not play add nothing, and an arena, whose
+        games all belong to one round, counts each game.
+
+Functions:
+    parse_chain(value): Validates a comma separated tiebreak chain.
+    leaderboard_ordering(chain): `order_by` arguments for participants ordered by score and the chain.
+    standings_key(chain, seeds): Sort key for standings rows ordered by score and the chain.
+    batch_tiebreaks(participant_ids, games): Vectorized recomputation for a whole tournament.
+
+Classes:
+    TiebreakEngine: Incremental standings and tiebreaks held in memory.
+"""
+
+import numpy as np
+from django.db.models import F
+
+
+TIEBREAKS = ('buchholz', 'sonneborn_berger', 'progressive', 'wins')
+DEFAULT_TIEBREAKS = 'buchholz,sonneborn_berger,progressive'
+
+
+def parse_chain(value):
+    """
+    Split a comma separated tiebreak chain into names.
+
+    Raises:
+        ValueError: If the chain contains an unknown or repeated tiebreak.
+    """
+    names = [name.strip() for name in (value or '').split(',') if name.strip()]
+    unknown = [name for name in names if name not in TIEBREAKS]
+    if unknown:
+        raise ValueError(f"Unknown tiebreaks: {', '.join(unknown)}. Choose from {', '.join(TIEBREAKS)}.")
+    if len(set(names)) != len(names):
+        raise ValueError("A tiebreak can only appear once in the chain.")
+    return names
+
+
+def leaderboard_ordering(chain):
+    """`order_by` arguments sorting participants by score, then the tiebreak chain, then seed and id."""
+    return ['-score', *(f'-{name}' for name in chain), F('seed').asc(nulls_last=True), 'id']
+
+
+def standings_key(chain, seeds=None):
+    """
+    Sort key for standings rows: score, then each tiebreak of the chain (all descending), then
+    seed (unseeded last) and id.
+
+    Args:
+        chain (list): Tiebreak names.
+        seeds (dict, optional): Maps a participant id to its seed.
+    """
+    seeds = seeds or {}
+
+    def key(row):
+        pid = row['participant_id']
+        seed = seeds.get(pid)
+        return (-row['score'], *(-row[name] for name in chain), seed is None, seed or 0, pid)
+    return key
+
+
+class TiebreakEngine:
+    """
+    Standings and tiebreaks of one tournament, updated incrementally as results arrive.
+
+    Results must be added in round order, then match id order within a round, for the progressive
+    score to be exact.
+
+    Attributes:
+        score, wins, draws, losses, buchholz, sonneborn_berger, progressive (dict): Values by participant id.
+        games (dict): Maps a participant id to a list of [opponent_id, points] of played games.
+    """
+
+    FIELDS = ('score', 'wins', 'draws', 'losses', 'buchholz', 'sonneborn_berger', 'progressive')
+
+    def __init__(self, participant_ids):
+        ids = list(participant_ids)
+        self.score = dict.fromkeys(ids, 0.0)
+        self.wins = dict.fromkeys(ids, 0)
+        self.draws = dict.fromkeys(ids, 0)
+        self.losses = dict.fromkeys(ids, 0)
+        self.buchholz = dict.fromkeys(ids, 0.0)
+        self.sonneborn_berger = dict.fromkeys(ids, 0.0)
+        self.progressive = dict.fromkeys(ids, 0.0)
+        self.games = {pid: [] for pid in ids}
+
+    def _score(self, pid, points):
+        """Add points to a participant and propagate them to the sums of their current opponents."""
+        self.score[pid] += points
+        if points == 1:
+            self.wins[pid] += 1
+        elif points == 0.5:
+            self.draws[pid] += 1
+        else:
+            self.losses[pid] += 1
+        for opponent, own_points in self.games[pid]:
+            self.buchholz[opponent] += points
+            self.sonneborn_berger[opponent] += (1 - own_points) * points
+
+    def add_result(self, white_id, black_id, white_points):
+        """
+        Apply a finished game. `black_id` is None for a bye, which counts as a win for white.
+        """
+        if black_id is None:
+            self._score(white_id, 1.0)
+            self.progressive[white_id] += self.score[white_id]
+            return
+
+        black_points = 1 - white_points
+        self._score(white_id, white_points)
+        self._score(black_id, black_points)
+
+        self.games[white_id].append([black_id, white_points])
+        self.games[black_id].append([white_id, black_points])
+        self.buchholz[white_id] += self.score[black_id]
+        self.buchholz[black_id] += self.score[white_id]
+        self.sonneborn_berger[white_id] += white_points * self.score[black_id]
+        self.sonneborn_berger[black_id] += black_points * self.score[white_id]
+        self.progressive[white_id] += self.score[white_id]
+        self.progressive[black_id] += self.score[black_id]
+
+    @classmethod
+    def from_games(cls, participant_ids, games):
+        """
+        An engine holding already finished games, computed in one vectorized pass (`batch_tiebreaks`)
+        rather than game by game. `games` are (white_id, black_id, white_points, round_number) tuples.
+        """
+        engine = cls(participant_ids)
+        games = list(games)
+        for row in batch_tiebreaks(list(engine.score), games):
+            for field in cls.FIELDS:
+                getattr(engine, field)[row['participant_id']] = row[field]
+        for white_id, black_id, white_points, _ in games:
+            if black_id is not None:
+                engine.games[white_id].append([black_id, white_points])
+                engine.games[black_id].append([white_id, 1 - white_points])
+        return engine
+
+    def row(self, pid):
+        return {'participant_id': pid, **{field: getattr(self, field)[pid] for field in self.FIELDS}}
+
+    def rows(self):
+        return [self.row(pid) for pid in self.score]
+
+
+def batch_tiebreaks(participant_ids, games):
+    """
+    Recompute score, W/D/L and tiebreaks of a whole tournament in one vectorized pass.
+
+    Args:
+        participant_ids (iterable): Ids of every participant of the tournament.
+        games (iterable): (white_id, black_id, white_points, round_number) tuples of finished games;
+            black_id is None for a bye. Games of the same round must come in match id order.
+
+    Returns:
+        list: One dict per participant with participant_id and every field of `TiebreakEngine.FIELDS`.
+    """
+    ids = np.fromiter(participant_ids, dtype=np.int64)
+    n = len(ids)
+    games = list(games)
+    if not n:
+        return []
+    if not games:
+        return [{'participant_id': int(pid), **dict.fromkeys(TiebreakEngine.FIELDS, 0)} for pid in ids]
+
+    order = np.argsort(ids)
+    sorted_ids = ids[order]
+
+    def index_of(values):
+        return order[np.searchsorted(sorted_ids, values)]
+
+    white_ids, black_ids, white_points, rounds = zip(*games)
+    white = index_of(np.asarray(white_ids, dtype=np.int64))
+    bye = np.fromiter((b is None for b in black_ids), dtype=bool, count=len(games))
+    black = np.full(len(games), -1, dtype=np.int64)
+    black[~bye] = index_of(np.fromiter((b for b in black_ids if b is not None), dtype=np.int64))
+    wp = np.where(bye, 1.0, np.asarray(white_points, dtype=np.float64))
+    rounds = np.asarray(rounds, dtype=np.int64)
+    played = ~bye
+    pw, pb, pwp = white[played], black[played], wp[played]
+    pbp = 1.0 - pwp
+
+    def total(index, weights):
+        return np.bincount(index, weights=weights, minlength=n)
+
+    score = total(white, wp) + total(pb, pbp)
+    wins = total(white, wp == 1) + total(pb, pbp == 1)
+    draws = total(pw, pwp == 0.5) + total(pb, pbp == 0.5)
+    losses = total(pw, pwp == 0) + total(pb, pbp == 0)
+    buchholz = total(pw, score[pb]) + total(pb, score[pw])
+    sonneborn_berger = total(pw, pwp * score[pb]) + total(pb, pbp * score[pw])
+    # A point counts once for each game the participant played from that one on, in round then
+    # match id order: rank each participant's games from their last one.
+    position = np.empty(len(games), dtype=np.int64)
+    position[np.argsort(rounds, kind='stable')] = np.arange(len(games))
+    sides = np.concatenate([white, pb])
+    entries = np.lexsort((-np.concatenate([position, position[played]]), sides))
+    sides = sides[entries]
+    later = np.arange(len(sides)) - np.searchsorted(sides, sides) + 1
+    progressive = total(sides, np.concatenate([wp, pbp])[entries] * later)
+
+    return [
+        {
+            'participant_id': int(ids[i]),
+            'score': float(score[i]),
+            'wins': int(wins[i]),
+            'draws': int(draws[i]),
+            'losses': int(losses[i]),
+            'buchholz': float(buchholz[i]),
+            'sonneborn_berger': float(sonneborn_berger[i]),
+            'progressive': float(progressive[i]),
+        }
+        for i in range(n)
+    ]
@@ -0,0 +1,364 @@
+"""
+Import and export of tournaments in the FIDE Tournament Report File format (TRF-16).
+
+A TRF file is line oriented: each line starts with a three character record code. The records
+used here are:
+
+    012  tournament name            042  start date (YYYY/MM/DD)     052  end date
+    XXR  number of rounds (a common extension; otherwise the longest player record decides)
+    001  one player: starting rank, name, rating, federation, FIDE id, birth date, points, rank
+         and one 10 character block per round: opponent's starting rank, color (w/b/-), result.
+
+Result codes: 1/0/= (won, lost, drawn), +/- (won or lost by forfeit), W/D/L (unrated game),
+F/U (full point bye), H (half point bye) and Z (zero point bye); blank means not played yet. A bye
+in this project is a match without a black player won by white, so only full point byes are stored;
+half and zero point byes are counted and skipped.
+
+The parser reads any iterable of lines (such as an open file) one line at a time, and keeps only
+the compact per-player records, never the file.
+
+Functions:
+    parse_trf(lines): Parses a TRF file into a dict with the tournament fields and the players.
+    import_trf(lines): Creates a tournament from a TRF file with bulk inserts in one transaction.
+    export_trf(tournament_id): Yields the lines of the TRF file of a tournament.
+"""
+
+from datetime import datetime
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django_countries.ioc_data import IOC_TO_ISO, ISO_TO_IOC
+
+from users.models import Player
+from .events import append_results
+from .models import Match, Participant, Round, Tournament
+from .services import update_standings
+from .standings import compute_standings, game_points, write_snapshot
+from .tiebreaks import leaderboard_ordering
+
+# Points of the player whose line holds the result code; None means the game is not finished.
+GAME_POINTS = {'1': 1.0, '+': 1.0, 'W': 1.0, '0': 0.0, '-': 0.0, 'L': 0.0, '=': 0.5, 'D': 0.5, ' ': None}
+FULL_POINT_BYES = {'F', 'U', '+'}
+OTHER_BYES = {'H', 'Z', '-', ' '}
+
+DATE_FORMATS = ('%Y/%m/%d', '%Y-%m-%d', '%Y.%m.%d', '%d.%m.%Y', '%d/%m/%Y')
+ROUND_START, ROUND_WIDTH = 91, 10
+MAX_ROUNDS = 11
+
+
+def _date(text):
+    text = text.strip()
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _number(text, cast=int):
+    text = text.strip()
+    return cast(text) if text else None
+
+
+def _player(line, number):
+    """Parse one 001 record into a dict, with the games as (round, opponent_rank, color, result)."""
+    try:
+        record = {
+            'rank': int(line[4:8]),
+            'sex': line[9:10].strip(),
+            'title': line[10:13].strip(),
+            'name': line[14:47].strip(),
+            'rating': _number(line[48:52]),
+            'federation': line[53:56].strip(),
+            'fide_id': line[57:68].strip(),
+            'birthdate': _date(line[69:79]),
+            'points': _number(line[80:84], float),
+            'games': [],
+        }
+    except ValueError as error:
+        raise ValueError(f"Line {number}: malformed player record ({error}).")
+
+    for index, start in enumerate(range(ROUND_START, len(line), ROUND_WIDTH), start=1):
+        block = line[start:start + ROUND_WIDTH - 2].ljust(ROUND_WIDTH - 2)
+        opponent, color, result = block[0:4].strip(), block[5], block[7].upper()
+        if not opponent and result == ' ':
+            continue
+        if result not in GAME_POINTS and result not in FULL_POINT_BYES | OTHER_BYES:
+            raise ValueError(f"Line {number}: unknown result code '{result}' in round {index}.")
+        try:
+            opponent = int(opponent) if opponent else 0
+        except ValueError:
+            raise ValueError(f"Line {number}: malformed opponent in round {index}.")
+        record['games'].append((index, opponent, color.lower(), result))
+    return record
+
+
+def parse_trf(lines):
+    """
+    Parse a TRF file.
+
+    Args:
+        lines (iterable): Lines of the file, str or bytes (decoded as UTF-8).
+
+    Returns:
+        dict: name, start_date, end_date, num_of_rounds and players (a list of dicts, see `_player`).
+
+    Raises:
+        ValueError: If a player record is malformed or two players share a starting rank.
+    """
+    tournament = {'name': '', 'start_date': None, 'end_date': None, 'num_of_rounds': None, 'players': []}
+    ranks = set()
+    for number, line in enumerate(lines, start=1):
+        if isinstance(line, bytes):
+            line = line.decode('utf-8', errors='replace')
+        line = line.rstrip('\r\n')
+        code = line[:3]
+        if code == '001':
+            player = _player(line, number)
+            if player['rank'] in ranks:
+                raise ValueError(f"Line {number}: starting rank {player['rank']} appears twice.")
+            ranks.add(player['rank'])
+            tournament['players'].append(player)
+        elif code == '012':
+            tournament['name'] = line[4:].strip()
+        elif code == '042':
+            tournament['start_date'] = _date(line[4:])
+        elif code == '052':
+            tournament['end_date'] = _date(line[4:])
+        elif code == 'XXR':
+            tournament['num_of_rounds'] = _number(line[4:])
+    longest = max((game[0] for player in tournament['players'] for game in player['games']), default=1)
+    tournament['num_of_rounds'] = max(tournament['num_of_rounds'] or 1, longest)
+    return tournament
+
+
+def _games(players):
+    """
+    Deduplicate the games of the player records: every game appears on both players' lines.
+
+    Returns:
+        tuple: (games, skipped_byes) where games maps (round, white_rank, black_rank) to white's
+            points (None if not played yet); black_rank is None for a full point bye.
+    """
+    games, skipped = {}, 0
+    for player in players:
+        rank = player['rank']
+        for round_number, opponent, color, result in player['games']:
+            if not opponent:
+                if result in FULL_POINT_BYES:
+                    games[(round_number, rank, None)] = 1.0
+                else:
+                    skipped += 1
+                continue
+            points = GAME_POINTS.get(result)
+            if color == 'b' or (color not in ('w', 'b') and opponent < rank):
+                white, black, points = opponent, rank, None if points is None else 1 - points
+            else:
+                white, black = rank, opponent
+            games.setdefault((round_number, white, black), points)
+    return games, skipped
+
+
+def _name(name, fallback):
+    last, _, first = name.partition(',')
+    return first.strip()[:150], last.strip()[:150] or fallback
+
+
+def import_trf(lines, batch_size=5000):
+    """
+    Create a tournament with its participants, rounds, matches and standings from a TRF file.
+
+    Players are matched to users named `fide<FIDE id>`. Missing users are created with an unusable
+    password and the name, rating, federation and birth date of the file; players without a FIDE id
+    always get a new user. Everything is written with bulk inserts in one transaction. Rounds with
+    at least one result are closed, with their standings snapshot, and marked as rated, since the
+    file carries the official ratings.
+
+    Returns:
+        dict: Summary with the tournament id and the number of participants, matches and skipped byes.
+
+    Raises:
+        ValueError: If the file is malformed, has no players, or has more rounds than allowed.
+    """
+    data = parse_trf(lines)
+    players = data['players']
+    if not players:
+        raise ValueError("The file contains no player records.")
+    if data['num_of_rounds'] > MAX_ROUNDS:
+        raise ValueError(f"A tournament can have at most {MAX_ROUNDS} rounds.")
+    ranks = {player['rank'] for player in players}
+    fide_ids = [player['fide_id'] for player in players if player['fide_id']]
+    if len(set(fide_ids)) != len(fide_ids):
+        raise ValueError("A FIDE id appears on more than one player record.")
+    games, skipped = _games(players)
+    unknown = {rank for _, white, black in games for rank in (white, black) if rank is not None} - ranks
+    if unknown:
+        raise ValueError(f"Games refer to unknown starting ranks: {', '.join(map(str, sorted(unknown)))}.")
+
+    now = timezone.now()
+    with transaction.atomic():
+        tournament = Tournament.objects.create(
+            name=(data['name'] or 'Imported tournament')[:100],
+            start_date=data['start_date'] or now.date(),
+            end_date=data['end_date'] or data['start_date'] or now.date(),
+            num_of_rounds=data['num_of_rounds'],
+            registration_closed_at=now,
+        )
+
+        usernames = {
+            player['rank']: f"fide{player['fide_id']}" if player['fide_id'] else f"trf{tournament.id}-{player['rank']}"
+            for player in players
+        }
+        user_ids = dict(User.objects.filter(username__in=usernames.values()).values_list('username', 'id'))
+        password = make_password(None)
+        users = User.objects.bulk_create([
+            User(username=usernames[player['rank']], password=password,
+                 **dict(zip(('first_name', 'last_name'), _name(player['name'], usernames[player['rank']]))))
+            for player in players if usernames[player['rank']] not in user_ids
+        ], batch_size=batch_size)
+        user_ids.update((user.username, user.id) for user in users)
+
+        player_ids = dict(Player.objects.filter(user_id__in=user_ids.values()).values_list('user_id', 'id'))
+        created = Player.objects.bulk_create([
+            Player(
+                user_id=user_ids[usernames[player['rank']]],
+                rating=None if player['rating'] is None else min(max(player['rating'], 0), 3000),
+                country=IOC_TO_ISO.get(player['federation']) or None,
+                birthdate=player['birthdate'],
+            )
+            for player in players if user_ids[usernames[player['rank']]] not in player_ids
+        ], batch_size=batch_size)
+        player_ids.update((player.user_id, player.id) for player in created)
+
+        participants = Participant.objects.bulk_create([
+            Participant(tournament=tournament, player_id=player_ids[user_ids[usernames[player['rank']]]],
+                        seed=player['rank'])
+            for player in players
+        ], batch_size=batch_size)
+        participant_ids = {participant.seed: participant.id for participant in participants}
+
+        closed = {round_number for (round_number, _, _), points in games.items() if points is not None}
+        rounds = Round.objects.bulk_create([
+            Round(tournament=tournament, round_number=number,
+                  closed_at=now if number in closed else None, rated_at=now if number in closed else None)
+            for number in range(1, data['num_of_rounds'] + 1)
+        ])
+        round_ids = {round_obj.round_number: round_obj.id for round_obj in rounds}
+
+        matches = []
+        ordered = sorted(games.items(), key=lambda item: item[0][:2])
+        for (round_number, white, black), points in ordered:
+            white_id = participant_ids[white]
+            black_id = None if black is None else participant_ids[black]
+            matches.append(Match(
+                tournament=tournament,
+                round_id=round_ids[round_number],
+                white_id=white_id,
+                black_id=black_id,
+                draw=points == 0.5,
+                winner_id=white_id if points == 1 else black_id if points == 0 else None,
+            ))
+        Match.objects.bulk_create(matches, batch_size=batch_size)
+        append_results(tournament.id, [
+            (match.id, round_number, match.white_id, match.black_id, points)
+            for match, ((round_number, _, _), points) in zip(matches, ordered) if points is not None
+        ])
+
+        seeds = {pid: seed for seed, pid in participant_ids.items()}
+        finished = [
+            (participant_ids[white], None if black is None else participant_ids[black], points, round_number)
+            for (round_number, white, black), points in games.items() if points is not None
+        ]
+        chain = tournament.tiebreak_chain()
+        standings = []
+        for number in sorted(closed):
+            standings = compute_standings(seeds, [game for game in finished if game[3] <= number], chain, seeds)
+            write_snapshot(tournament.id, number, standings)
+        if standings:
+            update_standings(standings)
+
+    return {
+        'tournament': tournament.id,
+        'participants': len(participants),
+        'players_created': len(created),
+        'matches': len(matches),
+        'skipped_byes': skipped,
+    }
+
+
+def _points(value):
+    return f"{value:4.1f}"
+
+
+def _result(points, bye=False):
+    if bye:
+        return 'U'
+    return {1.0: '1', 0.5: '=', 0.0: '0'}.get(points, ' ')
+
+
+def export_trf(tournament_id):
+    """
+    Yield the lines (without line breaks) of the TRF file of a tournament.
+
+    Starting ranks follow the seeds (unseeded participants last, by id), and the final rank follows
+    the current standings. Participants are streamed in seed order; the games, which every line
+    needs, are loaded once with a single query.
+
+    Raises:
+        Tournament.DoesNotExist: If the tournament does not exist.
+    """
+    tournament = Tournament.objects.get(id=tournament_id)
+    participants = Participant.objects.filter(tournament_id=tournament_id)
+    starting = {
+        pid: rank for rank, pid in enumerate(
+            participants.order_by(F('seed').asc(nulls_last=True), 'id').values_list('id', flat=True), start=1
+        )
+    }
+    final = {
+        pid: rank for rank, pid in enumerate(
+            participants.order_by(*leaderboard_ordering(tournament.tiebreak_chain())).values_list('id', flat=True),
+            start=1,
+        )
+    }
+
+    rounds = dict(Round.objects.filter(tournament_id=tournament_id).values_list('id', 'round_number'))
+    blocks = {pid: {} for pid in starting}
+    played = 0
+    matches = Match.objects.filter(tournament_id=tournament_id).values_list(
+        'round_id', 'white_id', 'black_id', 'winner_id', 'draw'
+    )
+    for round_id, white_id, black_id, winner_id, draw in matches.iterator(chunk_size=5000):
+        number = rounds[round_id]
+        played = max(played, number)
+        points = game_points(white_id, black_id, winner_id, draw)
+        if black_id is None:
+            blocks[white_id][number] = f"0000 - {_result(points, bye=True)}"
+            continue
+        blocks[white_id][number] = f"{starting[black_id]:04d} w {_result(points)}"
+        blocks[black_id][number] = f"{starting[white_id]:04d} b {_result(None if points is None else 1 - points)}"
+
+    yield f"012 {tournament.name}"
+    yield f"042 {tournament.start_date:%Y/%m/%d}"
+    yield f"052 {tournament.end_date:%Y/%m/%d}"
+    yield f"062 {len(starting)}"
+    yield f"XXR {tournament.num_of_rounds}"
+
+    rows = (
+        participants.order_by(F('seed').asc(nulls_last=True), 'id')
+        .values_list('id', 'score', 'player__rating', 'player__country', 'player__birthdate',
+                     'player__user__username', 'player__user__first_name', 'player__user__last_name')
+    )
+    for pid, score, rating, country, birthdate, username, first_name, last_name in rows.iterator(chunk_size=2000):
+        name = f"{last_name}, {first_name}" if last_name or first_name else username
+        fide_id = username[4:] if username.startswith('fide') and username[4:].isdigit() else ''
+        line = (
+            f"001 {starting[pid]:>4}      {name[:33]:<33} {'' if rating is None else rating:>4} "
+            f"{ISO_TO_IOC.get(country or '', ''):>3} "
+            f"{fide_id:>11} {birthdate.strftime('%Y/%m/%d') if birthdate else '':>10} {_points(score)} {final[pid]:>4}"
+        )
+        games = blocks[pid]
+        yield line + "".join(f"  {games.get(number, '0000 - Z')}" for number in range(1, played + 1))
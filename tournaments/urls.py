@@ -7,9 +7,20 @@ Additional paths are defined for listing participants of a specific tournament a
 
 Routes:
     - '' (root): Includes all routes registered with the DefaultRouter.
+    - 'tournaments/<int:pk>/generate-pairings/': Runs all remaining rounds of a tournament (router action).
+    - 'tournaments/<int:pk>/export-standings/': Queues a CSV export of the standings (router action).
+    - 'tournaments/<int:pk>/schedule-round-robin/': Pairs every round of a round-robin up front (router action).
+    - 'tournaments/import-trf/': Creates a tournament from an uploaded TRF file (router action).
+    - 'tournaments/<int:pk>/export-trf/': Streams the tournament as a TRF file (router action).
     - 'tournaments/<int:pk>/participants/': Lists all participants for a specific tournament (specified by ID).
+    - 'tournaments/<int:pk>/standings/': Leaderboard after a round (`?round=<n>`, default: latest closed round).
+    - 'tournaments/<int:pk>/dump/': Streams the whole tournament as NDJSON (participants, rounds and matches).
+    - 'tournaments/<int:pk>/events/': The result log of a tournament, oldest event first (`?match=<id>`).
+    - 'tournaments/<int:pk>/forecast/': Win probabilities of the participants, from cached simulations.
+    - 'tournaments/<int:pk>/arena/': Joins, leaves and plays in the lobby of an arena tournament.
     - 'participants/create/': Creates a new participant.
     - 'participants/<int:pk>/': Retrieves, updates, partially updates, or deletes a specific participant (specified by ID).
+    - 'matches/<int:pk>/result/': Records or corrects the result of a match (specified by ID).
 
 Attributes:
     router (DefaultRouter): The router instance used to register the TournamentViewSet routes.
@@ -20,7 +31,17 @@ Attributes:
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
-from .views import TournamentViewSet, ParticipantViewSet, TournamentParticipantsListView
+from .views import (
+    TournamentViewSet,
+    ParticipantViewSet,
+    TournamentParticipantsListView,
+    TournamentStandingsListView,
+    TournamentDumpView,
+    TournamentForecastView,
+    TournamentResultEventsView,
+    ArenaView,
+    MatchResultView
+)
 
 
 router = DefaultRouter()
@@ -31,9 +52,17 @@ urlpatterns = [
     # Tournaments
     path('', include(router.urls)),
     path('tournaments/<int:pk>/participants/', TournamentParticipantsListView.as_view(), name="tournament-participants"),
+    path('tournaments/<int:pk>/standings/', TournamentStandingsListView.as_view(), name="tournament-standings"),
+    path('tournaments/<int:pk>/dump/', TournamentDumpView.as_view(), name="tournament-dump"),
+    path('tournaments/<int:pk>/events/', TournamentResultEventsView.as_view(), name="tournament-events"),
+    path('tournaments/<int:pk>/forecast/', TournamentForecastView.as_view(), name="tournament-forecast"),
+    path('tournaments/<int:pk>/arena/', ArenaView.as_view(), name="tournament-arena"),
 
     # Participants
     path('participants/create/', ParticipantViewSet.as_view({'post': 'create'}), name='participant-create'),
     path('participants/<int:pk>/', ParticipantViewSet.as_view({'get': 'retrieve', 'put': 'update', 'patch': 'partial_update', 'delete': 'destroy'}), name='participant-detail'),
     # path('participants', ParticipantViewSet.as_view({'get': 'list'}), name='participant-list'),
+
+    # Matches
+    path('matches/<int:pk>/result/', MatchResultView.as_view(), name='match-result'),
 ]
\ No newline at end of file
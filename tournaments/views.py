@@ -1,15 +1,41 @@
-from rest_framework import generics
+from rest_framework import generics, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
 from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework.pagination import PageNumberPagination
 from rest_framework import viewsets
+from rest_framework.renderers import JSONRenderer
+from rest_framework.exceptions import APIException, ValidationError
 
-from .models import Tournament, Round, Participant, Match
+from django.http import Http404, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_vary_headers
+
+from .models import Tournament, Round, Participant, Match, StandingSnapshot, TournamentArchive, ResultEvent
 from .serializers import (
     TournamentSerializer,
     ParticipantSerializer,
-    TournamentParticipantSerializer
+    TournamentParticipantSerializer,
+    StandingSnapshotSerializer,
+    MatchSerializer,
+    MatchResultSerializer,
+    ResultEventSerializer
+)
+from .services import (
+    run_tournament, pair_next_round, record_result, close_registration, schedule_round_robin, delete_tournament,
+    RESULT_POINTS
 )
+from .tiebreaks import leaderboard_ordering
+from .idempotency import idempotent
+from .etags import conditional
+from .dump import NDJSON_CONTENT_TYPE, NDJSONRenderer, dump_tournament, gzip_chunks
+from .trf import export_trf, import_trf
+from .forecast import cached_forecast
+from .arena import get_arena
+from .archive import archived_dump, archived_tournament, ranked_participants
+from jobs.queue import enqueue
+from jobs.views import job_accepted
 
 
 class TournamentPagination(PageNumberPagination):
@@ -40,6 +66,26 @@ class ParticipantPagination(PageNumberPagination):
     max_page_size = 50
 
 
+class ResultEventPagination(PageNumberPagination):
+    """
+    ResultEventPagination handles pagination for the result log view.
+
+    Attributes:
+    - page_size_query_param: The query parameter name for the page size.
+    - page_size: The default number of items per page.
+    - max_page_size: The maximum number of items per page.
+    """
+    page_size_query_param = 'size'
+    page_size = 50
+    max_page_size = 500
+
+
+class TournamentArchived(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "The tournament is archived. Restore it with `manage.py archive_tournaments --restore` first."
+    default_code = 'archived'
+
+
 class TournamentViewSet(viewsets.ModelViewSet):
     """
     A viewset for viewing and editing tournament instances.
@@ -59,21 +105,162 @@ class TournamentViewSet(viewsets.ModelViewSet):
 
         perform_update(self, serializer): Handles the updating of an existing tournament instance. It is
             called after the serializer has validated the incoming data. The method saves the serializer
-            to update the existing tournament in the database.
+            to update the existing tournament in the database and bumps its version.
+
+        retrieve(self, request, pk): Returns the tournament with a strong ETag; a request whose
+            `If-None-Match` holds the current ETag gets 304 Not Modified.
+
+        destroy(self, request, pk): Deletes the tournament and everything in it with chunked
+            set-based DELETEs. With `?async=true` the deletion is queued as a background job instead.
+
+        generate_pairings(self, request, pk): Pairs, plays and records every remaining round of the
+            tournament on the server and returns a summary. With `?async=true` the work is queued as
+            a background job instead.
+
+        export_standings(self, request, pk): Queues a background job rendering the standings as CSV.
+
+        pair_round(self, request, pk): Pairs and plays only the next round. Concurrent requests for
+            the same round pair it once; the others get 409 Conflict.
+
+        close_registration(self, request, pk): Seeds the participants by rating. Running the
+            tournament does this automatically if it has not been done yet.
+
+        schedule_round_robin(self, request, pk): Pairs every round of a round-robin tournament up
+            front. Running the tournament does this automatically if it has not been done yet.
+
+        import_trf(self, request): Creates a tournament from an uploaded TRF file.
+
+        export_trf(self, request, pk): Streams the tournament as a TRF file.
+
+    Archived tournaments can be retrieved and deleted; every other action on them answers 409 Conflict.
     """
     queryset = Tournament.objects.all().order_by('id')
     serializer_class = TournamentSerializer
     permission_classes = [IsAdminUser]
     authentication_classes = [JWTAuthentication]
     pagination_class = TournamentPagination
+    archive_actions = ('retrieve', 'destroy')
+
+    def get_object(self):
+        """Return the tournament, refusing actions that need the rows of an archived tournament."""
+        tournament = super().get_object()
+        if self.action not in self.archive_actions and TournamentArchive.objects.filter(tournament_id=tournament.id).exists():
+            raise TournamentArchived()
+        return tournament
 
     def perform_create(self, serializer):
         """Save the serializer to create a new tournament."""
         serializer.save()
 
     def perform_update(self, serializer):
-        """Save the serializer to update an existing tournament."""
-        serializer.save()
+        """Save the serializer to update an existing tournament and bump its version."""
+        tournament = serializer.save()
+        Tournament.bump_version(tournament.id)
+        tournament.refresh_from_db(fields=Tournament.STAMP_FIELDS)
+
+    @conditional
+    def retrieve(self, request, *args, **kwargs):
+        """Return the tournament, or 304 Not Modified if the client's copy is current."""
+        return super().retrieve(request, *args, **kwargs)
+
+    def destroy(self, request, *args, **kwargs):
+        """
+        Delete the tournament without loading its participants, rounds and matches (see
+        `services.delete_tournament`). With `?async=true` the deletion runs as a background job.
+        """
+        tournament = self.get_object()
+        if request.query_params.get('async') in ('1', 'true'):
+            job = enqueue('delete_tournament', user=request.user, tournament_id=tournament.id)
+            return job_accepted(request, job)
+        delete_tournament(tournament.id)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=True, methods=['post'], url_path='generate-pairings')
+    def generate_pairings(self, request, pk=None):
+        """
+        Run all remaining rounds of the tournament: pair participants, simulate the results and
+        update the standings round by round.
+        """
+        tournament = self.get_object()
+        if request.query_params.get('async') in ('1', 'true'):
+            job = enqueue('run_tournament', user=request.user, tournament_id=tournament.id)
+            return job_accepted(request, job)
+        summary = run_tournament(tournament.id)
+        return Response(summary, status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=['post'], url_path='pair-round')
+    @idempotent
+    def pair_round(self, request, pk=None):
+        """
+        Pair, play and record the next round of the tournament. With `?async=true` the work is
+        queued as a background job instead. A retry with the same `Idempotency-Key` header returns
+        the first response instead of pairing another round.
+        """
+        tournament = self.get_object()
+        if request.query_params.get('async') in ('1', 'true'):
+            job = enqueue('pair_round', user=request.user, tournament_id=tournament.id)
+            return job_accepted(request, job)
+        summary = pair_next_round(tournament.id)
+        if summary is None:
+            return Response({'error': "No round left to pair, or the round was paired concurrently."},
+                            status=status.HTTP_409_CONFLICT)
+        return Response(summary, status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=['post'], url_path='close-registration')
+    def close_registration(self, request, pk=None):
+        """Close the registration and seed participants by rating for the first-round pairing."""
+        tournament = self.get_object()
+        seeded = close_registration(tournament.id)
+        tournament.refresh_from_db(fields=['registration_closed_at'])
+        return Response({
+            'seeded': seeded,
+            'registration_closed_at': tournament.registration_closed_at,
+        }, status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=['post'], url_path='schedule-round-robin')
+    def schedule_round_robin(self, request, pk=None):
+        """
+        Generate the complete Berger schedule of a round-robin tournament: every round and match,
+        without results, written in one bulk insert.
+        """
+        tournament = self.get_object()
+        try:
+            summary = schedule_round_robin(tournament.id)
+        except ValueError as error:
+            return Response({'error': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(summary, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['post'], url_path='import-trf')
+    def import_trf(self, request):
+        """
+        Create a tournament with its participants, rounds and matches from the TRF file uploaded as
+        `file`. The file is parsed line by line and written in one transaction.
+        """
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': "Upload a TRF file as 'file'."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            summary = import_trf(upload)
+        except ValueError as error:
+            return Response({'error': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(summary, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['get'], url_path='export-trf')
+    def export_trf(self, request, pk=None):
+        """Stream the tournament as a FIDE Tournament Report File."""
+        tournament = self.get_object()
+        response = StreamingHttpResponse(
+            (f"{line}\n".encode() for line in export_trf(tournament.id)), content_type='text/plain; charset=utf-8'
+        )
+        response['Content-Disposition'] = f'attachment; filename="tournament-{tournament.id}.trf"'
+        return response
+
+    @action(detail=True, methods=['post'], url_path='export-standings')
+    def export_standings(self, request, pk=None):
+        """Queue a background job exporting the tournament standings as CSV; poll the returned job."""
+        tournament = self.get_object()
+        job = enqueue('export_standings', user=request.user, tournament_id=tournament.id)
+        return job_accepted(request, job)
 
 
 class ParticipantViewSet(viewsets.ModelViewSet):
@@ -97,12 +284,21 @@ class ParticipantViewSet(viewsets.ModelViewSet):
     pagination_class = ParticipantPagination
 
     def perform_create(self, serializer):
-        """Save the serializer to create a new participant."""
-        serializer.save()
+        """Save the serializer to create a new participant and bump its tournament's version."""
+        participant = serializer.save()
+        Tournament.bump_version(participant.tournament_id)
 
     def perform_update(self, serializer):
-        """Save the serializer to update an existing participant."""
-        serializer.save()
+        """Save the serializer to update an existing participant and bump its tournaments' versions."""
+        previous_tournament_id = serializer.instance.tournament_id
+        participant = serializer.save()
+        Tournament.bump_version(previous_tournament_id, participant.tournament_id)
+
+    def perform_destroy(self, instance):
+        """Delete the participant and bump its tournament's version."""
+        tournament_id = instance.tournament_id
+        instance.delete()
+        Tournament.bump_version(tournament_id)
 
 
 class TournamentParticipantsListView(generics.ListAPIView):
@@ -110,6 +306,10 @@ class TournamentParticipantsListView(generics.ListAPIView):
     A view that returns a list of participants for a specific tournament.
 
     This view provides a `list` action to retrieve participants of a tournament specified by the tournament ID (pk) in the URL.
+    With `?ordering=rank` participants are ordered by score and the tournament's tiebreak chain instead of by ID.
+    Responses carry a strong ETag derived from the tournament's version; a request sending the current
+    ETag in `If-None-Match` gets 304 Not Modified without any participant query.
+    Archived tournaments are served from their archive, already serialized.
     Only authenticated users are allowed to access this view. Authentication is handled by JWT.
 
     Attributes:
@@ -123,9 +323,319 @@ class TournamentParticipantsListView(generics.ListAPIView):
     authentication_classes = [JWTAuthentication]
     permission_classes = [IsAuthenticated]
 
+    @conditional
+    def list(self, request, *args, **kwargs):
+        archive = archived_tournament(self.kwargs['pk'])
+        if archive is None:
+            return super().list(request, *args, **kwargs)
+        rows = archive['participants']
+        if self.request.query_params.get('ordering') == 'rank':
+            tournament = Tournament.objects.only('tiebreaks').get(id=self.kwargs['pk'])
+            rows = ranked_participants(archive, tournament.tiebreak_chain())
+        return self.get_paginated_response(self.paginate_queryset(rows))
+
     def get_queryset(self):
         """
         This view returns a list of all participants for a tournament as specified by the tournament ID (pk) in the URL.
         """
         tournament_id = self.kwargs['pk']
-        return Participant.objects.filter(tournament_id=tournament_id).select_related('player__user').order_by('id')
+        ordering = ['id']
+        if self.request.query_params.get('ordering') == 'rank':
+            tournament = Tournament.objects.filter(id=tournament_id).only('tiebreaks').first()
+            if tournament is not None:
+                ordering = leaderboard_ordering(tournament.tiebreak_chain())
+        return Participant.objects.filter(tournament_id=tournament_id).select_related('player__user').order_by(*ordering)
+
+
+
+class TournamentStandingsListView(generics.ListAPIView):
+    """
+    A view that returns the leaderboard of a tournament after a given round.
+
+    The round is chosen with the `round` query parameter and defaults to the latest closed round.
+    Rows come from the snapshot written when the round closed, so any historical leaderboard page is
+    a single indexed range query. Like the participant list, responses are tagged with the tournament's
+    ETag and revalidated with `If-None-Match`, and archived tournaments are served from their archive.
+
+    Attributes:
+        serializer_class (Serializer): The serializer class used for the snapshot rows.
+        pagination_class (class): The pagination class used for this view.
+        authentication_classes (list): The list of authentication classes used for this view.
+        permission_classes (list): The list of permission classes that determine access to this view.
+    """
+    serializer_class = StandingSnapshotSerializer
+    pagination_class = ParticipantPagination
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    @conditional
+    def list(self, request, *args, **kwargs):
+        archive = archived_tournament(self.kwargs['pk'])
+        if archive is None:
+            return super().list(request, *args, **kwargs)
+        rows = archive['standings'].get(str(self.get_round_number(archive)), [])
+        return self.get_paginated_response(self.paginate_queryset(rows))
+
+    def get_round_number(self, archive=None):
+        round_number = self.request.query_params.get('round')
+        if round_number is not None:
+            try:
+                return int(round_number)
+            except ValueError:
+                raise Http404("Invalid round.")
+        if archive is not None:
+            if not archive['standings']:
+                raise Http404("No round of this tournament has been closed yet.")
+            return max(int(number) for number in archive['standings'])
+        latest = (
+            Round.objects.filter(tournament_id=self.kwargs['pk'], closed_at__isnull=False)
+            .order_by('-round_number')
+            .values_list('round_number', flat=True)
+            .first()
+        )
+        if latest is None:
+            raise Http404("No round of this tournament has been closed yet.")
+        return latest
+
+    def get_queryset(self):
+        """
+        This view returns the snapshot rows of one round, ordered by rank.
+        """
+        return (
+            StandingSnapshot.objects.filter(tournament_id=self.kwargs['pk'], round_number=self.get_round_number())
+            .select_related('participant__player__user')
+            .order_by('rank')
+        )
+
+
+class TournamentResultEventsView(generics.ListAPIView):
+    """
+    A view that returns the result log of a tournament, oldest event first. Only accessible by admin users.
+
+    Every result written to a match appears as a `set`, `corrected` or `forfeit` event, so the log
+    is the audit trail of the standings. `?match=<id>` narrows it to one match. Archived
+    tournaments are served from their archive.
+
+    Attributes:
+        serializer_class (Serializer): The serializer class used for the events.
+        pagination_class (class): The pagination class used for this view.
+        authentication_classes (list): The list of authentication classes used for this view.
+        permission_classes (list): The list of permission classes that determine access to this view.
+    """
+    serializer_class = ResultEventSerializer
+    pagination_class = ResultEventPagination
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAdminUser]
+
+    def list(self, request, *args, **kwargs):
+        archive = archived_tournament(self.kwargs['pk'])
+        if archive is None:
+            return super().list(request, *args, **kwargs)
+        rows = archive.get('events', [])
+        match_id = self.get_match_id()
+        if match_id is not None:
+            rows = [row for row in rows if row['match_id'] == match_id]
+        return self.get_paginated_response(self.paginate_queryset(rows))
+
+    def get_match_id(self):
+        match_id = self.request.query_params.get('match')
+        if match_id is None:
+            return None
+        try:
+            return int(match_id)
+        except ValueError:
+            raise Http404("Invalid match.")
+
+    def get_queryset(self):
+        """
+        This view returns the events of the tournament, in the order they were appended.
+        """
+        events = ResultEvent.objects.filter(tournament_id=self.kwargs['pk'])
+        match_id = self.get_match_id()
+        if match_id is not None:
+            events = events.filter(match_id=match_id)
+        return events.order_by('id')
+
+
+class MatchResultView(generics.GenericAPIView):
+    """
+    A view that records or corrects the result of a match. Only accessible by admin users.
+
+    The result is appended to the tournament's result log, as a forfeit with `"forfeit": true`.
+    Standings and tiebreaks of the two players and their opponents are updated incrementally.
+    Submitting the same result again leaves everything unchanged. Clients that retry should send an
+    `Idempotency-Key` header: a retry then gets the stored response without touching any row.
+
+    Attributes:
+        queryset (QuerySet): The matches whose result can be recorded.
+        serializer_class (Serializer): The serializer validating the submitted result.
+        authentication_classes (list): The list of authentication classes used for this view.
+        permission_classes (list): The list of permission classes that determine access to this view.
+    """
+    queryset = Match.objects.all()
+    serializer_class = MatchResultSerializer
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAdminUser]
+
+    @idempotent
+    def post(self, request, *args, **kwargs):
+        """
+        Record the result of the match given by its ID (pk) in the URL.
+
+        Returns:
+            Response: The updated match.
+        """
+        match = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            match = record_result(match.id, RESULT_POINTS[serializer.validated_data['result']],
+                                  forfeit=serializer.validated_data['forfeit'], user=request.user)
+        except ValueError as error:
+            return Response({'error': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(MatchSerializer(match).data, status=status.HTTP_200_OK)
+
+
+class TournamentDumpView(generics.GenericAPIView):
+    """
+    A view that streams a whole tournament as NDJSON: one `tournament` line, then every participant,
+    round and match, one JSON object per line.
+
+    Rows are rendered by PostgreSQL and read through server-side cursors, and the response is a
+    `StreamingHttpResponse`, so memory stays constant for tournaments of any size. Clients sending
+    `Accept-Encoding: gzip` get a gzip compressed stream. Like the participant list, the response is
+    tagged with the tournament's ETag and revalidated with `If-None-Match`, and archived tournaments
+    are served from their archive.
+
+    Attributes:
+        authentication_classes (list): The list of authentication classes used for this view.
+        permission_classes (list): The list of permission classes that determine access to this view.
+        renderer_classes (list): Renderers for error responses; the dump itself is streamed as is.
+    """
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [NDJSONRenderer, JSONRenderer]
+
+    @conditional
+    def get(self, request, pk, *args, **kwargs):
+        """
+        Stream the dump of the tournament given by its ID (pk) in the URL.
+
+        Returns:
+            StreamingHttpResponse: The NDJSON stream, gzip compressed if the client accepts it.
+        """
+        get_object_or_404(Tournament.objects.only('id'), pk=pk)
+        archive = archived_tournament(pk)
+        chunks = dump_tournament(pk) if archive is None else archived_dump(pk, archive)
+        gzip = 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+        response = StreamingHttpResponse(gzip_chunks(chunks) if gzip else chunks, content_type=NDJSON_CONTENT_TYPE)
+        if gzip:
+            response['Content-Encoding'] = 'gzip'
+        patch_vary_headers(response, ['Accept-Encoding'])
+        response['Content-Disposition'] = f'inline; filename="tournament-{pk}.ndjson"'
+        return response
+
+
+class TournamentForecastView(generics.GenericAPIView):
+    """
+    A view that returns the win probabilities of the participants of a tournament.
+
+    Forecasts come from Monte Carlo simulations of the rest of the tournament (see `forecast.py`),
+    run by a background job and cached per tournament version, so a request costs a version lookup
+    and a cache hit. After a result is recorded, the previous forecast is returned with
+    `"stale": true` while a single recomputation is queued; a tournament never forecast yet answers
+    202 Accepted with the queued job.
+
+    Attributes:
+        authentication_classes (list): The list of authentication classes used for this view.
+        permission_classes (list): The list of permission classes that determine access to this view.
+    """
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk, *args, **kwargs):
+        """
+        Retrieve the forecast of the tournament given by its ID (pk) in the URL.
+
+        Returns:
+            Response: The forecast with a `stale` flag, or 202 Accepted while the first one is computed.
+        """
+        try:
+            data, fresh, job = cached_forecast(pk, user=request.user)
+        except Tournament.DoesNotExist:
+            raise Http404
+        if data is None:
+            if job is not None:
+                return job_accepted(request, job)
+            return Response({'detail': "The forecast is being computed."}, status=status.HTTP_202_ACCEPTED)
+        return Response({**data, 'stale': not fresh}, status=status.HTTP_200_OK)
+
+
+class ArenaView(generics.GenericAPIView):
+    """
+    A view through which the participants of an arena tournament play: join the lobby, see their
+    current game, report its result and leave.
+
+    Pairing happens in memory (see `arena.py`): a participant who joins while an opponent is
+    waiting gets the match at once, and the match row is written shortly after in a batch.
+    A reported result counts once the opponent reports the same one, at once if the reporter
+    loses by it or is staff, and then puts both players back in the lobby.
+
+    Attributes:
+        serializer_class (Serializer): The serializer validating a reported result.
+        authentication_classes (list): The list of authentication classes used for this view.
+        permission_classes (list): The list of permission classes that determine access to this view.
+    """
+    serializer_class = MatchResultSerializer
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get_arena_participant(self, pk):
+        """The arena of the tournament and the requesting user's participant id in it."""
+        participant_id = (
+            Participant.objects.filter(tournament_id=pk, player__user=self.request.user)
+            .values_list('id', flat=True).first()
+        )
+        if participant_id is None:
+            raise Http404("You are not a participant of this tournament.")
+        try:
+            return get_arena(pk), participant_id
+        except ValueError as error:
+            raise ValidationError({'error': str(error)})
+
+    def get(self, request, pk, *args, **kwargs):
+        """Return the participant's status: 'playing' with the match, 'waiting' or 'away'."""
+        arena, participant_id = self.get_arena_participant(pk)
+        return Response(arena.status(participant_id), status=status.HTTP_200_OK)
+
+    def post(self, request, pk, *args, **kwargs):
+        """
+        Join the lobby, or, with `match` and `result` in the body, report the result of the
+        participant's current game. Once confirmed, both players go back to the lobby; until
+        then the status shows the claim.
+        """
+        arena, participant_id = self.get_arena_participant(pk)
+        if 'match' not in request.data:
+            return Response(arena.join(participant_id), status=status.HTTP_200_OK)
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        game = arena.status(participant_id)['match']
+        if game is None or str(game['id']) != str(request.data['match']):
+            return Response({'error': "This match is not your game in progress."}, status=status.HTTP_400_BAD_REQUEST)
+        white_points = RESULT_POINTS[serializer.validated_data['result']]
+        forfeit = serializer.validated_data['forfeit']
+        try:
+            if request.user.is_staff:
+                arena.finish(game['id'], white_points, forfeit=forfeit, user=request.user)
+            else:
+                arena.report(game['id'], participant_id, white_points, forfeit=forfeit, user=request.user)
+        except ValueError as error:
+            return Response({'error': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(arena.status(participant_id), status=status.HTTP_200_OK)
+
+    def delete(self, request, pk, *args, **kwargs):
+        """Leave the lobby. A game in progress still has to be finished."""
+        arena, participant_id = self.get_arena_participant(pk)
+        arena.leave(participant_id)
+        return Response(arena.status(participant_id), status=status.HTTP_200_OK)
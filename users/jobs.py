@@ -0,0 +1,12 @@
+"""
+Background job handlers of the users app, run by `manage.py runworker`.
+"""
+
+from jobs.queue import register
+
+from .services import import_players
+
+
+@register('import_players')
+def import_players_job(context, players):
+    return import_players(players, progress=context.progress)
@@ -0,0 +1,113 @@
+"""
+Benchmarks the player search of the players list on a large seeded table.
+
+Usage:
+    python manage.py bench_player_search --seed 1000000
+    python manage.py bench_player_search --repeat 20
+    python manage.py bench_player_search --cleanup
+
+Seeding generates users and players with one INSERT ... SELECT generate_series each, so a million
+players take well under a minute. Each query is timed as the players list runs it: a COUNT for the
+paginator plus the first page.
+"""
+
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from users.models import Player
+from users.services import search_players
+
+PREFIX = 'bench'
+# Names are built from three syllables each, which gives 27k distinct first and last names.
+SYLLABLES = ['ma', 'gnus', 'ka', 'ru', 'fa', 'bi', 'an', 'di', 'ng', 'li', 'ren', 'so', 'gi', 'le', 'von', 'ju',
+             'dit', 'ne', 'po', 'ar', 'za', 'mir', 'vi', 'sha', 'to', 'pa', 'vel', 'ro', 'kin', 'ta']
+COUNTRIES = ['NO', 'US', 'RU', 'CN', 'FR', 'IN', 'NL', 'AM', 'HU', 'DE', 'GB', 'ES', 'PL', 'UA', 'AZ']
+
+QUERIES = [
+    ('search username', {'search': f'{PREFIX}_12345'}),
+    ('search name prefix', {'search': 'magnu'}),
+    ('search first + last name', {'search': 'pozaro arkin'}),
+    ('country', {'country': 'NO'}),
+    ('rating range', {'rating_min': 2700, 'rating_max': 2710}),
+    ('country + rating, top rated', {'country': 'IN', 'rating_min': 2500, 'ordering': '-rating'}),
+    ('search + country', {'search': 'magnus', 'country': 'US'}),
+]
+
+
+class Command(BaseCommand):
+    help = "Seed a large player table and time the player search queries"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0, help="Number of players to add before timing.")
+        parser.add_argument('--repeat', type=int, default=10, help="Runs per query; the median is reported.")
+        parser.add_argument('--page-size', type=int, default=10)
+        parser.add_argument('--cleanup', action='store_true', help="Delete the seeded players and exit.")
+
+    def handle(self, *args, **options):
+        if options['cleanup']:
+            self.cleanup()
+            return
+        if options['seed']:
+            self.seed(options['seed'])
+
+        self.stdout.write(f"{Player.objects.count()} players")
+        for label, params in QUERIES:
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                players = search_players(**params)
+                count = players.count()
+                list(players[:options['page_size']])
+                timings.append((time.perf_counter() - started) * 1000)
+            self.stdout.write(
+                f"{label:<30} {count:>8} rows  median {statistics.median(timings):7.2f} ms  "
+                f"max {max(timings):7.2f} ms"
+            )
+
+    def seed(self, count):
+        started = time.perf_counter()
+        offset = User.objects.filter(username__startswith=f'{PREFIX}_').count()
+        users, players = User._meta.db_table, Player._meta.db_table
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {users} (username, first_name, last_name, email, password, is_superuser,
+                                     is_staff, is_active, date_joined)
+                SELECT %(prefix)s || '_' || i, initcap(s[1 + h %% n] || s[1 + h / n %% n] || s[1 + h / n / n %% n]),
+                       initcap(s[1 + h / 7 %% n] || s[1 + h / 11 %% n] || s[1 + h / 13 %% n]),
+                       '', '!', false, false, true, now()
+                FROM generate_series(%(start)s, %(stop)s) AS i,
+                     LATERAL (SELECT hashtext('name' || i) & 2147483647 AS h) AS hash,
+                     (SELECT %(syllables)s::text[] AS s, %(n)s AS n) AS syllables
+                """,
+                {'prefix': PREFIX, 'syllables': SYLLABLES, 'n': len(SYLLABLES), 'start': offset,
+                 'stop': offset + count - 1},
+            )
+            cursor.execute(
+                f"""
+                INSERT INTO {players} (user_id, rating, country)
+                SELECT u.id, (hashtext(u.username) & 2147483647) %% 3001,
+                       (%(countries)s::text[])[1 + (hashtext(u.username || 'c') & 2147483647) %% %(n)s]
+                FROM {users} AS u
+                LEFT JOIN {players} AS p ON p.user_id = u.id
+                WHERE u.username LIKE %(pattern)s AND p.id IS NULL
+                """,
+                {'countries': COUNTRIES, 'n': len(COUNTRIES), 'pattern': f'{PREFIX}\\_%'},
+            )
+            cursor.execute(f"ANALYZE {users}; ANALYZE {players}")
+        self.stdout.write(f"Seeded {count} players in {time.perf_counter() - started:.1f}s")
+
+    def cleanup(self):
+        users, players = User._meta.db_table, Player._meta.db_table
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {players} WHERE user_id IN (SELECT id FROM {users} WHERE username LIKE %s)",
+                [f'{PREFIX}\\_%'],
+            )
+            cursor.execute(f"DELETE FROM {users} WHERE username LIKE %s", [f'{PREFIX}\\_%'])
+            deleted = cursor.rowcount
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} seeded players"))
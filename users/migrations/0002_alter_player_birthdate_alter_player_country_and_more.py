@@ -0,0 +1,30 @@
+# Generated by Django 5.0.7 on 2026-10-19 09:12
+
+import django.core.validators
+import django_countries.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='player',
+            name='birthdate',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='player',
+            name='country',
+            field=django_countries.fields.CountryField(blank=True, max_length=2, null=True),
+        ),
+        migrations.AlterField(
+            model_name='player',
+            name='rating',
+            field=models.IntegerField(blank=True, default=800, null=True, validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(3000)]),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.0.7 on 2026-10-19 15:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_alter_player_birthdate_alter_player_country_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='player',
+            index=models.Index(fields=['country', 'rating'], name='player_country_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='player',
+            index=models.Index(fields=['rating'], name='player_rating_idx'),
+        ),
+        # Indexes for player search on the user's username and names. Their expressions have to
+        # match users.services.USERNAME_SQL and NAME_VECTOR_SQL.
+        migrations.RunSQL(
+            sql="CREATE INDEX user_username_prefix_idx ON auth_user (lower(username) text_pattern_ops)",
+            reverse_sql="DROP INDEX IF EXISTS user_username_prefix_idx",
+        ),
+        migrations.RunSQL(
+            sql=(
+                "CREATE INDEX user_name_search_idx ON auth_user USING gin "
+                "(to_tsvector('simple'::regconfig, first_name || ' ' || last_name))"
+            ),
+            reverse_sql="DROP INDEX IF EXISTS user_name_search_idx",
+        ),
+    ]
@@ -10,6 +10,11 @@ class Player(models.Model):
     rating = models.IntegerField(validators=[MinValueValidator(0), MaxValueValidator(3000)], default=800, blank=True, null=True)
     country = CountryField(blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['country', 'rating'], name='player_country_rating_idx'),
+            models.Index(fields=['rating'], name='player_rating_idx'),
+        ]
 
     def __str__(self):
         return self.user.username
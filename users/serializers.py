@@ -1,7 +1,10 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
+from django_countries.serializers import CountryFieldMixin
+from django_countries.serializer_fields import CountryField
 
 from .models import Player
+from .services import PLAYER_ORDERINGS
 
 
 class RegisterSerializer(serializers.ModelSerializer):
@@ -58,7 +61,7 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ['id', 'username', 'first_name', 'last_name', 'is_active', 'is_staff', 'is_superuser', 'date_joined']
 
 
-class PlayerSerializer(serializers.ModelSerializer):
+class PlayerSerializer(CountryFieldMixin, serializers.ModelSerializer):
     """
     Serializer for the Player model.
 
@@ -130,7 +133,23 @@ class PlayerSerializer(serializers.ModelSerializer):
         return instance
 
 
-class ProfileUpdateSerializer(serializers.ModelSerializer):
+class PlayerImportSerializer(serializers.Serializer):
+    """
+    Serializer validating one row of a bulk player import.
+
+    Fields mirror the user and player fields that the import job writes; the rows are stored as job
+    payload, so they are validated here and only serialized back to plain JSON.
+    """
+    username = serializers.CharField(max_length=150)
+    first_name = serializers.CharField(max_length=150, required=False, allow_blank=True)
+    last_name = serializers.CharField(max_length=150, required=False, allow_blank=True)
+    email = serializers.EmailField(required=False, allow_blank=True)
+    country = CountryField(required=False, allow_null=True)
+    birthdate = serializers.DateField(required=False, allow_null=True)
+    rating = serializers.IntegerField(min_value=0, max_value=3000, required=False)
+
+
+class ProfileUpdateSerializer(CountryFieldMixin, serializers.ModelSerializer):
     """
     Serializer for updating Player data.
 
@@ -178,3 +197,27 @@ class ProfileUpdateSerializer(serializers.ModelSerializer):
         
         instance.save()
         return instance
+
+
+class PlayerSearchSerializer(serializers.Serializer):
+    """
+    Validates the query parameters of the player list.
+
+    Fields:
+        search (str): Words matched as prefixes of the username, first or last name.
+        country (str): ISO 3166-1 alpha-2 country code.
+        rating_min (int): Lowest rating, inclusive.
+        rating_max (int): Highest rating, inclusive.
+        ordering (str): 'id' (default), 'rating' or '-rating'.
+    """
+    search = serializers.CharField(required=False, max_length=100)
+    country = CountryField(required=False)
+    rating_min = serializers.IntegerField(required=False, min_value=0)
+    rating_max = serializers.IntegerField(required=False, min_value=0)
+    ordering = serializers.ChoiceField(choices=PLAYER_ORDERINGS, required=False, default='id')
+
+    def validate(self, attrs):
+        if attrs.get('rating_min') is not None and attrs.get('rating_max') is not None \
+                and attrs['rating_min'] > attrs['rating_max']:
+            raise serializers.ValidationError("rating_min cannot be greater than rating_max.")
+        return attrs
@@ -0,0 +1,131 @@
+"""
+Services of the users app that work on many players at once.
+
+Functions:
+    import_players(rows, batch_size=1000, progress=None): Bulk-creates users and players.
+    name_query(text): Turns search text into a prefix-matching full-text query.
+    search_players(search, country, rating_min, rating_max, ordering): Filters players with indexed queries.
+"""
+
+import re
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.expressions import RawSQL
+
+from .models import Player
+
+
+def import_players(rows, batch_size=1000, progress=None):
+    """
+    Create a user and a player for every row, skipping usernames that already exist or repeat.
+
+    Imported users get an unusable password; they have to reset it before logging in.
+
+    Args:
+        rows (list): Dicts with 'username' and optionally 'first_name', 'last_name', 'email',
+            'country', 'birthdate' and 'rating'.
+        batch_size (int): Number of rows written per transaction.
+        progress (callable, optional): Called as `progress(done, total)` after each batch.
+
+    Returns:
+        dict: The number of created and skipped rows.
+    """
+    password = make_password(None)
+    unique_rows = list({row['username']: row for row in rows}.values())
+    created, skipped = 0, len(rows) - len(unique_rows)
+    rows = unique_rows
+
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        existing = set(User.objects.filter(username__in=[row['username'] for row in batch])
+                       .values_list('username', flat=True))
+        batch = [row for row in batch if row['username'] not in existing]
+        skipped += len(existing)
+
+        with transaction.atomic():
+            users = User.objects.bulk_create([
+                User(
+                    username=row['username'],
+                    first_name=row.get('first_name', ''),
+                    last_name=row.get('last_name', ''),
+                    email=row.get('email', ''),
+                    password=password,
+                )
+                for row in batch
+            ])
+            Player.objects.bulk_create([
+                Player(
+                    user=user,
+                    country=row.get('country'),
+                    birthdate=row.get('birthdate'),
+                    rating=row.get('rating', 800),
+                )
+                for user, row in zip(users, batch)
+            ])
+        created += len(users)
+
+        if progress is not None:
+            progress(min(start + batch_size, len(rows)), len(rows))
+
+    return {'created': created, 'skipped': skipped}
+
+
+# These must match the expressions of the `user_username_prefix_idx` and `user_name_search_idx`
+# indexes (users migration 0003) exactly, otherwise PostgreSQL cannot use them.
+USERNAME_SQL = "lower(username)"
+NAME_VECTOR_SQL = "to_tsvector('simple'::regconfig, first_name || ' ' || last_name)"
+
+PLAYER_ORDERINGS = ('id', 'rating', '-rating')
+
+
+def name_query(text):
+    """
+    Build a `to_tsquery` string matching every word of `text` as a prefix, e.g. "magnus carl" ->
+    "magnus:* & carl:*". Returns None if the text has no words.
+    """
+    words = re.findall(r'\w+', text.lower())
+    return ' & '.join(f'{word}:*' for word in words) or None
+
+
+def search_players(search=None, country=None, rating_min=None, rating_max=None, ordering='id'):
+    """
+    Filter players by name, country and rating range.
+
+    The search text matches users whose username starts with it (a B-tree prefix index) or whose
+    first and last name contain a word starting with each of its words (a GIN full-text index).
+    Both run as one semi-join on the users table, so they cost index lookups instead of a table
+    scan. Country and rating filters are served by the (country, rating) and (rating) indexes of
+    `Player`.
+
+    Args:
+        search (str, optional): A username prefix, or words that must each prefix a name.
+        country (str, optional): ISO 3166-1 alpha-2 country code.
+        rating_min, rating_max (int, optional): Inclusive rating range.
+        ordering (str): One of PLAYER_ORDERINGS; ties are ordered by id.
+
+    Returns:
+        QuerySet: The matching players with their users.
+    """
+    players = Player.objects.select_related('user')
+    search = (search or '').strip()
+    if search:
+        users = User._meta.db_table
+        prefix = re.sub(r'([\\%_])', r'\\\1', search.lower()) + '%'
+        sql = f"SELECT id FROM {users} WHERE {USERNAME_SQL} LIKE %s"
+        params = [prefix]
+        query = name_query(search)
+        if query is not None:
+            sql += f" UNION SELECT id FROM {users} WHERE {NAME_VECTOR_SQL} @@ to_tsquery('simple', %s)"
+            params.append(query)
+        players = players.filter(user_id__in=RawSQL(sql, params))
+    if country:
+        players = players.filter(country=country)
+    if rating_min is not None:
+        players = players.filter(rating__gte=rating_min)
+    if rating_max is not None:
+        players = players.filter(rating__lte=rating_max)
+    if ordering == 'id':
+        return players.order_by('id')
+    return players.order_by(ordering, 'id')
@@ -144,3 +144,42 @@ class PlayerProfileTest(APITestCase):
         self.assertEqual(self.player.user.email, 'newemail@example.com')
         self.assertEqual(self.player.user.first_name, 'NewFirstName')
         self.assertEqual(self.player.user.last_name, 'NewLastName')
+
+
+class PlayerSearchTest(APITestCase):
+    def setUp(self):
+        self.admin_user = User.objects.create_superuser(username='admin', password='adminpassword123')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin_user)
+        self.url = reverse('players-list')
+        players = [
+            ('mcarlsen', 'Magnus', 'Carlsen', 'NO', 2830),
+            ('hikaru_n', 'Hikaru', 'Nakamura', 'US', 2790),
+            ('fabi', 'Fabiano', 'Caruana', 'US', 2800),
+            ('magnus_fan', 'Ola', 'Nordmann', 'NO', 1500),
+        ]
+        for username, first_name, last_name, country, rating in players:
+            user = User.objects.create_user(username=username, first_name=first_name, last_name=last_name)
+            Player.objects.create(user=user, country=country, rating=rating)
+
+    def usernames(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [row['user']['username'] for row in response.data['results']]
+
+    def test_search_by_name_and_username(self):
+        self.assertEqual(self.usernames(search='magn'), ['mcarlsen', 'magnus_fan'])
+        self.assertEqual(self.usernames(search='Magnus Carl'), ['mcarlsen'])
+        self.assertEqual(self.usernames(search='hikaru_'), ['hikaru_n'])
+        self.assertEqual(self.usernames(search='100%'), [])
+
+    def test_filter_by_country_and_rating(self):
+        self.assertEqual(self.usernames(country='US'), ['hikaru_n', 'fabi'])
+        self.assertEqual(self.usernames(rating_min=2795, ordering='-rating'), ['mcarlsen', 'fabi'])
+        self.assertEqual(self.usernames(country='NO', rating_max=2000), ['magnus_fan'])
+
+    def test_invalid_filters(self):
+        response = self.client.get(self.url, {'rating_min': 2000, 'rating_max': 1000})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(self.url, {'ordering': 'country'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -9,8 +9,9 @@ Authentication endpoints:
 - 'token/blacklist/': Blacklist JWT tokens (Log Out).
 
 Player management endpoints:
-- 'players/': List all players (admin only).
+- 'players/': List all players, with search, country and rating filters (admin only).
 - 'players/add/': Add a new player (admin only).
+- 'players/import/': Queue a bulk import of players as a background job (admin only).
 - 'players/<int:pk>/': Read details of a specific player (admin only).
 - 'players/update/<int:pk>/': Update details of a specific player (admin only).
 - 'players/delete/<int:pk>/': Delete a specific player (admin only).
@@ -26,6 +27,7 @@ from .views import (
     RegisterView,
     PlayersListView,
     AddPlayerView,
+    ImportPlayersView,
     ReadPlayerView,
     UpdatePlayerView,
     DeletePlayerView,
@@ -53,6 +55,7 @@ urlpatterns = [
     # Player management
     path('players/', PlayersListView.as_view(), name='players-list'),
     path('players/add/', AddPlayerView.as_view(), name='add-player'),
+    path('players/import/', ImportPlayersView.as_view(), name='import-players'),
     path('players/<int:pk>/', ReadPlayerView.as_view(), name='read-player'),
     path('players/update/<int:pk>/', UpdatePlayerView.as_view(), name='update-player'),
     path('players/delete/<int:pk>/', DeletePlayerView.as_view(), name='delete-player'),
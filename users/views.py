@@ -12,8 +12,13 @@ from .serializers import (
     RegisterSerializer, 
     UserSerializer,
     PlayerSerializer,
+    PlayerImportSerializer,
+    PlayerSearchSerializer,
     ProfileUpdateSerializer
 )
+from .services import search_players
+from jobs.queue import enqueue
+from jobs.views import job_accepted
     
 
 class RegisterView(generics.GenericAPIView):
@@ -72,6 +77,12 @@ class PlayersListView(generics.ListAPIView):
     """
     PlayersListView provides a list of all players. Only accessible by admin users.
 
+    Query parameters (all optional, validated by PlayerSearchSerializer):
+    - search: Words matched as prefixes of the username, first or last name (full-text index).
+    - country: ISO country code.
+    - rating_min, rating_max: Inclusive rating range.
+    - ordering: 'id' (default), 'rating' or '-rating'.
+
     Attributes:
     - queryset: Specifies the queryset to be used (all Player objects).
     - serializer_class: Specifies the serializer to be used (PlayerSerializer).
@@ -84,6 +95,11 @@ class PlayersListView(generics.ListAPIView):
     authentication_classes = [JWTAuthentication]
     pagination_class = PlayerPagination
 
+    def get_queryset(self):
+        filters = PlayerSearchSerializer(data=self.request.query_params)
+        filters.is_valid(raise_exception=True)
+        return search_players(**filters.validated_data)
+
 
 class AddPlayerView(generics.CreateAPIView):
     """
@@ -99,6 +115,29 @@ class AddPlayerView(generics.CreateAPIView):
     serializer_class = PlayerSerializer
 
 
+class ImportPlayersView(generics.GenericAPIView):
+    """
+    ImportPlayersView queues a background job that bulk-creates players. Only accessible by admin users.
+
+    The request body is a list of players; the response is the queued job, whose progress can be
+    polled at the URL in the `Location` header.
+
+    Attributes:
+    - serializer_class: Specifies the serializer used to validate each imported player.
+    - permission_classes: Specifies that only authenticated admin users can access this view.
+    - authentication_classes: Specifies the authentication mechanism (JWT).
+    """
+    permission_classes = [IsAdminUser]
+    authentication_classes = [JWTAuthentication]
+    serializer_class = PlayerImportSerializer
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        job = enqueue('import_players', user=request.user, players=serializer.data)
+        return job_accepted(request, job)
+
+
 class ReadPlayerView(generics.RetrieveAPIView):
     """
     ReadPlayerView provides details of a specific player. Only accessible by admin users.